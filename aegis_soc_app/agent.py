@@ -1,12 +1,12 @@
 ﻿from __future__ import annotations
 
-import json
-from pathlib import Path
 from typing import Any, Dict, List
 
 from google.adk.agents.llm_agent import Agent
 from google.adk.apps import App
 
+from aegis_soc_sessions.alert_store import get_alert_store
+
 
 class RootTriageAgent(Agent):
     """
@@ -42,6 +42,11 @@ def load_synthetic_alerts() -> List[Dict[str, Any]]:
             - timestamp (str): ISO 8601 timestamp
             - Additional fields vary per source (username, ip, hostname, etc.)
 
+    The file is served from the shared AlertStore, which parses the whole
+    feed once and reuses it until the file changes on disk. (The filtered
+    lookups of aegis_soc_sessions go through the columnar cache instead,
+    which decodes only the rows they ask for.)
+
     Security:
         - Reads only checked-in synthetic data; no external calls occur.
         - Never mixes or accesses real customer data.
@@ -50,19 +55,7 @@ def load_synthetic_alerts() -> List[Dict[str, Any]]:
         FileNotFoundError: If data/synthetic_alerts.json does not exist.
         ValueError: If the JSON payload is not a list of alerts.
     """
-    base_dir = Path(__file__).resolve().parent.parent
-    alerts_path = base_dir / "data" / "synthetic_alerts.json"
-
-    if not alerts_path.exists():
-        raise FileNotFoundError(f"Synthetic alerts file not found: {alerts_path}")
-
-    with alerts_path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    if not isinstance(data, list):
-        raise ValueError("Synthetic alerts file must contain a JSON list of alerts.")
-
-    return data
+    return get_alert_store().all()
 
 
 log_parser_agent = LogParserAgent(
@@ -1,3 +1,44 @@
-from .app import app, session_service
+"""AegisSOC triage agents.
 
-__all__ = ["app", "session_service"]
+The App, session service and agents are resolved on first attribute access
+(PEP 562), so importing a light submodule such as `alert_stream` or
+`correlation` does not pull in the ADK/genai stack or build any agent.
+"""
+
+from __future__ import annotations
+
+import importlib
+import sys
+import types
+from typing import Any
+
+# Public name -> submodule that defines it.
+_LAZY_EXPORTS = {
+    "app": ".app",
+    "session_service": ".app",
+    "root_agent": ".agent",
+}
+
+__all__ = ["app", "session_service", "root_agent"]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+class _Package(types.ModuleType):
+    def __setattr__(self, name: str, value: Any) -> None:
+        # `import aegis_soc_sessions.app` binds the submodule over the
+        # exported App; keep the name lazy so it resolves to the App, as the
+        # eager `from .app import app` used to.
+        if name in _LAZY_EXPORTS and isinstance(value, types.ModuleType):
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
@@ -0,0 +1,583 @@
+"""Memory-mapped columnar cache over the alert feed.
+
+The feed (JSON array or NDJSON) is converted once into a single binary file
+under AEGIS_ALERT_CACHE_DIR, named after the feed's path, mtime and size, and
+memory-mapped on every later open, so a warm start costs a stat and an mmap
+instead of parsing the whole feed.
+The directory defaults to a per-user cache dir and must not be writable by
+other users, since cache files are trusted once mapped.
+
+Layout (all little-endian, sections 8-byte aligned):
+
+    b"AEGISCOL" | u32 version | u32 header length | JSON header
+    source, severity, category   u8 dictionary codes, one per row
+    ts                           i64 microseconds since epoch (TS_MISSING if unparseable)
+    ts_order / ts_sorted         rows with a timestamp, sorted by time
+    id_hash / id_row             64-bit id hashes, sorted, and their rows
+    offsets                      u64 record offsets (rows + 1)
+    records                      compact JSON of each alert, back to back
+
+Filters are evaluated a column at a time with C-level bytes operations
+(bytes.translate to build 0/1 masks, big-int AND to intersect them,
+bytes.find / bytes.count to walk or count matches), time windows by bisecting
+the sorted timestamp column, and only the rows that match are decoded back
+into dicts. No third-party dependencies are required.
+"""
+
+from __future__ import annotations
+
+import bisect
+import contextvars
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import threading
+from array import array
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .alert_stream import DEFAULT_ALERTS_PATH, TimeBound, iter_alerts, parse_timestamp
+
+
+
+
+def _default_cache_dir() -> Path:
+    """Per-user cache dir: $XDG_CACHE_HOME, %LOCALAPPDATA% or ~/.cache."""
+    base = os.getenv("XDG_CACHE_HOME") or (os.getenv("LOCALAPPDATA") if os.name == "nt" else None)
+    if not base:
+        try:
+            base = str(Path.home() / ".cache")
+        except RuntimeError:  # no home directory
+            user = os.getuid() if hasattr(os, "getuid") else "user"
+            base = os.path.join(tempfile.gettempdir(), f"aegis-{user}")
+    return Path(base) / "aegis-alert-cache"
+
+
+# Cache files are mapped and trusted on open, so the directory must be
+# private to this user (see ensure_private_dir).
+ALERT_CACHE_DIR = Path(os.getenv("AEGIS_ALERT_CACHE_DIR") or _default_cache_dir())
+
+MAGIC = b"AEGISCOL"
+VERSION = 1
+TS_MISSING = -(1 << 63)
+CATEGORICAL_COLUMNS = ("source", "severity", "category")
+# Values past this many distinct entries share OVERFLOW_CODE and are checked
+# row by row after decoding.
+MAX_DICTIONARY = 255
+OVERFLOW_CODE = 255
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _to_micros(ts: datetime) -> int:
+    delta = ts - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _id_hash(alert_id: Any) -> int:
+    digest = hashlib.blake2b(str(alert_id).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _pad(n: int) -> int:
+    return (-n) % 8
+
+
+# --- Building ----------------------------------------------------------------
+
+
+def _owned_and_not_shared(path: Path) -> bool:
+    """True unless another user owns `path` or others can write to it (POSIX only)."""
+    if not hasattr(os, "getuid"):
+        return True
+    info = os.lstat(path)
+    return info.st_uid == os.getuid() and not info.st_mode & 0o022
+
+
+def ensure_private_dir(directory: Path | str) -> Path:
+    """
+    Create `directory` (mode 0700) if needed; PermissionError if it is a
+    symlink, owned by another user, or group/world-writable, since anyone
+    who can write there could plant a cache file and inject alerts.
+    """
+    directory = Path(directory)
+    directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if directory.is_symlink() or not _owned_and_not_shared(directory):
+        raise PermissionError(
+            f"Alert cache directory {directory} must be a directory owned by the current "
+            "user and not writable by others; fix it or set AEGIS_ALERT_CACHE_DIR."
+        )
+    return directory
+
+
+def build_cache(feed_path: Path | str, cache_path: Path | str) -> Path:
+    """
+    Stream `feed_path` once and write its columnar cache to `cache_path`.
+
+    Records are spooled to a temporary file while the (small, fixed-width)
+    columns accumulate in memory, then everything is assembled and renamed
+    into place atomically.
+    """
+    feed_path, cache_path = Path(feed_path), Path(cache_path)
+    ensure_private_dir(cache_path.parent)
+
+    dictionaries: Dict[str, List[str]] = {c: [] for c in CATEGORICAL_COLUMNS}
+    lookups: Dict[str, Dict[str, int]] = {c: {} for c in CATEGORICAL_COLUMNS}
+    codes: Dict[str, bytearray] = {c: bytearray() for c in CATEGORICAL_COLUMNS}
+    ts = array("q")
+    offsets = array("Q", [0])
+    id_keys: List[Tuple[int, int]] = []
+
+    fd, spool_name = tempfile.mkstemp(dir=cache_path.parent, suffix=".records")
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            for row, alert in enumerate(iter_alerts(feed_path)):
+                for column in CATEGORICAL_COLUMNS:
+                    value = str(alert.get(column))
+                    code = lookups[column].get(value)
+                    if code is None:
+                        if len(dictionaries[column]) < MAX_DICTIONARY:
+                            code = lookups[column][value] = len(dictionaries[column])
+                            dictionaries[column].append(value)
+                        else:
+                            code = OVERFLOW_CODE
+                    codes[column].append(code)
+                parsed = parse_timestamp(alert.get("timestamp"))
+                ts.append(_to_micros(parsed) if parsed is not None else TS_MISSING)
+                id_keys.append((_id_hash(alert.get("id")), row))
+                record = json.dumps(alert, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                spool.write(record)
+                offsets.append(offsets[-1] + len(record))
+
+        rows = len(ts)
+        timed = sorted((t, row) for row, t in enumerate(ts) if t != TS_MISSING)
+        id_keys.sort()
+        sections: List[Tuple[str, bytes]] = [
+            *((c, bytes(codes[c])) for c in CATEGORICAL_COLUMNS),
+            ("ts", ts.tobytes()),
+            ("ts_order", array("Q", (row for _, row in timed)).tobytes()),
+            ("ts_sorted", array("q", (t for t, _ in timed)).tobytes()),
+            ("id_hash", array("Q", (h for h, _ in id_keys)).tobytes()),
+            ("id_row", array("Q", (row for _, row in id_keys)).tobytes()),
+            ("offsets", offsets.tobytes()),
+        ]
+        # Rows with a timestamp, already in time order: time windows are then
+        # contiguous row ranges.
+        time_sorted = len(timed) == rows and all(r == i for i, (_, r) in enumerate(timed))
+
+        # Section offsets depend on the header length, which depends on the
+        # offsets; iterate until the encoded header stops changing.
+        layout: Dict[str, List[int]] = {}
+        header = {
+            "feed": str(feed_path),
+            "rows": rows,
+            "dictionaries": dictionaries,
+            "time_sorted": time_sorted,
+            "sections": layout,
+        }
+        blob = b""
+        while True:
+            position = len(MAGIC) + 8 + len(blob)
+            position += _pad(position)
+            for name, data in sections:
+                layout[name] = [position, len(data)]
+                position += len(data) + _pad(len(data))
+            layout["records"] = [position, offsets[-1]]
+            encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+            if encoded == blob:
+                break
+            blob = encoded
+
+        fd, tmp_name = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as out:
+            out.write(MAGIC + struct.pack("<II", VERSION, len(blob)) + blob)
+            out.write(b"\0" * _pad(out.tell()))
+            for _, data in sections:
+                out.write(data)
+                out.write(b"\0" * _pad(len(data)))
+            with open(spool_name, "rb") as spool:
+                shutil.copyfileobj(spool, out, 1 << 20)
+        os.replace(tmp_name, cache_path)
+    finally:
+        try:
+            os.unlink(spool_name)
+        except OSError:
+            pass
+    return cache_path
+
+
+# --- Reading -----------------------------------------------------------------
+
+
+class ColumnarAlertCache:
+    """Read-only view over one cache file (see the module docstring)."""
+
+    def __init__(self, cache_path: Path | str) -> None:
+        self.path = Path(cache_path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not an alert column cache: {self.path}")
+        version, header_len = struct.unpack_from("<II", self._mm, len(MAGIC))
+        if version != VERSION:
+            raise ValueError(f"Unsupported alert column cache version {version}: {self.path}")
+        start = len(MAGIC) + 8
+        header = json.loads(self._mm[start : start + header_len])
+        self.rows: int = header["rows"]
+        self.dictionaries: Dict[str, List[str]] = header["dictionaries"]
+        self.time_sorted: bool = header["time_sorted"]
+        self._sections: Dict[str, Tuple[int, int]] = {
+            name: (off, length) for name, (off, length) in header["sections"].items()
+        }
+        view = memoryview(self._mm)
+        self._ts = self._view(view, "ts", "q")
+        self._ts_order = self._view(view, "ts_order", "Q")
+        self._ts_sorted = self._view(view, "ts_sorted", "q")
+        self._id_hash = self._view(view, "id_hash", "Q")
+        self._id_row = self._view(view, "id_row", "Q")
+        self._offsets = self._view(view, "offsets", "Q")
+        self._records_base = self._sections["records"][0]
+
+    def _view(self, view: memoryview, name: str, fmt: str) -> memoryview:
+        off, length = self._sections[name]
+        return view[off : off + length].cast(fmt)
+
+    def _column(self, name: str) -> bytes:
+        off, length = self._sections[name]
+        return self._mm[off : off + length]
+
+    def __len__(self) -> int:
+        return self.rows
+
+    # --- Rows ----------------------------------------------------------------
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """Decode one row back into the original alert dict."""
+        start = self._records_base + self._offsets[index]
+        end = self._records_base + self._offsets[index + 1]
+        return json.loads(self._mm[start:end])
+
+    def get(self, alert_id: Any) -> Optional[Dict[str, Any]]:
+        """The first alert with this id (matching AlertStore), or None."""
+        key = _id_hash(alert_id)
+        wanted = str(alert_id)
+        i = bisect.bisect_left(self._id_hash, key)
+        while i < len(self._id_hash) and self._id_hash[i] == key:
+            alert = self.row(self._id_row[i])
+            if str(alert.get("id")) == wanted:
+                return alert
+            i += 1
+        return None
+
+    # --- Masks ---------------------------------------------------------------
+
+    def _categorical_mask(
+        self, column: str, values: Optional[str | Iterable[str]], casefold: bool
+    ) -> Tuple[Optional[bytes], Optional[set]]:
+        """0/1 byte mask for `column in values`, plus the set to re-check on overflow."""
+        if values is None:
+            return None, None
+        wanted = {values} if isinstance(values, str) else {str(v) for v in values}
+        if casefold:
+            wanted = {v.lower() for v in wanted}
+        table = bytearray(256)
+        for code, value in enumerate(self.dictionaries[column]):
+            if (value.lower() if casefold else value) in wanted:
+                table[code] = 1
+        recheck = None
+        if len(self.dictionaries[column]) >= MAX_DICTIONARY:
+            table[OVERFLOW_CODE] = 1
+            recheck = wanted
+        return self._column(column).translate(table), recheck
+
+    def _time_mask(self, since: TimeBound, until: TimeBound) -> Optional[bytes]:
+        if since is None and until is None:
+            return None
+        since_dt = parse_timestamp(since) if since is not None else None
+        until_dt = parse_timestamp(until) if until is not None else None
+        if since is not None and since_dt is None:
+            raise ValueError(f"Invalid 'since' timestamp: {since!r}")
+        if until is not None and until_dt is None:
+            raise ValueError(f"Invalid 'until' timestamp: {until!r}")
+
+        lo = bisect.bisect_left(self._ts_sorted, _to_micros(since_dt)) if since_dt else 0
+        hi = (
+            bisect.bisect_right(self._ts_sorted, _to_micros(until_dt))
+            if until_dt
+            else len(self._ts_sorted)
+        )
+        hi = max(lo, hi)
+        if self.time_sorted:
+            return b"\0" * lo + b"\1" * (hi - lo) + b"\0" * (self.rows - hi)
+        mask = bytearray(self.rows)
+        for row in self._ts_order[lo:hi]:
+            mask[row] = 1
+        return bytes(mask)
+
+    def mask(
+        self,
+        *,
+        sources: Optional[str | Iterable[str]] = None,
+        severity: Optional[str | Iterable[str]] = None,
+        category: Optional[str | Iterable[str]] = None,
+        since: TimeBound = None,
+        until: TimeBound = None,
+    ) -> Tuple[Optional[bytes], Dict[str, set]]:
+        """
+        Intersect every filter into one 0/1 byte-per-row mask (None when no
+        filter is set). Sources compare case-insensitively, like iter_alerts;
+        severity and category compare exactly, like AlertStore.
+        """
+        masks: List[bytes] = []
+        recheck: Dict[str, set] = {}
+        for column, values, casefold in (
+            ("source", sources, True),
+            ("severity", severity, False),
+            ("category", category, False),
+        ):
+            column_mask, overflow = self._categorical_mask(column, values, casefold)
+            if column_mask is not None:
+                masks.append(column_mask)
+            if overflow is not None:
+                recheck[column] = overflow
+        time_mask = self._time_mask(since, until)
+        if time_mask is not None:
+            masks.append(time_mask)
+
+        if not masks:
+            return None, recheck
+        if len(masks) == 1:
+            return masks[0], recheck
+        combined = int.from_bytes(masks[0], "little")
+        for other in masks[1:]:
+            combined &= int.from_bytes(other, "little")
+        return combined.to_bytes(self.rows, "little"), recheck
+
+    # --- Queries -------------------------------------------------------------
+
+    def _matching_rows(self, mask: Optional[bytes]) -> Iterator[int]:
+        if mask is None:
+            yield from range(self.rows)
+            return
+        row = mask.find(1)
+        while row != -1:
+            yield row
+            row = mask.find(1, row + 1)
+
+    def count(self, **filters: Any) -> int:
+        """Number of matching alerts, without decoding any row."""
+        mask, recheck = self.mask(**filters)
+        if recheck:
+            return sum(1 for _ in self.query(**filters))
+        return self.rows if mask is None else mask.count(1)
+
+    def query(self, *, limit: Optional[int] = None, **filters: Any) -> Iterator[Dict[str, Any]]:
+        """Matching alerts in file order; only those rows are decoded."""
+        if limit is not None and limit <= 0:
+            return
+        mask, recheck = self.mask(**filters)
+        matched = 0
+        for row in self._matching_rows(mask):
+            alert = self.row(row)
+            if recheck and not all(
+                (str(alert.get(column)).lower() if column == "source" else str(alert.get(column)))
+                in wanted
+                for column, wanted in recheck.items()
+            ):
+                continue
+            yield alert
+            matched += 1
+            if limit is not None and matched >= limit:
+                return
+
+    def ids(self, *, limit: Optional[int] = None, **filters: Any) -> List[str]:
+        return [str(alert.get("id")) for alert in self.query(limit=limit, **filters)]
+
+    @property
+    def closed(self) -> bool:
+        return self._mm.closed
+
+    def close(self) -> None:
+        if self._mm.closed:
+            return
+        for view in (self._ts, self._ts_order, self._ts_sorted, self._id_hash, self._id_row, self._offsets):
+            view.release()
+        self._mm.close()
+
+
+class AlertColumns:
+    """
+    Process-wide handle on the columnar cache for one feed.
+
+    Every access re-stats the feed; when its mtime or size changed a new cache
+    file is built (the signature is part of the file name, so readers of the
+    old one are never disturbed) and stale files are removed best-effort.
+    The replaced cache is closed (unmapped) as soon as the last reader that
+    holds it through reading() is done.
+    """
+
+    def __init__(self, path: Path | str = DEFAULT_ALERTS_PATH, cache_dir: Path | str | None = None) -> None:
+        self.path = Path(path)
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else ALERT_CACHE_DIR
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._cache: Optional[ColumnarAlertCache] = None
+        # Open readers per cache (by id) and replaced caches waiting for them.
+        self._readers: Dict[int, int] = {}
+        self._retired: Dict[int, ColumnarAlertCache] = {}
+        self.builds = 0
+
+    def _stat_signature(self) -> Tuple[int, int]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Synthetic alerts file not found: {self.path}") from None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _cache_path(self, signature: Tuple[int, int]) -> Path:
+        stem = hashlib.sha1(str(self.path.resolve()).encode("utf-8")).hexdigest()[:16]
+        return self.cache_dir / f"{stem}-{signature[0]}-{signature[1]}.cols"
+
+    def _current(self) -> ColumnarAlertCache:
+        """The current cache, (re)built or reopened if the feed changed (lock held)."""
+        signature = self._stat_signature()
+        if signature == self._signature and self._cache is not None:
+            return self._cache
+        path = self._cache_path(signature)
+        ensure_private_dir(self.cache_dir)
+        cache = None
+        # A file someone else could have written is rebuilt, never mapped.
+        if path.exists() and _owned_and_not_shared(path):
+            try:
+                cache = ColumnarAlertCache(path)
+            except (ValueError, OSError):
+                cache = None
+        if cache is None:
+            build_cache(self.path, path)
+            self.builds += 1
+            cache = ColumnarAlertCache(path)
+        previous = self._cache
+        self._cache, self._signature = cache, signature
+        if previous is not None and previous is not cache:
+            self._retire(previous)
+        self._remove_stale(path)
+        return cache
+
+    def _retire(self, cache: ColumnarAlertCache) -> None:
+        if self._readers.get(id(cache)):
+            self._retired[id(cache)] = cache
+        else:
+            cache.close()
+
+    def cache(self) -> ColumnarAlertCache:
+        """
+        The current cache, (re)built or reopened if the feed changed. It is
+        closed once the feed changes again; use reading() to keep it open.
+        """
+        with self._lock:
+            return self._current()
+
+    @contextmanager
+    def reading(self) -> Iterator[ColumnarAlertCache]:
+        """The current cache, kept open until the block exits."""
+        with self._lock:
+            cache = self._current()
+            self._readers[id(cache)] = self._readers.get(id(cache), 0) + 1
+        try:
+            yield cache
+        finally:
+            with self._lock:
+                left = self._readers.pop(id(cache)) - 1
+                if left:
+                    self._readers[id(cache)] = left
+                elif self._retired.pop(id(cache), None) is not None:
+                    cache.close()
+
+    def close(self) -> None:
+        """Close the current cache; the next access reopens it."""
+        with self._lock:
+            if self._cache is not None:
+                self._retire(self._cache)
+            self._cache, self._signature = None, None
+
+    def _remove_stale(self, current: Path) -> None:
+        prefix = current.name.split("-", 1)[0]
+        for stale in self.cache_dir.glob(f"{prefix}-*.cols"):
+            if stale != current:
+                try:
+                    stale.unlink()
+                except OSError:
+                    # Still mapped elsewhere (Windows); a later rebuild retries.
+                    pass
+
+    def invalidate(self) -> None:
+        """Force the next access to re-check (not rebuild) the cache file."""
+        with self._lock:
+            self._signature = None
+
+    # Convenience pass-throughs; each holds the cache open while it reads.
+
+    def get(self, alert_id: Any) -> Optional[Dict[str, Any]]:
+        with self.reading() as cache:
+            return cache.get(alert_id)
+
+    def query(self, **kwargs: Any) -> Iterator[Dict[str, Any]]:
+        with self.reading() as cache:
+            yield from cache.query(**kwargs)
+
+    def ids(self, **kwargs: Any) -> List[str]:
+        with self.reading() as cache:
+            return cache.ids(**kwargs)
+
+    def count(self, **filters: Any) -> int:
+        with self.reading() as cache:
+            return cache.count(**filters)
+
+    def __len__(self) -> int:
+        with self.reading() as cache:
+            return len(cache)
+
+
+_columns: Dict[Path, AlertColumns] = {}
+_columns_lock = threading.Lock()
+# Feed read by get_alert_columns() without a path; set by use_alert_feed().
+_active_feed: contextvars.ContextVar[Optional[Path]] = contextvars.ContextVar(
+    "aegis_alert_feed", default=None
+)
+
+
+def get_alert_columns(path: Path | str | None = None) -> AlertColumns:
+    """
+    Return the process-wide AlertColumns for `path` (default: the
+    use_alert_feed() feed, else the alert feed).
+    """
+    if path is not None:
+        resolved = Path(path).resolve()
+    else:
+        resolved = _active_feed.get() or DEFAULT_ALERTS_PATH
+    columns = _columns.get(resolved)
+    if columns is None:
+        with _columns_lock:
+            columns = _columns.setdefault(resolved, AlertColumns(resolved))
+    return columns
+
+
+@contextmanager
+def use_alert_feed(path: Path | str) -> Iterator[AlertColumns]:
+    """
+    Point get_alert_columns() at `path` inside the block (and tasks started
+    from it), e.g. to run the agent tools against a generated feed without
+    touching AEGIS_ALERTS_PATH.
+    """
+    columns = get_alert_columns(path)
+    token = _active_feed.set(columns.path)
+    try:
+        yield columns
+    finally:
+        _active_feed.reset(token)
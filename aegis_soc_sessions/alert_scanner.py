@@ -0,0 +1,186 @@
+"""Prompt-injection and fake-execution scanning of alert fields at load time.
+
+Alert text such as `description` or `command_line` is attacker-controllable,
+and it reaches the root agent's context as soon as alerts are loaded. The
+guardrail only sees it later, inside the model's recommendation. This module
+scans every free-text field of an alert with the guardrail's own precompiled
+patterns (guardrail_agent.rules.find_markers), so the two never disagree.
+Each field is first checked for the patterns' literal anchor words, and the
+regexes only run on the few fields that contain one. That keeps a scan at a
+few microseconds per alert (about 100k alerts/s on one core for the
+generated corpus).
+
+Every string in the alert is scanned, however deeply it is nested in dicts
+and lists, except `id` and `timestamp`. Flagged alerts carry the per-field
+findings under TAINT_FIELD:
+
+    {"description": ["prompt_injection"], "entities.meta.note": ["fake_execution"],
+     "correlated_sources[2]": ["prompt_injection"]}
+
+A TAINT_FIELD that arrives with the alert is never trusted: tag_alert()
+drops it before scanning, and taint_decision() always rescans the whole
+alert (our own findings hold only flag names, which never match).
+Batch triage decides tainted alerts as NEEDS_MORE_INFO without any model
+call (taint_decision()). load_synthetic_alerts tags the alerts it loads and
+shows the agents (and the correlation graph) redacted copies
+(redact_alert()), so the flagged text never reaches a prompt.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from guardrail_agent.rules import MARKER_FAKE_EXECUTION, MARKER_PROMPT_INJECTION, find_markers
+
+from .correlation import TAINT_FIELD
+from .pretriage import PretriageDecision
+
+
+TAINT_SCAN_ENABLED = os.getenv("AEGIS_TAINT_SCAN", "on").strip().lower() not in (
+    "0", "off", "false", "no",
+)
+
+TAINT_RULE = "taint_scanner"
+FLAG_PROMPT_INJECTION = MARKER_PROMPT_INJECTION
+FLAG_FAKE_EXECUTION = MARKER_FAKE_EXECUTION
+
+# Fields that never reach a prompt as free text (ids are matched, timestamps parsed).
+SKIPPED_FIELDS = frozenset({"id", "timestamp"})
+# No pattern can match fewer characters than this ("we reset the").
+MIN_SCAN_LENGTH = 12
+_WHITESPACE_RE = re.compile(r"\s")
+# One step of a finding path: ".key", "key" or "[index]".
+_PATH_STEP_RE = re.compile(r"\[(\d+)\]|\.?([^.\[]+)")
+
+
+def scan_value(text: str) -> List[str]:
+    """Flags for one field value (empty if clean)."""
+    # Every pattern needs some whitespace, so identifiers (users, IPs,
+    # hostnames) are skipped without further work.
+    if len(text) < MIN_SCAN_LENGTH or (" " not in text and _WHITESPACE_RE.search(text) is None):
+        return []
+    return find_markers(text)
+
+
+def _scan_nested(findings: Dict[str, List[str]], path: str, value: Any) -> None:
+    if isinstance(value, str):
+        flags = scan_value(value)
+        if flags:
+            findings[path] = flags
+    elif isinstance(value, dict):
+        for key, nested in value.items():
+            _scan_nested(findings, f"{path}.{key}", nested)
+    elif isinstance(value, (list, tuple)):
+        for i, item in enumerate(value):
+            _scan_nested(findings, f"{path}[{i}]", item)
+
+
+def scan_alert(alert: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Field path -> flags for every flagged string, at any depth."""
+    # Hot path: top-level strings (most fields) are scanned inline.
+    findings: Dict[str, List[str]] = {}
+    for name, value in alert.items():
+        if name in SKIPPED_FIELDS:
+            continue
+        if isinstance(value, str):
+            flags = scan_value(value)
+            if flags:
+                findings[name] = flags
+        elif isinstance(value, (dict, list, tuple)):
+            _scan_nested(findings, name, value)
+    return findings
+
+
+def tag_alert(alert: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Attach the scan findings to `alert` (in place) when it is tainted,
+    replacing any TAINT_FIELD it came with; returns it.
+    """
+    alert.pop(TAINT_FIELD, None)
+    findings = scan_alert(alert)
+    if findings:
+        alert[TAINT_FIELD] = findings
+    else:
+        alert.pop(TAINT_FIELD, None)
+    return alert
+
+
+def tag_alerts(alerts: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [tag_alert(alert) for alert in alerts]
+
+
+def strip_taint(alerts: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop TAINT_FIELD from alerts loaded without scanning (the feed's own is not trusted)."""
+    alerts = list(alerts)
+    for alert in alerts:
+        alert.pop(TAINT_FIELD, None)
+    return alerts
+
+
+def _path_steps(path: str) -> List[Any]:
+    return [int(index) if index else key for index, key in _PATH_STEP_RE.findall(path)]
+
+
+def _replace_at(value: Any, steps: List[Any], note: str) -> Any:
+    """Copy of `value` with the item at `steps` replaced by `note` (copies along the path only)."""
+    if not steps:
+        return note
+    step, rest = steps[0], steps[1:]
+    if isinstance(value, dict) and step in value:
+        return {**value, step: _replace_at(value[step], rest, note)}
+    if isinstance(value, (list, tuple)) and isinstance(step, int) and step < len(value):
+        items = list(value)
+        items[step] = _replace_at(items[step], rest, note)
+        return items
+    return value
+
+
+def redact_alert(alert: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copy of a tagged alert with every flagged field replaced by a short
+    note, so the flagged text never reaches a prompt. Untainted alerts are
+    returned as they are.
+    """
+    findings = alert.get(TAINT_FIELD)
+    if not findings:
+        return alert
+    redacted = dict(alert)
+    for path, flags in findings.items():
+        note = f"[withheld by the alert scanner: {', '.join(flags)}]"
+        redacted = _replace_at(redacted, _path_steps(path), note)
+    return redacted
+
+
+def _distinct_flags(findings: Dict[str, List[str]]) -> List[str]:
+    flags: List[str] = []
+    for field_flags in findings.values():
+        flags.extend(f for f in field_flags if f not in flags)
+    return flags
+
+
+def taint_flags(alert: Dict[str, Any]) -> List[str]:
+    """Distinct flags of an alert, from a fresh scan (attached findings are not trusted)."""
+    return _distinct_flags(scan_alert(alert))
+
+
+def taint_decision(alert: Dict[str, Any]) -> Optional[PretriageDecision]:
+    """
+    NEEDS_MORE_INFO for a tainted alert (a built-in pre-triage rule), else
+    None. Always rescans; a TAINT_FIELD that came with the alert is ignored.
+    """
+    findings = scan_alert(alert)
+    flags = _distinct_flags(findings)
+    if not flags:
+        return None
+    return PretriageDecision(
+        alert_id=str(alert.get("id")),
+        rule=TAINT_RULE,
+        normalized_action="NEEDS_MORE_INFO",
+        rationale=(
+            f"Alert text carries {' and '.join(f.replace('_', ' ') for f in flags)} markers "
+            f"in {', '.join(sorted(findings))}; it was not shown to the triage model. "
+            "Review the raw alert manually."
+        ),
+    )
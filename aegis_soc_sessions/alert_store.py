@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .alert_stream import DEFAULT_ALERTS_PATH, iter_alerts
+
+
+class AlertStore:
+    """
+    In-process cache over an alerts file with O(1) secondary indexes.
+
+    The file (JSON array or NDJSON) is parsed once and kept in memory together
+    with indexes by id, source, severity and category. Every access re-stats
+    the file and transparently reloads it when its mtime or size changed, so
+    edits to the feed are picked up without restarting the agent process.
+    """
+
+    def __init__(self, path: Path | str = DEFAULT_ALERTS_PATH) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._alerts: List[Dict[str, Any]] = []
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_source: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_severity: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_category: Dict[str, List[Dict[str, Any]]] = {}
+
+    # --- Loading -------------------------------------------------------------
+
+    def _stat_signature(self) -> Tuple[int, int]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"Synthetic alerts file not found: {self.path}"
+            ) from None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_alerts(self) -> List[Dict[str, Any]]:
+        # Accepts both JSON arrays and NDJSON (.ndjson / .jsonl) feeds.
+        return list(iter_alerts(self.path))
+
+    def _rebuild(self, alerts: List[Dict[str, Any]]) -> None:
+        by_id: Dict[str, Dict[str, Any]] = {}
+        by_source: Dict[str, List[Dict[str, Any]]] = {}
+        by_severity: Dict[str, List[Dict[str, Any]]] = {}
+        by_category: Dict[str, List[Dict[str, Any]]] = {}
+
+        for alert in alerts:
+            # First occurrence wins, matching the previous linear scan order.
+            by_id.setdefault(str(alert.get("id")), alert)
+            by_source.setdefault(str(alert.get("source")), []).append(alert)
+            by_severity.setdefault(str(alert.get("severity")), []).append(alert)
+            by_category.setdefault(str(alert.get("category")), []).append(alert)
+
+        self._alerts = alerts
+        self._by_id = by_id
+        self._by_source = by_source
+        self._by_severity = by_severity
+        self._by_category = by_category
+
+    def _ensure_fresh(self) -> None:
+        signature = self._stat_signature()
+        if signature == self._signature:
+            return
+        with self._lock:
+            # Re-check under the lock: another thread may have reloaded already.
+            signature = self._stat_signature()
+            if signature == self._signature:
+                return
+            self._rebuild(self._read_alerts())
+            self._signature = signature
+
+    def invalidate(self) -> None:
+        """Force the next access to re-read the file."""
+        with self._lock:
+            self._signature = None
+
+    # --- Queries -------------------------------------------------------------
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Return every alert in file order."""
+        self._ensure_fresh()
+        return list(self._alerts)
+
+    def get(self, alert_id: Any) -> Optional[Dict[str, Any]]:
+        """Return the alert with the given id, or None when it is unknown."""
+        self._ensure_fresh()
+        return self._by_id.get(str(alert_id))
+
+    def by_source(self, source: str) -> List[Dict[str, Any]]:
+        self._ensure_fresh()
+        return list(self._by_source.get(str(source), ()))
+
+    def by_severity(self, severity: str) -> List[Dict[str, Any]]:
+        self._ensure_fresh()
+        return list(self._by_severity.get(str(severity), ()))
+
+    def by_category(self, category: str) -> List[Dict[str, Any]]:
+        self._ensure_fresh()
+        return list(self._by_category.get(str(category), ()))
+
+    def __len__(self) -> int:
+        self._ensure_fresh()
+        return len(self._alerts)
+
+
+_stores: Dict[Path, AlertStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_alert_store(path: Path | str | None = None) -> AlertStore:
+    """
+    Return the process-wide AlertStore for `path` (default: the synthetic feed).
+
+    Stores are shared per resolved path so every tool invocation hits the same
+    warm cache.
+    """
+    resolved = Path(path).resolve() if path is not None else DEFAULT_ALERTS_PATH
+    store = _stores.get(resolved)
+    if store is None:
+        with _stores_lock:
+            store = _stores.setdefault(resolved, AlertStore(resolved))
+    return store
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, TextIO
+
+
+# Alert feed read by the tools; AEGIS_ALERTS_PATH points them at another file
+# (e.g. a generated or scaled-up feed).
+DEFAULT_ALERTS_PATH = Path(
+    os.getenv("AEGIS_ALERTS_PATH")
+    or Path(__file__).resolve().parents[1] / "data" / "synthetic_alerts.json"
+).resolve()
+
+NDJSON_SUFFIXES = {".ndjson", ".jsonl"}
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+
+TimeBound = Optional[str | datetime]
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """Parse an ISO 8601 timestamp (with optional 'Z'); naive values are UTC."""
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str) and value:
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    else:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _iter_ndjson(f: TextIO) -> Iterator[Any]:
+    for line_no, line in enumerate(f, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"Invalid NDJSON record on line {line_no}: {exc}") from exc
+
+
+def _iter_json_array(f: TextIO, chunk_size: int) -> Iterator[Any]:
+    """
+    Incrementally decode the elements of a top-level JSON array.
+
+    Only the current chunk plus one partially-read element is ever buffered,
+    so memory stays flat regardless of the array length.
+    """
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip_ws() -> Optional[str]:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos].isspace():
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not fill():
+                return None
+
+    if skip_ws() != "[":
+        raise ValueError("Synthetic alerts file must contain a JSON list of alerts.")
+    pos += 1
+
+    if skip_ws() == "]":
+        return
+
+    while True:
+        if skip_ws() is None:
+            raise ValueError("Unexpected end of file inside JSON alert array.")
+        while True:
+            try:
+                item, end = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if not fill():
+                    raise ValueError("Malformed or truncated JSON alert array.") from None
+                continue
+            # A scalar at the end of the buffer may be cut short; only trust
+            # it once more input (or EOF) follows.
+            if end == len(buf) and not isinstance(item, (dict, list)) and fill():
+                continue
+            break
+        pos = end
+        yield item
+
+        token = skip_ws()
+        if token == ",":
+            pos += 1
+        elif token == "]":
+            return
+        else:
+            raise ValueError("Malformed JSON alert array: expected ',' or ']'.")
+
+
+def _build_predicate(
+    since: TimeBound,
+    until: TimeBound,
+    sources: Optional[str | Iterable[str]],
+) -> Callable[[Dict[str, Any]], bool]:
+    since_dt = parse_timestamp(since) if since is not None else None
+    until_dt = parse_timestamp(until) if until is not None else None
+    if since is not None and since_dt is None:
+        raise ValueError(f"Invalid 'since' timestamp: {since!r}")
+    if until is not None and until_dt is None:
+        raise ValueError(f"Invalid 'until' timestamp: {until!r}")
+
+    if isinstance(sources, str):
+        source_set = {sources.lower()}
+    elif sources is not None:
+        source_set = {str(s).lower() for s in sources}
+    else:
+        source_set = None
+
+    def predicate(alert: Dict[str, Any]) -> bool:
+        if source_set is not None and str(alert.get("source", "")).lower() not in source_set:
+            return False
+        if since_dt is not None or until_dt is not None:
+            ts = parse_timestamp(alert.get("timestamp"))
+            if ts is None:
+                return False
+            if since_dt is not None and ts < since_dt:
+                return False
+            if until_dt is not None and ts > until_dt:
+                return False
+        return True
+
+    return predicate
+
+
+def iter_alerts(
+    path: Path | str = DEFAULT_ALERTS_PATH,
+    *,
+    since: TimeBound = None,
+    until: TimeBound = None,
+    sources: Optional[str | Iterable[str]] = None,
+    limit: Optional[int] = None,
+    fmt: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream alerts from a JSON array or NDJSON file without loading it whole.
+
+    Args:
+        path: Alerts file. `.ndjson` / `.jsonl` files are read line by line,
+            anything else must hold a top-level JSON array.
+        since / until: Inclusive ISO 8601 bounds on each alert's `timestamp`.
+            Alerts without a parseable timestamp are skipped when set.
+        sources: One source name or an iterable of them (case-insensitive).
+        limit: Stop after this many matching alerts; the rest of the file is
+            never read.
+        fmt: Force "ndjson" or "json" instead of inferring from the suffix.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        ValueError: If the payload is not a list/NDJSON stream of objects.
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Synthetic alerts file not found: {path}")
+    if limit is not None and limit <= 0:
+        return
+
+    predicate = _build_predicate(since, until, sources)
+    is_ndjson = fmt == "ndjson" or (fmt is None and path.suffix.lower() in NDJSON_SUFFIXES)
+
+    matched = 0
+    with path.open("r", encoding="utf-8") as f:
+        records = _iter_ndjson(f) if is_ndjson else _iter_json_array(f, chunk_size)
+        for record in records:
+            if not isinstance(record, dict):
+                raise ValueError("Each alert record must be a JSON object.")
+            if not predicate(record):
+                continue
+            yield record
+            matched += 1
+            if limit is not None and matched >= limit:
+                return
@@ -1,12 +1,36 @@
+import os
+
 from google.adk.apps.app import App
-from google.adk.sessions import InMemorySessionService
+from google.adk.sessions import BaseSessionService, InMemorySessionService
 
 from .agent import correlation_agent, log_parser_agent, root_agent
+from .instrumentation import METRICS_PORT, serve_metrics
+
+# Session backend: "memory" (default) for short-lived, in-process sessions,
+# or "sqlite" for durable sessions shared by every worker on the host.
+SESSION_BACKEND = os.getenv("AEGIS_SESSION_BACKEND", "memory")
+
+
+def build_session_service(backend: str = SESSION_BACKEND) -> BaseSessionService:
+    """Create the session service selected by AEGIS_SESSION_BACKEND."""
+    backend = backend.strip().lower()
+    if backend == "memory":
+        return InMemorySessionService()
+    if backend == "sqlite":
+        from .sqlite_session_service import SqliteSessionService
 
-# Session service: short-lived, in-memory, per-incident sessions
-session_service = InMemorySessionService()
+        return SqliteSessionService()
+    raise ValueError(
+        f"Unknown AEGIS_SESSION_BACKEND {backend!r}; expected 'memory' or 'sqlite'."
+    )
+
+
+session_service = build_session_service()
 
 app = App(
     name="aegis_soc_sessions",
     root_agent=root_agent,
 )
+
+# Prometheus / OpenMetrics endpoint (GET /metrics) when AEGIS_METRICS_PORT is set.
+metrics_server = serve_metrics(int(METRICS_PORT)) if METRICS_PORT else None
@@ -0,0 +1,370 @@
+"""Batch triage: fan many alerts out across isolated sessions concurrently."""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from google.adk.runners import Runner
+from google.adk.sessions import BaseSessionService
+from google.genai import types
+
+from .action_schema import NORMALIZED_ACTIONS
+from .alert_columns import get_alert_columns
+from .alert_scanner import TAINT_SCAN_ENABLED, taint_decision
+from .model_scheduler import (
+    DEFAULT_MODEL_MAX_RATE,
+    DEFAULT_MODEL_MIN_RATE,
+    ModelCallScheduler,
+    is_rate_limited,  # noqa: F401 - re-exported; batch callers import it from here
+    model_priority,
+    priority_for_severity,
+    use_scheduler,
+)
+from .near_duplicates import NEAR_DUP_COLLAPSE, DuplicateGroup, collapse_near_duplicates
+from .observability import EVENT_GUARDRAIL_RESPONSE
+from .pretriage import PretriageDecision, PretriagePolicy, get_pretriage_policy
+from .streaming import parse_guardrail_verdict
+
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_PROMPT = (
+    "Triage the alert with ID '{alert_id}'. "
+    "Explain what happened and what I should do."
+)
+
+# "Recommended action: CLOSE" lines, then bare uppercase action tokens.
+_RECOMMENDED_ACTION_RE = re.compile(
+    r"recommended\s+action\s*[:\-]\s*\**\s*(ESCALATE|MONITOR|CLOSE|NEEDS[_ ]MORE[_ ]INFO)\b",
+    re.IGNORECASE,
+)
+_ACTION_TOKEN_RE = re.compile(r"\b(?:%s)\b" % "|".join(NORMALIZED_ACTIONS))
+
+
+@dataclass
+class BatchTriageResult:
+    alert_id: str
+    session_id: str
+    normalized_action: Optional[str]
+    triage_summary: Optional[str]
+    latency_seconds: float
+    attempts: int = 1
+    error: Optional[str] = None
+    # Set when a pre-triage rule decided the alert without the LLM.
+    pretriage_rule: Optional[str] = None
+    # Set when the verdict was fanned out from this near-duplicate
+    # representative; session_id is then the representative's session.
+    duplicate_of: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "alert_id": self.alert_id,
+            "session_id": self.session_id,
+            "normalized_action": self.normalized_action,
+            "triage_summary": self.triage_summary,
+            "latency_seconds": self.latency_seconds,
+            "attempts": self.attempts,
+            "error": self.error,
+            "pretriage_rule": self.pretriage_rule,
+            "duplicate_of": self.duplicate_of,
+        }
+
+    @classmethod
+    def from_pretriage(cls, decision: PretriageDecision) -> "BatchTriageResult":
+        return cls(
+            alert_id=decision.alert_id,
+            session_id="",
+            normalized_action=decision.normalized_action,
+            triage_summary=decision.rationale,
+            latency_seconds=0.0,
+            attempts=0,
+            pretriage_rule=decision.rule,
+        )
+
+    def fan_out(self, alert_id: str) -> "BatchTriageResult":
+        """This representative's verdict, applied to its near-duplicate `alert_id`."""
+        return BatchTriageResult(
+            alert_id=alert_id,
+            session_id=self.session_id,
+            normalized_action=self.normalized_action,
+            triage_summary=self.triage_summary,
+            latency_seconds=0.0,
+            attempts=0,
+            error=self.error,
+            duplicate_of=self.alert_id,
+        )
+
+
+class ProviderRateLimiter(ModelCallScheduler):
+    """
+    A ModelCallScheduler for one batch, with a fixed rate ceiling.
+
+    triage_batch() admits the batch's model calls through it (use_scheduler())
+    instead of the process-wide scheduler, so a single limiter paces every
+    model call and retries its 429s. The rate starts at, and never exceeds,
+    `rate_per_second`; 429s still cut it down to AEGIS_MODEL_MIN_RATE.
+    `rate_per_second <= 0` disables pacing (tests, replay).
+    """
+
+    def __init__(self, rate_per_second: float = 10.0, burst: int = 10) -> None:
+        self.rate_per_second = rate_per_second
+        ceiling = rate_per_second if rate_per_second > 0 else DEFAULT_MODEL_MAX_RATE
+        super().__init__(
+            ceiling,
+            min_rate=min(DEFAULT_MODEL_MIN_RATE, ceiling),
+            max_rate=ceiling,
+            burst=burst,
+        )
+
+    async def acquire(self, priority: Optional[str] = None) -> float:
+        if self.rate_per_second <= 0:
+            return 0.0
+        return await super().acquire(priority)
+
+
+def select_alert_ids(
+    alert_ids: Optional[Iterable[str]] = None,
+    *,
+    source: Optional[str] = None,
+    severity: Optional[str] = None,
+    category: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> List[str]:
+    """
+    Resolve the alerts to triage: explicit IDs, or a filter over the feed.
+
+    Filters are intersected over the columnar alert cache and keep file order.
+    """
+    if alert_ids is not None:
+        ids = [str(a) for a in alert_ids]
+        return ids[:limit] if limit is not None else ids
+    return get_alert_columns().ids(
+        sources=source, severity=severity, category=category, limit=limit
+    )
+
+
+def _guardrail_action_from_event(event: Any) -> Optional[str]:
+    """Pull normalized_action out of a guardrail_agent function response."""
+    for response in event.get_function_responses():
+        if response.name != "guardrail_agent":
+            continue
+        verdict = parse_guardrail_verdict(response.response or {})
+        if verdict:
+            return verdict["normalized_action"]
+    return None
+
+
+def extract_normalized_action(state: Dict[str, Any]) -> Optional[str]:
+    """
+    Final action for a finished triage session: the last guardrail verdict
+    in state['events'], else the action triage_summary names. The summary
+    must name exactly one action, either on a "Recommended action: X" line
+    or as a bare uppercase token; anything ambiguous returns None.
+    """
+    for event in reversed(state.get("events", []) or []):
+        if event.get("event_type") == EVENT_GUARDRAIL_RESPONSE:
+            action = event.get("details", {}).get("output", {}).get("normalized_action")
+            if action in NORMALIZED_ACTIONS:
+                return action
+
+    summary = str(state.get("triage_summary") or "")
+    actions = {
+        match.upper().replace(" ", "_") for match in _RECOMMENDED_ACTION_RE.findall(summary)
+    } or set(_ACTION_TOKEN_RE.findall(summary))
+    return next(iter(actions)) if len(actions) == 1 else None
+
+
+async def _triage_one(
+    alert_id: str,
+    *,
+    runner: Runner,
+    session_service: BaseSessionService,
+    app_name: str,
+    user_id: str,
+    prompt: str,
+    limiter: Optional[ModelCallScheduler],
+) -> BatchTriageResult:
+    started = time.perf_counter()
+    session_id = f"batch-{alert_id}-{uuid.uuid4().hex[:8]}"
+    await session_service.create_session(
+        app_name=app_name, user_id=user_id, session_id=session_id
+    )
+    message = types.Content(
+        role="user", parts=[types.Part(text=prompt.format(alert_id=alert_id))]
+    )
+
+    # High-severity alerts get model quota ahead of low-severity backfill.
+    alert = get_alert_columns().get(alert_id) or {}
+    priority = priority_for_severity(alert.get("severity"))
+
+    guardrail_action: Optional[str] = None
+    error: Optional[str] = None
+    # 429s are retried per model call by the scheduler, never by replaying
+    # the whole conversation here.
+    try:
+        with model_priority(priority), use_scheduler(limiter):
+            async for event in runner.run_async(
+                user_id=user_id, session_id=session_id, new_message=message
+            ):
+                guardrail_action = _guardrail_action_from_event(event) or guardrail_action
+    except Exception as exc:  # noqa: BLE001 - one alert must not sink the batch
+        error = f"{type(exc).__name__}: {exc}"
+
+    session = await session_service.get_session(
+        app_name=app_name, user_id=user_id, session_id=session_id
+    )
+    state = session.state if session is not None else {}
+    summary = state.get("triage_summary")
+    return BatchTriageResult(
+        alert_id=alert_id,
+        session_id=session_id,
+        normalized_action=guardrail_action or extract_normalized_action(state),
+        triage_summary=str(summary) if summary is not None else None,
+        latency_seconds=time.perf_counter() - started,
+        error=error,
+    )
+
+
+async def triage_batch(
+    alert_ids: Optional[Iterable[str]] = None,
+    *,
+    source: Optional[str] = None,
+    severity: Optional[str] = None,
+    category: Optional[str] = None,
+    limit: Optional[int] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    limiter: Optional[ModelCallScheduler] = None,
+    runner: Optional[Runner] = None,
+    session_service: Optional[BaseSessionService] = None,
+    user_id: str = "batch-triage",
+    prompt: str = DEFAULT_PROMPT,
+    policy: Optional[PretriagePolicy] = None,
+    collapse_duplicates: Optional[bool] = None,
+    scan_taint: Optional[bool] = None,
+) -> AsyncIterator[BatchTriageResult]:
+    """
+    Triage many alerts concurrently, yielding results as each one finishes.
+
+    Every alert runs in its own fresh session, so state never leaks between
+    alerts. At most `concurrency` conversations are in flight. Every model
+    call is admitted, and its 429s retried, by one scheduler: `limiter`
+    (e.g. a ProviderRateLimiter) when given, else the process-wide
+    model scheduler. Failures are reported on the result's `error`.
+
+    Alerts matching a pre-triage rule (`policy`, default: the
+    AEGIS_PRETRIAGE_POLICY file) are yielded first, decided by the rule,
+    and never reach the LLM pipeline. Before any rule, alerts whose text
+    carries prompt-injection or fake-execution markers (alert_scanner.py;
+    `scan_taint`, default: AEGIS_TAINT_SCAN) are decided NEEDS_MORE_INFO
+    the same way, with pretriage_rule 'taint_scanner'.
+
+    Near-duplicate alerts (near_duplicates.py; `collapse_duplicates`,
+    default: AEGIS_NEAR_DUP_COLLAPSE) are triaged once: each group's
+    representative runs the pipeline and the other members get its
+    verdict, with `duplicate_of` pointing at it.
+
+    Example:
+        async for result in triage_batch(severity="high", concurrency=16):
+            print(result.alert_id, result.normalized_action)
+    """
+    if runner is None or session_service is None:
+        from .app import app as default_app
+        from .app import session_service as default_session_service
+
+        session_service = session_service or (
+            runner.session_service if runner is not None else default_session_service
+        )
+        runner = runner or Runner(app=default_app, session_service=session_service)
+
+    ids = select_alert_ids(
+        alert_ids, source=source, severity=severity, category=category, limit=limit
+    )
+    policy = policy if policy is not None else get_pretriage_policy()
+    scan = TAINT_SCAN_ENABLED if scan_taint is None else scan_taint
+    if scan or len(policy):
+        columns = get_alert_columns()
+        remaining = []
+        for alert_id in ids:
+            alert = columns.get(alert_id)
+            decision = None
+            if alert is not None:
+                # Tainted text must never reach the model, whatever the policy says.
+                decision = taint_decision(alert) if scan else None
+                if decision is None and len(policy):
+                    decision = policy.decide(alert)
+            if decision is None:
+                remaining.append(alert_id)
+            else:
+                yield BatchTriageResult.from_pretriage(decision)
+        ids = remaining
+    if not ids:
+        return
+
+    duplicates: Dict[str, DuplicateGroup] = {}
+    collapse = NEAR_DUP_COLLAPSE if collapse_duplicates is None else collapse_duplicates
+    if collapse and len(ids) > 1:
+        columns = get_alert_columns()
+        found: Dict[str, Dict[str, Any]] = {}
+        for alert_id in ids:
+            alert = columns.get(alert_id)
+            if alert is not None:
+                found[alert_id] = alert
+        # Unknown ids are triaged (and reported as not found) individually.
+        duplicates = {
+            g.representative: g for g in collapse_near_duplicates(found.values()) if g.duplicates
+        }
+        collapsed = {d for g in duplicates.values() for d in g.duplicates}
+        ids = [alert_id for alert_id in ids if alert_id not in collapsed]
+
+    pending: asyncio.Queue[str] = asyncio.Queue()
+    for alert_id in ids:
+        pending.put_nowait(alert_id)
+    results: asyncio.Queue[BatchTriageResult] = asyncio.Queue()
+
+    async def worker() -> None:
+        while True:
+            try:
+                alert_id = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            try:
+                result = await _triage_one(
+                    alert_id,
+                    runner=runner,
+                    session_service=session_service,
+                    app_name=runner.app_name,
+                    user_id=user_id,
+                    prompt=prompt,
+                    limiter=limiter,
+                )
+            except Exception as exc:  # noqa: BLE001 - e.g. session backend errors
+                result = BatchTriageResult(
+                    alert_id=alert_id,
+                    session_id="",
+                    normalized_action=None,
+                    triage_summary=None,
+                    latency_seconds=time.perf_counter() - started,
+                    error=f"{type(exc).__name__}: {exc}",
+                )
+            await results.put(result)
+
+    workers = [
+        asyncio.create_task(worker()) for _ in range(max(1, min(concurrency, len(ids))))
+    ]
+    try:
+        for _ in range(len(ids)):
+            result = await results.get()
+            yield result
+            group = duplicates.get(result.alert_id)
+            if group is not None:
+                for member in group.duplicates:
+                    yield result.fan_out(member)
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
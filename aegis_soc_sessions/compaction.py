@@ -0,0 +1,279 @@
+"""Prompt compaction for alerts injected into agent instructions.
+
+`raw_alerts` keeps every field of every loaded alert. Before alerts reach a
+prompt template they are compacted here:
+
+  1. per-source field projection (o365 / firewall / edr / siem; nested SIEM
+     `entities` are flattened); every other non-empty field is kept as
+     `name=value` pairs in a trailing `extra` column, so no evidence is lost,
+  2. deduplication of alerts that are identical apart from id/timestamp,
+     with a count and first/last timestamps,
+  3. per-field string caps,
+  4. a pipe-separated table per source, trimmed to a token budget by
+     shortening free text first and then omitting the lowest-severity rows.
+
+The result is stored in state['raw_alerts_compact'] and is what the log
+parser (and the root instruction) read.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# Approximate token budget for the compact table (about 4 characters/token).
+PROMPT_TOKEN_BUDGET = int(os.getenv("AEGIS_PROMPT_TOKEN_BUDGET", "2000"))
+CHARS_PER_TOKEN = 4
+
+# Columns per source, in output order. Dotted names read nested fields.
+SOURCE_FIELDS: Dict[str, List[str]] = {
+    "o365": ["id", "severity", "category", "timestamp", "username", "ip", "location", "description"],
+    "firewall": [
+        "id", "severity", "category", "timestamp", "src_ip", "dst_ip", "ip",
+        "failed_attempts", "description",
+    ],
+    "edr": [
+        "id", "severity", "category", "timestamp", "hostname", "process", "command_line",
+        "action_taken", "description",
+    ],
+    "siem": [
+        "id", "severity", "category", "timestamp", "rule_name", "event_count", "status",
+        "correlated_sources", "entities.username", "entities.src_ip",
+        "entities.dst_ip", "entities.hostname", "description",
+    ],
+}
+DEFAULT_FIELDS = ["id", "source", "severity", "category", "timestamp", "description"]
+# Trailing column holding every non-empty field the source list does not name.
+EXTRA_FIELD = "extra"
+# Named by the table's section header instead of a column.
+_HEADER_FIELDS = {"source"}
+
+# Maximum characters kept per field; anything longer is cut with an ellipsis.
+FIELD_CHAR_CAPS: Dict[str, int] = {
+    "description": 240, "command_line": 120, "rule_name": 60, EXTRA_FIELD: 160,
+}
+DEFAULT_CHAR_CAP = 64
+# Free-text caps are halved down to this floor before rows are dropped.
+MIN_FREE_TEXT_CAP = 40
+FREE_TEXT_FIELDS = ("description", "command_line")
+
+# Fields that do not make two alerts different for deduplication.
+_IDENTITY_FIELDS = ("id", "timestamp")
+_SEVERITY_RANK = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+
+
+def _lookup(alert: Dict[str, Any], field: str) -> Any:
+    value: Any = alert
+    for part in field.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _cell(value: Any, cap: int) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        text = ",".join(str(v) for v in value)
+    else:
+        text = str(value)
+    text = " ".join(text.split()).replace("|", "/")
+    if len(text) > cap:
+        text = text[: max(cap - 1, 0)] + "…"
+    return text
+
+
+def _column(field: str) -> str:
+    return field.split(".")[-1] if field.startswith("entities.") else field
+
+
+def _source_fields(source: str) -> List[str]:
+    return SOURCE_FIELDS.get(source, DEFAULT_FIELDS) + [EXTRA_FIELD]
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or (isinstance(value, (list, tuple, dict)) and not value)
+
+
+def _extra(alert: Dict[str, Any], named: Iterable[str]) -> Optional[str]:
+    skip = set(named) | _HEADER_FIELDS
+    parts = []
+    for name, value in alert.items():
+        if isinstance(value, dict):
+            items = [(f"{name}.{key}", nested) for key, nested in value.items()]
+        else:
+            items = [(name, value)]
+        for key, item in items:
+            if key in skip or _is_empty(item):
+                continue
+            text = ",".join(map(str, item)) if isinstance(item, (list, tuple)) else str(item)
+            parts.append(f"{key}={text}")
+    return "; ".join(parts) or None
+
+
+def project_alert(alert: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The alert's source columns, plus every other non-empty field as
+    `name=value` pairs under EXTRA_FIELD (uncapped).
+    """
+    fields = SOURCE_FIELDS.get(str(alert.get("source")), DEFAULT_FIELDS)
+    row = {field: _lookup(alert, field) for field in fields}
+    row[EXTRA_FIELD] = _extra(alert, fields)
+    return row
+
+
+def dedupe_alerts(alerts: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Collapse alerts that match on every projected field (extra included)
+    except id/timestamp.
+
+    Returns one row per distinct alert, in first-seen order, with
+    '_source', '_count', '_ids', '_first_seen' and '_last_seen' added.
+    """
+    groups: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+    for alert in alerts:
+        source = str(alert.get("source"))
+        row = project_alert(alert)
+        key = (source,) + tuple(
+            repr(value) for field, value in row.items() if field not in _IDENTITY_FIELDS
+        )
+        group = groups.get(key)
+        timestamp = row.get("timestamp")
+        if group is None:
+            row.update(
+                {
+                    "_source": source,
+                    "_count": 1,
+                    "_ids": [row.get("id")],
+                    "_first_seen": timestamp,
+                    "_last_seen": timestamp,
+                }
+            )
+            groups[key] = row
+            continue
+        group["_count"] += 1
+        group["_ids"].append(row.get("id"))
+        if timestamp is not None:
+            if group["_first_seen"] is None or str(timestamp) < str(group["_first_seen"]):
+                group["_first_seen"] = timestamp
+            if group["_last_seen"] is None or str(timestamp) > str(group["_last_seen"]):
+                group["_last_seen"] = timestamp
+    return list(groups.values())
+
+
+def _format_row(row: Dict[str, Any], fields: List[str], caps: Dict[str, int]) -> str:
+    cells = []
+    for field in fields:
+        if field == "timestamp" and row["_count"] > 1 and row["_first_seen"] != row["_last_seen"]:
+            value: Any = f"{row['_first_seen']}..{row['_last_seen']}"
+        else:
+            value = row.get(field)
+        cells.append(_cell(value, caps.get(field, DEFAULT_CHAR_CAP)))
+    cells.append(str(row["_count"]))
+    return "|".join(cells)
+
+
+def _render(rows: List[Dict[str, Any]], caps: Dict[str, int]) -> List[str]:
+    by_source: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        by_source.setdefault(row["_source"], []).append(row)
+    lines: List[str] = []
+    for source, source_rows in by_source.items():
+        fields = _source_fields(source)
+        header = "|".join([_column(f) for f in fields] + ["count"])
+        lines.append(f"# source={source} rows={len(source_rows)}")
+        lines.append(header)
+        lines.extend(_format_row(row, fields, caps) for row in source_rows)
+    return lines
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def compact_alerts(
+    alerts: Iterable[Dict[str, Any]],
+    token_budget: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Encode alerts as a compact per-source table that fits `token_budget`.
+
+    Returns {"text", "alert_count", "row_count", "omitted_rows",
+    "omitted_alerts", "estimated_tokens"}. When rows must be omitted, the
+    highest-severity rows are kept and the table ends with a note listing
+    how many alerts were left out.
+
+    Example output:
+        # source=o365 rows=1
+        id|severity|category|timestamp|username|ip|location|description|extra|count
+        ALERT-001|high|suspicious_login|2025-01-01T12:00:00Z|alice@example.com|...||1
+    """
+    alert_list = list(alerts)
+    budget = PROMPT_TOKEN_BUDGET if token_budget is None else token_budget
+    rows = dedupe_alerts(alert_list)
+    caps = dict(FIELD_CHAR_CAPS)
+
+    def result(kept: List[Dict[str, Any]], note: Optional[str] = None) -> Dict[str, Any]:
+        lines = _render(kept, caps)
+        if note:
+            lines.append(note)
+        text = "\n".join(lines)
+        kept_alerts = sum(row["_count"] for row in kept)
+        return {
+            "text": text,
+            "alert_count": len(alert_list),
+            "row_count": len(kept),
+            "omitted_rows": len(rows) - len(kept),
+            "omitted_alerts": len(alert_list) - kept_alerts,
+            "estimated_tokens": estimate_tokens(text),
+        }
+
+    out = result(rows)
+    # 1) Shorten free text until it fits or reaches the floor.
+    while budget > 0 and out["estimated_tokens"] > budget:
+        shrinkable = [f for f in FREE_TEXT_FIELDS if caps.get(f, DEFAULT_CHAR_CAP) > MIN_FREE_TEXT_CAP]
+        if not shrinkable:
+            break
+        for field in shrinkable:
+            caps[field] = max(MIN_FREE_TEXT_CAP, caps.get(field, DEFAULT_CHAR_CAP) // 2)
+        out = result(rows)
+    if budget <= 0 or out["estimated_tokens"] <= budget:
+        return out
+
+    # 2) Keep the most severe rows (earliest first within a severity) that
+    # fit, costing each row and per-source header by its rendered length.
+    note_chars = len(f"# omitted {len(alert_list)} lower-severity alerts (token budget)") + 1
+    row_chars = [
+        len(_format_row(row, _source_fields(row["_source"]), caps)) + 1
+        for row in rows
+    ]
+    header_chars: Dict[str, int] = {}
+    for row in rows:
+        source = row["_source"]
+        if source not in header_chars:
+            fields = _source_fields(source)
+            header = "|".join([_column(f) for f in fields] + ["count"])
+            header_chars[source] = len(f"# source={source} rows={len(rows)}") + len(header) + 2
+    ranked = sorted(
+        range(len(rows)),
+        key=lambda i: (_SEVERITY_RANK.get(str(rows[i].get("severity")).lower(), 4), i),
+    )
+    limit = budget * CHARS_PER_TOKEN
+    used = note_chars
+    sources_seen: set = set()
+    kept_indexes: List[int] = []
+    for i in ranked:
+        cost = row_chars[i]
+        if rows[i]["_source"] not in sources_seen:
+            cost += header_chars[rows[i]["_source"]]
+        if used + cost > limit and kept_indexes:
+            break
+        used += cost
+        sources_seen.add(rows[i]["_source"])
+        kept_indexes.append(i)
+
+    kept = [rows[i] for i in sorted(kept_indexes)]
+    omitted_alerts = len(alert_list) - sum(row["_count"] for row in kept)
+    return result(kept, f"# omitted {omitted_alerts} lower-severity alerts (token budget)")
@@ -0,0 +1,229 @@
+"""Deterministic cross-alert correlation.
+
+Builds an entity -> alert inverted index over the flat (o365 / firewall /
+edr) and nested SIEM (`entities`) alert schemas, groups alerts that share
+entities with a union-find, and splits each group into time-bucketed
+clusters. The correlation agent then summarizes precomputed clusters instead
+of joining alerts itself.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .alert_stream import parse_timestamp
+
+
+# Alert field -> entity kind. Applied to the top level and to SIEM `entities`.
+ENTITY_FIELDS: Dict[str, str] = {
+    "username": "user",
+    "user": "user",
+    "ip": "ip",
+    "src_ip": "ip",
+    "dst_ip": "ip",
+    "hostname": "host",
+    "host": "host",
+}
+# Fields naming who or what an alert came from (not what it targeted).
+ORIGIN_FIELDS = ("username", "user", "ip", "src_ip", "hostname", "host")
+
+# Per-field findings attached by alert_scanner.tag_alert. Flagged fields
+# are withheld from prompts, so they never become entities either.
+TAINT_FIELD = "taint"
+
+DEFAULT_WINDOW_MINUTES = 60
+# Entities seen on more alerts than this (e.g. a shared gateway IP) are
+# reported but not used to join alerts, so one hub cannot merge everything.
+DEFAULT_MAX_ENTITY_FANOUT = 1000
+
+
+def _normalize(kind: str, value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    if kind in ("user", "host"):
+        text = text.lower()
+    return f"{kind}:{text}"
+
+
+def extract_entities(alert: Dict[str, Any], fields: Optional[Iterable[str]] = None) -> Set[str]:
+    """
+    Return normalized entity keys such as 'user:alice@example.com' or
+    'ip:10.0.0.5', from `fields` (default: every ENTITY_FIELDS entry).
+    Fields flagged under TAINT_FIELD are skipped.
+    """
+    kinds = ENTITY_FIELDS if fields is None else {f: ENTITY_FIELDS[f] for f in fields}
+    entities: Set[str] = set()
+    withheld = alert.get(TAINT_FIELD) or {}
+    sources = [("", alert)]
+    nested = alert.get("entities")
+    if isinstance(nested, dict):
+        sources.append(("entities.", nested))
+    for prefix, source in sources:
+        for field, kind in kinds.items():
+            if prefix + field in withheld:
+                continue
+            key = _normalize(kind, source.get(field))
+            if key is not None:
+                entities.add(key)
+    return entities
+
+
+class _UnionFind:
+    def __init__(self, size: int) -> None:
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def validate_window_minutes(window_minutes: Any) -> int:
+    """`window_minutes` as an int, or ValueError unless it is a whole number >= 1."""
+    if (
+        isinstance(window_minutes, bool)
+        or not isinstance(window_minutes, (int, float))
+        or window_minutes != window_minutes  # NaN
+        or window_minutes < 1
+        or int(window_minutes) != window_minutes
+    ):
+        raise ValueError(f"window_minutes must be a whole number >= 1, got {window_minutes!r}.")
+    return int(window_minutes)
+
+
+def _bucket_label(ts: datetime, window_minutes: int) -> str:
+    minutes = (ts.hour * 60 + ts.minute) // window_minutes * window_minutes
+    start = ts.replace(hour=minutes // 60, minute=minutes % 60, second=0, microsecond=0)
+    return start.isoformat().replace("+00:00", "Z")
+
+
+def _split_by_time(
+    members: List[Tuple[Optional[datetime], int]], window: timedelta
+) -> List[List[Tuple[Optional[datetime], int]]]:
+    """Split a component into runs whose consecutive alerts are within `window`."""
+    timed = sorted((m for m in members if m[0] is not None), key=lambda m: (m[0], m[1]))
+    untimed = [m for m in members if m[0] is None]
+    runs: List[List[Tuple[Optional[datetime], int]]] = []
+    for member in timed:
+        if runs and member[0] - runs[-1][-1][0] <= window:
+            runs[-1].append(member)
+        else:
+            runs.append([member])
+    if untimed:
+        # Without timestamps we cannot split, so keep them with the first run.
+        if runs:
+            runs[0].extend(untimed)
+        else:
+            runs.append(untimed)
+    return runs
+
+
+def build_correlation(
+    alerts: Iterable[Dict[str, Any]],
+    window_minutes: int = DEFAULT_WINDOW_MINUTES,
+    max_entity_fanout: int = DEFAULT_MAX_ENTITY_FANOUT,
+) -> Dict[str, Any]:
+    """
+    Correlate alerts by shared entities and time proximity.
+
+    Returns a JSON-serializable dict with:
+      - alert_count: number of alerts considered
+      - shared_entities: entity -> alert ids, for entities on 2+ alerts
+      - clusters: related alerts (shared entities, consecutive alerts no more
+        than `window_minutes` apart), largest first, each with its shared
+        entities, sources, categories and first/last timestamps
+      - isolated_alert_ids: alerts that share nothing with any other alert
+      - time_buckets: bucket start -> alert ids, in `window_minutes` buckets
+      - high_fanout_entities: entities too common to be used for joining
+
+    Cost is linear in alerts x entities-per-alert plus a sort per cluster.
+    Raises ValueError unless `window_minutes` is a whole number >= 1.
+    """
+    window_minutes = validate_window_minutes(window_minutes)
+    alert_list = list(alerts)
+    ids = [str(a.get("id")) for a in alert_list]
+    timestamps = [parse_timestamp(a.get("timestamp")) for a in alert_list]
+    window = timedelta(minutes=window_minutes)
+
+    entities = [extract_entities(alert) for alert in alert_list]
+    index: Dict[str, List[int]] = {}
+    for i, alert_entities in enumerate(entities):
+        for entity in alert_entities:
+            index.setdefault(entity, []).append(i)
+
+    uf = _UnionFind(len(alert_list))
+    high_fanout: Set[str] = set()
+    for entity, members in index.items():
+        if len(members) > max_entity_fanout:
+            high_fanout.add(entity)
+            continue
+        first = members[0]
+        for other in members[1:]:
+            uf.union(first, other)
+
+    components: Dict[int, List[Tuple[Optional[datetime], int]]] = {}
+    for i in range(len(alert_list)):
+        components.setdefault(uf.find(i), []).append((timestamps[i], i))
+
+    clusters: List[Dict[str, Any]] = []
+    isolated: List[str] = []
+    for members in components.values():
+        for run in _split_by_time(members, window):
+            if len(run) < 2:
+                isolated.append(ids[run[0][1]])
+                continue
+            positions = [i for _, i in run]
+            counts: Counter[str] = Counter()
+            for i in positions:
+                counts.update(entities[i])
+            shared = sorted(
+                entity
+                for entity, count in counts.items()
+                if count >= 2 and entity not in high_fanout
+            )
+            times = [ts for ts, _ in run if ts is not None]
+            clusters.append(
+                {
+                    "alert_ids": [ids[i] for i in positions],
+                    "shared_entities": shared,
+                    "sources": sorted({str(alert_list[i].get("source")) for i in positions}),
+                    "categories": sorted({str(alert_list[i].get("category")) for i in positions}),
+                    "first_seen": min(times).isoformat() if times else None,
+                    "last_seen": max(times).isoformat() if times else None,
+                }
+            )
+
+    clusters.sort(key=lambda c: (-len(c["alert_ids"]), c["first_seen"] or ""))
+    for n, cluster in enumerate(clusters, start=1):
+        cluster["cluster_id"] = f"C{n}"
+
+    time_buckets: Dict[str, List[str]] = {}
+    for i, ts in enumerate(timestamps):
+        if ts is not None:
+            time_buckets.setdefault(_bucket_label(ts, window_minutes), []).append(ids[i])
+
+    return {
+        "alert_count": len(alert_list),
+        "window_minutes": window_minutes,
+        "shared_entities": {
+            entity: [ids[i] for i in members]
+            for entity, members in sorted(index.items())
+            if 2 <= len(members) <= max_entity_fanout
+        },
+        "clusters": clusters,
+        "isolated_alert_ids": sorted(isolated),
+        "time_buckets": dict(sorted(time_buckets.items())),
+        "high_fanout_entities": sorted(high_fanout),
+    }
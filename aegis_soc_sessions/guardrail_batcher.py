@@ -0,0 +1,148 @@
+"""Client-side micro-batching for the guardrail hop.
+
+Concurrent triages each validate one recommendation. GuardrailMicroBatcher
+holds each payload for a few milliseconds (GUARDRAIL_BATCH_WINDOW_MS), then
+sends everything gathered in that window to the guardrail's
+POST /validate/batch as one request on the shared connection pool. The
+rules and cache run in bulk there, and the ambiguous remainder costs one
+model call instead of one per triage. A batch is sent early once it
+reaches GUARDRAIL_BATCH_MAX_ITEMS.
+
+With AEGIS_GUARDRAIL_MODE=batch, the root agent's 'guardrail_agent' tool
+goes through the batcher instead of the per-call A2A agent (see agent.py).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from google.adk.tools.function_tool import FunctionTool
+from google.adk.tools.tool_context import ToolContext
+
+from guardrail_agent.rules import parse_payload
+
+from .guardrail_client import GuardrailHttpPool, guardrail_http_pool
+from .observability import record_guardrail_response
+
+
+GUARDRAIL_BATCH_WINDOW_MS = float(os.getenv("GUARDRAIL_BATCH_WINDOW_MS", "5"))
+GUARDRAIL_BATCH_MAX_ITEMS = int(os.getenv("GUARDRAIL_BATCH_MAX_ITEMS", "32"))
+
+Pending = List[Tuple[Dict[str, Any], "asyncio.Future[Dict[str, Any]]"]]
+
+
+def batch_url_from_card_url(card_url: str) -> str:
+    """The batch endpoint lives on the same host as the agent card."""
+    parsed = urlparse(card_url)
+    if not parsed.scheme or not parsed.netloc:
+        raise ValueError(f"Invalid agent card URL: {card_url}")
+    return f"{parsed.scheme}://{parsed.netloc}/validate/batch"
+
+
+class GuardrailMicroBatcher:
+    """
+    Gathers concurrent validate() calls into POST /validate/batch requests.
+
+    Batches are per event loop. If a batch request fails, every caller in
+    that batch gets the exception.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        pool: Optional[GuardrailHttpPool] = None,
+        window_ms: float = GUARDRAIL_BATCH_WINDOW_MS,
+        max_items: int = GUARDRAIL_BATCH_MAX_ITEMS,
+    ) -> None:
+        self.url = url
+        self.pool = pool or guardrail_http_pool
+        self.window_ms = window_ms
+        self.max_items = max(1, max_items)
+        self._pending: Dict[asyncio.AbstractEventLoop, Pending] = {}
+        self._timers: Dict[asyncio.AbstractEventLoop, asyncio.TimerHandle] = {}
+        self._sending: Set["asyncio.Task[None]"] = set()
+        self.requests = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.failed_batches = 0
+
+    async def validate(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue one payload and wait for its verdict."""
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[Dict[str, Any]]" = loop.create_future()
+        pending = self._pending.setdefault(loop, [])
+        pending.append((dict(payload), future))
+        self.requests += 1
+        if len(pending) >= self.max_items or self.window_ms <= 0:
+            self._flush(loop)
+        elif loop not in self._timers:
+            self._timers[loop] = loop.call_later(self.window_ms / 1000.0, self._flush, loop)
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        timer = self._timers.pop(loop, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(loop, [])
+        if not batch:
+            return
+        task = loop.create_task(self._send(batch))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch: Pending) -> None:
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+        try:
+            response = await self.pool.client().post(
+                self.url, json={"items": [payload for payload, _ in batch]}
+            )
+            response.raise_for_status()
+            verdicts = response.json().get("verdicts")
+            if not isinstance(verdicts, list) or len(verdicts) != len(batch):
+                raise ValueError("guardrail batch response does not match the request")
+        except Exception as exc:
+            self.failed_batches += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), verdict in zip(batch, verdicts):
+            if not future.done():
+                future.set_result(verdict)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "window_ms": self.window_ms,
+            "max_items": self.max_items,
+            "requests": self.requests,
+            "batches": self.batches,
+            "largest_batch": self.largest_batch,
+            "failed_batches": self.failed_batches,
+            "mean_batch_size": (self.requests / self.batches) if self.batches else 0.0,
+        }
+
+
+def build_guardrail_batch_tool(batcher: GuardrailMicroBatcher) -> FunctionTool:
+    """
+    A 'guardrail_agent' tool backed by the micro-batcher. It takes the same
+    `request` string as the A2A AgentTool and returns the verdict JSON.
+    """
+
+    async def guardrail_agent(request: str, tool_context: ToolContext) -> str:
+        """Validate a triage recommendation: a JSON payload with proposed_action, evidence_summary and triage_summary."""
+        payload = parse_payload(request)
+        if payload is None:
+            # Free text is never auto-approved: the rules see no action and
+            # the model judges the whole message.
+            payload = {"proposed_action": "", "evidence_summary": "", "triage_summary": request}
+        verdict = await batcher.validate(payload)
+        record_guardrail_response(tool_context.state, payload, verdict)
+        return json.dumps(verdict)
+
+    return FunctionTool(guardrail_agent)
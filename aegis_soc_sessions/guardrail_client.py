@@ -0,0 +1,426 @@
+"""Pooled, keep-alive client layer for the remote guardrail (A2A) hop.
+
+Every triage calls the guardrail agent. A bare RemoteA2aAgent resolves its
+agent card and opens connections on its own; here one pooled httpx client
+(HTTP/2 when `h2` is installed) is shared by every call, the agent card is
+resolved once and refreshed on a TTL, and each HTTP call is timed into
+GuardrailCallMetrics.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+from a2a.client import A2ACardResolver
+from google.adk.agents.remote_a2a_agent import RemoteA2aAgent
+
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration -----------------------------------------------------------
+
+GUARDRAIL_AGENT_CARD_TTL_SECONDS = float(
+    os.getenv("GUARDRAIL_AGENT_CARD_TTL_SECONDS", "300")
+)
+GUARDRAIL_HTTP_TIMEOUT_SECONDS = float(os.getenv("GUARDRAIL_HTTP_TIMEOUT_SECONDS", "120"))
+GUARDRAIL_HTTP_CONNECT_TIMEOUT_SECONDS = float(
+    os.getenv("GUARDRAIL_HTTP_CONNECT_TIMEOUT_SECONDS", "5")
+)
+GUARDRAIL_HTTP_MAX_CONNECTIONS = int(os.getenv("GUARDRAIL_HTTP_MAX_CONNECTIONS", "32"))
+GUARDRAIL_HTTP_MAX_KEEPALIVE = int(os.getenv("GUARDRAIL_HTTP_MAX_KEEPALIVE", "16"))
+GUARDRAIL_HTTP_KEEPALIVE_EXPIRY_SECONDS = float(
+    os.getenv("GUARDRAIL_HTTP_KEEPALIVE_EXPIRY_SECONDS", "30")
+)
+# Times a request rejected with 429 (guardrail saturated) is retried after the
+# server's Retry-After, capped at GUARDRAIL_HTTP_MAX_RETRY_AFTER_SECONDS.
+GUARDRAIL_HTTP_429_RETRIES = int(os.getenv("GUARDRAIL_HTTP_429_RETRIES", "3"))
+GUARDRAIL_HTTP_MAX_RETRY_AFTER_SECONDS = float(
+    os.getenv("GUARDRAIL_HTTP_MAX_RETRY_AFTER_SECONDS", "30")
+)
+# "auto" enables HTTP/2 only when the optional `h2` package is installed.
+GUARDRAIL_HTTP2 = os.getenv("GUARDRAIL_HTTP2", "auto").strip().lower()
+
+# Latency samples kept per route for percentiles.
+METRIC_SAMPLE_SIZE = 1024
+
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def _http2_enabled(setting: str = GUARDRAIL_HTTP2) -> bool:
+    if setting in ("0", "false", "no", "off"):
+        return False
+    if setting in ("1", "true", "yes", "on") and not http2_available():
+        logger.warning("GUARDRAIL_HTTP2 is set but 'h2' is not installed; using HTTP/1.1.")
+        return False
+    return http2_available()
+
+
+# --- Per-call latency metrics ------------------------------------------------
+
+
+def _percentile(sorted_samples: list, pct: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(pct / 100.0 * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+class GuardrailCallMetrics:
+    """Count, error/429 counts and latency distribution per route (e.g. 'POST /')."""
+
+    def __init__(self, sample_size: int = METRIC_SAMPLE_SIZE) -> None:
+        self.sample_size = sample_size
+        self._routes: Dict[str, Dict[str, Any]] = {}
+
+    def _route(self, route: str) -> Dict[str, Any]:
+        entry = self._routes.get(route)
+        if entry is None:
+            entry = {
+                "count": 0,
+                "errors": 0,
+                "throttled": 0,
+                "total_seconds": 0.0,
+                "max_seconds": 0.0,
+                "samples": deque(maxlen=self.sample_size),
+            }
+            self._routes[route] = entry
+        return entry
+
+    def record(self, route: str, seconds: float, error: bool = False, throttled: bool = False) -> None:
+        entry = self._route(route)
+        entry["count"] += 1
+        entry["errors"] += int(error)
+        entry["throttled"] += int(throttled)
+        entry["total_seconds"] += seconds
+        entry["max_seconds"] = max(entry["max_seconds"], seconds)
+        samples: Deque[float] = entry["samples"]
+        samples.append(seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """JSON-serializable view: count, errors, mean/p50/p95/p99/max seconds."""
+        out: Dict[str, Dict[str, Any]] = {}
+        for route, entry in sorted(self._routes.items()):
+            samples = sorted(entry["samples"])
+            count = entry["count"]
+            out[route] = {
+                "count": count,
+                "errors": entry["errors"],
+                "throttled": entry["throttled"],
+                "mean_seconds": entry["total_seconds"] / count if count else 0.0,
+                "p50_seconds": _percentile(samples, 50),
+                "p95_seconds": _percentile(samples, 95),
+                "p99_seconds": _percentile(samples, 99),
+                "max_seconds": entry["max_seconds"],
+            }
+        return out
+
+    def reset(self) -> None:
+        self._routes.clear()
+
+
+def _retry_after_seconds(response: httpx.Response, cap: float) -> float:
+    try:
+        value = float(response.headers.get("retry-after", "1"))
+    except ValueError:
+        # HTTP-date form; not worth parsing for an in-cluster service.
+        value = 1.0
+    return max(0.0, min(value, cap))
+
+
+class _TimedTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps a transport, records the wall time of every request, and backs off
+    and retries when the guardrail sheds load with 429 + Retry-After.
+    """
+
+    def __init__(
+        self,
+        inner: httpx.AsyncBaseTransport,
+        metrics: GuardrailCallMetrics,
+        max_429_retries: int = GUARDRAIL_HTTP_429_RETRIES,
+        max_retry_after: float = GUARDRAIL_HTTP_MAX_RETRY_AFTER_SECONDS,
+    ) -> None:
+        self._inner = inner
+        self._metrics = metrics
+        self._max_429_retries = max_429_retries
+        self._max_retry_after = max_retry_after
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        route = f"{request.method} {request.url.path}"
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = await self._inner.handle_async_request(request)
+            except Exception:
+                self._metrics.record(route, time.perf_counter() - started, error=True)
+                raise
+            throttled = response.status_code == 429
+            self._metrics.record(
+                route,
+                time.perf_counter() - started,
+                error=response.status_code >= 500,
+                throttled=throttled,
+            )
+            if not throttled or attempt >= self._max_429_retries:
+                return response
+            attempt += 1
+            delay = _retry_after_seconds(response, self._max_retry_after)
+            await response.aclose()
+            await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+# --- Connection pool ---------------------------------------------------------
+
+
+class GuardrailHttpPool:
+    """
+    Lazily builds one keep-alive httpx.AsyncClient and hands it to every
+    guardrail call.
+
+    httpx clients are bound to the event loop that first used them, so a new
+    client is built when called from a different loop (e.g. successive
+    asyncio.run() calls in scripts and tests).
+    """
+
+    def __init__(
+        self,
+        *,
+        timeout: float = GUARDRAIL_HTTP_TIMEOUT_SECONDS,
+        connect_timeout: float = GUARDRAIL_HTTP_CONNECT_TIMEOUT_SECONDS,
+        max_connections: int = GUARDRAIL_HTTP_MAX_CONNECTIONS,
+        max_keepalive: int = GUARDRAIL_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry: float = GUARDRAIL_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        http2: Optional[bool] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        metrics: Optional[GuardrailCallMetrics] = None,
+    ) -> None:
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = _http2_enabled() if http2 is None else http2
+        self.metrics = metrics or GuardrailCallMetrics()
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.clients_created = 0
+
+    def _build(self) -> httpx.AsyncClient:
+        inner = self._transport or httpx.AsyncHTTPTransport(
+            http2=self.http2, limits=self.limits
+        )
+        self.clients_created += 1
+        return httpx.AsyncClient(
+            transport=_TimedTransport(inner, self.metrics),
+            timeout=self.timeout,
+            limits=self.limits,
+        )
+
+    def client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = self._build()
+            self._loop = loop
+        return self._client
+
+    async def aclose(self) -> None:
+        client, self._client, self._loop = self._client, None, None
+        if client is not None and not client.is_closed:
+            await client.aclose()
+
+
+# --- Agent card cache --------------------------------------------------------
+
+
+class AgentCardCache:
+    """
+    Resolves the guardrail agent card once and re-fetches it after
+    `ttl_seconds`. If a refresh fails, the last good card keeps being served
+    (and the refresh is retried on the next call).
+    """
+
+    def __init__(
+        self,
+        card_url: str,
+        pool: GuardrailHttpPool,
+        ttl_seconds: float = GUARDRAIL_AGENT_CARD_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        parsed = urlparse(card_url)
+        if not parsed.scheme or not parsed.netloc:
+            raise ValueError(f"Invalid agent card URL: {card_url}")
+        self.card_url = card_url
+        self.pool = pool
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._base_url = f"{parsed.scheme}://{parsed.netloc}"
+        self._card_path = parsed.path
+        self._card: Any = None
+        self._fetched_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.fetches = 0
+        self.hits = 0
+
+    def _expired(self) -> bool:
+        return self._card is None or (
+            self.ttl_seconds > 0 and self._clock() - self._fetched_at >= self.ttl_seconds
+        )
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    async def _fetch(self) -> Any:
+        resolver = A2ACardResolver(httpx_client=self.pool.client(), base_url=self._base_url)
+        self.fetches += 1
+        return await resolver.get_agent_card(relative_card_path=self._card_path)
+
+    async def get(self, force_refresh: bool = False) -> Any:
+        if not force_refresh and not self._expired():
+            self.hits += 1
+            return self._card
+        async with self._get_lock():
+            # Another caller may have refreshed while we waited.
+            if not force_refresh and not self._expired():
+                self.hits += 1
+                return self._card
+            try:
+                card = await self._fetch()
+            except Exception:
+                if self._card is None:
+                    raise
+                logger.warning(
+                    "Refreshing guardrail agent card from %s failed; serving cached card.",
+                    self.card_url,
+                    exc_info=True,
+                )
+                return self._card
+            self._card = card
+            self._fetched_at = self._clock()
+            return card
+
+    def invalidate(self) -> None:
+        self._card = None
+        self._fetched_at = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "card_url": self.card_url,
+            "ttl_seconds": self.ttl_seconds,
+            "fetches": self.fetches,
+            "hits": self.hits,
+            "cached": self._card is not None,
+        }
+
+
+# --- Remote agent ------------------------------------------------------------
+
+# RemoteA2aAgent only accepts its card and HTTP client at construction, but the
+# card is refreshed on a TTL and the pooled client changes with the event loop,
+# so PooledRemoteA2aAgent swaps these private attributes itself. They are
+# checked against the pinned google-adk release (requirements.txt) at
+# construction and by tests/test_guardrail_client.py.
+RESOLUTION_ATTRS = (
+    "_agent_card",
+    "_httpx_client",
+    "_httpx_client_needs_cleanup",
+    "_a2a_client_factory",
+    "_a2a_client",
+    "_is_resolved",
+)
+
+
+class PooledRemoteA2aAgent(RemoteA2aAgent):
+    """
+    RemoteA2aAgent that takes its agent card from an AgentCardCache and its
+    HTTP client from a GuardrailHttpPool instead of resolving both itself.
+    The A2A client is rebuilt only when the card is refreshed or the pool
+    hands out a new client.
+    """
+
+    def __init__(
+        self,
+        *,
+        name: str,
+        card_cache: AgentCardCache,
+        description: str = "",
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(
+            name=name,
+            description=description,
+            agent_card=card_cache.card_url,
+            **kwargs,
+        )
+        missing = [attr for attr in RESOLUTION_ATTRS if not hasattr(self, attr)]
+        if missing:
+            raise RuntimeError(
+                "This google-adk release no longer exposes RemoteA2aAgent attributes "
+                f"{missing}; PooledRemoteA2aAgent needs updating."
+            )
+        self._card_cache = card_cache
+
+    def use_pool(self, pool: GuardrailHttpPool) -> GuardrailHttpPool:
+        """
+        Send later calls through `pool` (e.g. one on an in-process transport)
+        and drop the cached card so it is fetched through it. Returns the
+        previous pool so the caller can restore it.
+        """
+        previous = self._card_cache.pool
+        self._card_cache.pool = pool
+        self._card_cache.invalidate()
+        return previous
+
+    async def _ensure_resolved(self, ctx: Any = None) -> Any:
+        client = self._card_cache.pool.client()
+        card = await self._card_cache.get()
+        if card is not self._agent_card or client is not self._httpx_client:
+            if card is not self._agent_card:
+                await self._validate_agent_card(card)
+            self._agent_card = card
+            self._httpx_client = client
+            # The pool owns the client; RemoteA2aAgent.cleanup must not close it.
+            self._httpx_client_needs_cleanup = False
+            self._a2a_client_factory = None
+            self._a2a_client = None
+            self._is_resolved = False
+        return await super()._ensure_resolved(ctx)
+
+
+def build_guardrail_remote_agent(
+    card_url: str,
+    *,
+    name: str = "guardrail_agent",
+    description: str = "",
+    pool: Optional[GuardrailHttpPool] = None,
+    card_ttl_seconds: float = GUARDRAIL_AGENT_CARD_TTL_SECONDS,
+) -> PooledRemoteA2aAgent:
+    """Create the remote guardrail agent on a shared pool and card cache."""
+    pool = pool or guardrail_http_pool
+    cache = AgentCardCache(card_url, pool, ttl_seconds=card_ttl_seconds)
+    return PooledRemoteA2aAgent(name=name, description=description, card_cache=cache)
+
+
+# Process-wide pool shared by every guardrail call; metrics live on it.
+guardrail_http_pool = GuardrailHttpPool()
+guardrail_call_metrics = guardrail_http_pool.metrics
@@ -0,0 +1,419 @@
+"""Hot-path latency, token and retry instrumentation for every agent hop.
+
+ADK callbacks open a monotonic timing span around each agent run, tool call
+(including the AgentTool-wrapped log parser, correlator and A2A guardrail)
+and model call. Closed spans are written to state['events'] as 'span' and
+'model_usage' StructuredEvents and aggregated into a process-wide
+MetricsRegistry, which renders Prometheus text / OpenMetrics and can be
+served from a local endpoint (AEGIS_METRICS_PORT).
+
+Retries made by the genai client under `retry_config` happen below ADK.
+With AEGIS_COUNT_CLIENT_RETRIES=on they are counted from the client's retry
+log records and attributed to the model call in flight. The client only
+creates those records at INFO, so counting lowers that logger's level
+(records below its previous level are dropped again after counting); it is
+off by default.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.adk.agents import LlmAgent
+
+from .guardrail_client import guardrail_call_metrics
+from .observability import EVENT_MODEL_USAGE, EVENT_SPAN, record_event
+
+
+# Local metrics endpoint; unset (the default) means no server is started.
+METRICS_PORT = os.getenv("AEGIS_METRICS_PORT") or None
+METRICS_HOST = os.getenv("AEGIS_METRICS_HOST", "127.0.0.1")
+
+# Count genai client retries from its log (see install_retry_counter).
+COUNT_CLIENT_RETRIES = os.getenv("AEGIS_COUNT_CLIENT_RETRIES", "off").strip().lower() not in (
+    "0", "off", "false", "no",
+)
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+# --- Metrics registry --------------------------------------------------------
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and histograms with Prometheus text rendering."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Dict[str, Any]]] = {}
+
+    def describe(self, name: str, kind: str, help_text: str) -> None:
+        self._help[name] = (kind, help_text)
+
+    def inc(self, name: str, labels: Dict[str, str], value: float = 1.0) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, labels: Dict[str, str], value: float) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = float(value)
+
+    def observe(self, name: str, labels: Dict[str, str], value: float) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = {"buckets": [0] * len(self.buckets), "count": 0, "sum": 0.0}
+                series[key] = hist
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    hist["buckets"][i] += 1
+            hist["count"] += 1
+            hist["sum"] += value
+
+    def counter_value(self, name: str, labels: Dict[str, str]) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(tuple(sorted(labels.items())), 0.0)
+
+    def gauge_value(self, name: str, labels: Dict[str, str]) -> Optional[float]:
+        with self._lock:
+            return self._gauges.get(name, {}).get(tuple(sorted(labels.items())))
+
+    def histogram_count(self, name: str, labels: Dict[str, str]) -> int:
+        with self._lock:
+            hist = self._histograms.get(name, {}).get(tuple(sorted(labels.items())))
+            return hist["count"] if hist else 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def render(self, openmetrics: bool = False) -> str:
+        """Render every series in Prometheus text format (or OpenMetrics)."""
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                # OpenMetrics names the counter family without the _total suffix.
+                family = name[: -len("_total")] if openmetrics and name.endswith("_total") else name
+                self._header(lines, name, family, "counter")
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+            for name in sorted(self._gauges):
+                self._header(lines, name, name, "gauge")
+                for labels, value in sorted(self._gauges[name].items()):
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+            for name in sorted(self._histograms):
+                self._header(lines, name, name, "histogram")
+                for labels, hist in sorted(self._histograms[name].items()):
+                    for bound, count in zip(self.buckets, hist["buckets"]):
+                        le = ("le", _format_value(float(bound)))
+                        lines.append(f"{name}_bucket{_format_labels(labels, le)} {count}")
+                    inf = ("le", "+Inf")
+                    lines.append(f"{name}_bucket{_format_labels(labels, inf)} {hist['count']}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {hist['count']}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(hist['sum'])}")
+        lines.extend(_guardrail_http_lines())
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, lines: List[str], name: str, family: str, kind: str) -> None:
+        help_text = self._help.get(name, (kind, name))[1]
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {kind}")
+
+
+def _guardrail_http_lines() -> List[str]:
+    """Export the guardrail client's per-route latency as a summary."""
+    snapshot = guardrail_call_metrics.snapshot()
+    if not snapshot:
+        return []
+    name = "aegis_guardrail_http_request_seconds"
+    lines = [
+        f"# HELP {name} Latency of HTTP calls to the remote guardrail agent.",
+        f"# TYPE {name} summary",
+    ]
+    for route, stats in snapshot.items():
+        labels: LabelKey = (("route", route),)
+        for quantile, field in (("0.5", "p50_seconds"), ("0.95", "p95_seconds"), ("0.99", "p99_seconds")):
+            lines.append(
+                f"{name}{_format_labels(labels, ('quantile', quantile))} {_format_value(stats[field])}"
+            )
+        lines.append(f"{name}_count{_format_labels(labels)} {stats['count']}")
+        lines.append(
+            f"{name}_sum{_format_labels(labels)} "
+            f"{_format_value(stats['mean_seconds'] * stats['count'])}"
+        )
+    return lines
+
+
+registry = MetricsRegistry()
+registry.describe("aegis_span_duration_seconds", "histogram", "Duration of agent, tool and model spans.")
+registry.describe("aegis_model_calls_total", "counter", "Model calls per agent.")
+registry.describe("aegis_model_tokens_total", "counter", "Prompt/response tokens per agent.")
+registry.describe("aegis_model_bytes_total", "counter", "Prompt/response text bytes per agent.")
+registry.describe("aegis_model_retries_total", "counter", "Retries made by the genai client under retry_config.")
+
+
+# --- Spans -------------------------------------------------------------------
+
+# Open span start times keyed by (kind, invocation id, agent or call id).
+_span_starts: Dict[Tuple[str, str, str], float] = {}
+
+# The model call in flight in this task, so retries can be attributed to it.
+_current_model_call: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "aegis_current_model_call", default=None
+)
+
+
+def _close_span(
+    state: Any, kind: str, name: str, key: Tuple[str, str, str], extra: Optional[Dict[str, Any]] = None
+) -> Optional[float]:
+    started = _span_starts.pop(key, None)
+    if started is None:
+        return None
+    duration = time.perf_counter() - started
+    registry.observe("aegis_span_duration_seconds", {"kind": kind, "name": name}, duration)
+    details: Dict[str, Any] = {"kind": kind, "name": name, "duration_ms": round(duration * 1000, 3)}
+    if extra:
+        details.update(extra)
+    record_event(state=state, event_type=EVENT_SPAN, actor=name, details=details)
+    return duration
+
+
+def start_agent_span(callback_context: Any) -> None:
+    key = ("agent", callback_context.invocation_id, callback_context.agent_name)
+    _span_starts[key] = time.perf_counter()
+    return None
+
+
+def end_agent_span(callback_context: Any) -> None:
+    name = callback_context.agent_name
+    _close_span(callback_context.state, "agent", name, ("agent", callback_context.invocation_id, name))
+    return None
+
+
+def start_tool_span(tool: Any, args: Dict[str, Any], tool_context: Any) -> None:
+    key = ("tool", tool_context.invocation_id, tool_context.function_call_id or tool.name)
+    _span_starts[key] = time.perf_counter()
+    return None
+
+
+def end_tool_span(tool: Any, args: Dict[str, Any], tool_context: Any, tool_response: Any) -> None:
+    key = ("tool", tool_context.invocation_id, tool_context.function_call_id or tool.name)
+    _close_span(tool_context.state, "tool", tool.name, key, {"agent": tool_context.agent_name})
+    return None
+
+
+def _text_bytes(contents: Any) -> int:
+    total = 0
+    for content in contents or []:
+        for part in getattr(content, "parts", None) or []:
+            if getattr(part, "text", None):
+                total += len(part.text.encode("utf-8"))
+            elif getattr(part, "function_call", None) is not None:
+                total += len(str(part.function_call.args or {}).encode("utf-8"))
+            elif getattr(part, "function_response", None) is not None:
+                total += len(str(part.function_response.response or {}).encode("utf-8"))
+    return total
+
+
+def start_model_span(callback_context: Any, llm_request: Any) -> None:
+    name = callback_context.agent_name
+    _span_starts[("model", callback_context.invocation_id, name)] = time.perf_counter()
+    prompt_bytes = _text_bytes(llm_request.contents)
+    system_instruction = getattr(llm_request.config, "system_instruction", None)
+    if isinstance(system_instruction, str):
+        prompt_bytes += len(system_instruction.encode("utf-8"))
+    _current_model_call.set({"agent": name, "retries": 0, "prompt_bytes": prompt_bytes})
+    return None
+
+
+def end_model_span(callback_context: Any, llm_response: Any) -> None:
+    if getattr(llm_response, "partial", False):
+        return None
+    name = callback_context.agent_name
+    call = _current_model_call.get() or {"retries": 0, "prompt_bytes": 0}
+    _current_model_call.set(None)
+
+    usage = llm_response.usage_metadata
+    prompt_tokens = (usage.prompt_token_count or 0) if usage else 0
+    response_tokens = (usage.candidates_token_count or 0) if usage else 0
+    response_bytes = _text_bytes([llm_response.content] if llm_response.content else [])
+    usage_details = {
+        "model": getattr(llm_response, "model_version", None),
+        "prompt_tokens": prompt_tokens,
+        "response_tokens": response_tokens,
+        "total_tokens": (usage.total_token_count or 0) if usage else 0,
+        "cached_tokens": (usage.cached_content_token_count or 0) if usage else 0,
+        "prompt_bytes": call["prompt_bytes"],
+        "response_bytes": response_bytes,
+        "retries": call["retries"],
+    }
+
+    labels = {"agent": name}
+    registry.inc("aegis_model_calls_total", labels)
+    registry.inc("aegis_model_tokens_total", {**labels, "direction": "prompt"}, prompt_tokens)
+    registry.inc("aegis_model_tokens_total", {**labels, "direction": "response"}, response_tokens)
+    registry.inc("aegis_model_bytes_total", {**labels, "direction": "prompt"}, call["prompt_bytes"])
+    registry.inc("aegis_model_bytes_total", {**labels, "direction": "response"}, response_bytes)
+
+    state = callback_context.state
+    _close_span(state, "model", name, ("model", callback_context.invocation_id, name))
+    record_event(state=state, event_type=EVENT_MODEL_USAGE, actor=name, details=usage_details)
+    return None
+
+
+def fail_model_span(callback_context: Any, llm_request: Any, error: Exception) -> None:
+    """Close the span of a model call that raised, so its start is not kept forever."""
+    name = callback_context.agent_name
+    _current_model_call.set(None)
+    key = ("model", callback_context.invocation_id, name)
+    _close_span(callback_context.state, "model", name, key, {"error": type(error).__name__})
+    return None
+
+
+def fail_tool_span(tool: Any, args: Dict[str, Any], tool_context: Any, error: Exception) -> None:
+    key = ("tool", tool_context.invocation_id, tool_context.function_call_id or tool.name)
+    details = {"agent": tool_context.agent_name, "error": type(error).__name__}
+    _close_span(tool_context.state, "tool", tool.name, key, details)
+    return None
+
+
+def instrument_agent(agent: LlmAgent) -> LlmAgent:
+    """
+    Add the span callbacks to an agent, keeping any callbacks it already has.
+    Spans start before and end after the agent's own callbacks, so they
+    cover them.
+    """
+    for field, callback, first in (
+        ("before_agent_callback", start_agent_span, True),
+        ("after_agent_callback", end_agent_span, False),
+        ("before_model_callback", start_model_span, True),
+        ("after_model_callback", end_model_span, False),
+        ("before_tool_callback", start_tool_span, True),
+        ("after_tool_callback", end_tool_span, False),
+        # Error callbacks stop at the first non-None result; ours return None.
+        ("on_model_error_callback", fail_model_span, True),
+        ("on_tool_error_callback", fail_tool_span, True),
+    ):
+        current = getattr(agent, field)
+        callbacks = [] if current is None else list(current) if isinstance(current, list) else [current]
+        if callback not in callbacks:
+            callbacks = [callback] + callbacks if first else callbacks + [callback]
+            setattr(agent, field, callbacks)
+    return agent
+
+
+# --- Retry counting ----------------------------------------------------------
+
+
+class _RetryCounter(logging.Filter):
+    """
+    Counts the genai client's "Retrying ..." records and attributes them to
+    the model call in flight. Records below `passthrough_level` are dropped
+    after inspection, so lowering the logger level to see the retry records
+    does not change what the application's handlers receive.
+    """
+
+    def __init__(self, passthrough_level: int) -> None:
+        super().__init__()
+        self.passthrough_level = passthrough_level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.msg, str) and record.msg.startswith("Retrying "):
+            call = _current_model_call.get()
+            if call is not None:
+                call["retries"] += 1
+            agent = call["agent"] if call is not None else "unknown"
+            registry.inc("aegis_model_retries_total", {"agent": agent})
+        return record.levelno >= self.passthrough_level
+
+
+_retry_counter: Optional[_RetryCounter] = None
+
+
+def install_retry_counter(logger_name: str = "google_genai._api_client") -> None:
+    """
+    Hook the genai retry log (idempotent). Lowers `logger_name` to INFO,
+    which affects the whole process; build_agents() only calls it when
+    AEGIS_COUNT_CLIENT_RETRIES is on.
+    """
+    global _retry_counter
+    if _retry_counter is not None:
+        return
+    genai_logger = logging.getLogger(logger_name)
+    _retry_counter = _RetryCounter(passthrough_level=genai_logger.getEffectiveLevel())
+    genai_logger.addFilter(_retry_counter)
+    if genai_logger.getEffectiveLevel() > logging.INFO:
+        genai_logger.setLevel(logging.INFO)
+
+
+# --- Local endpoint ----------------------------------------------------------
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        openmetrics = "application/openmetrics-text" in (self.headers.get("Accept") or "")
+        body = registry.render(openmetrics=openmetrics).encode("utf-8")
+        self.send_response(200)
+        self.send_header(
+            "Content-Type", OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE
+        )
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        return None
+
+
+def serve_metrics(port: int, host: str = METRICS_HOST) -> ThreadingHTTPServer:
+    """Serve GET /metrics from a daemon thread; returns the running server."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="aegis-metrics", daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,98 @@
+"""Per-session memoization of the parser and correlator sub-agents.
+
+Follow-up questions in a session usually concern the alerts that are
+already loaded. The root model still tends to call load_synthetic_alerts,
+log_parser_agent and correlation_agent again. Each sub-agent call costs its
+own model call and produces the same answer.
+
+load_synthetic_alerts stores a content hash of the loaded alert set in
+state['raw_alerts_key']. MemoizedAgentTool then returns the sub-agent's
+stored output (e.g. state['parsed_alerts']) without running it, as long as
+the state it depends on is unchanged since that output was produced. The
+dependencies are the alert set and, for the correlator, the correlation
+graph. A different alert set, or a re-run of correlate_alerts with a new
+window, runs the sub-agent again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+from google.adk.agents import LlmAgent
+from google.adk.tools.agent_tool import AgentTool
+from google.adk.tools.tool_context import ToolContext
+
+from .observability import EVENT_TOOL_CALL, record_event
+
+
+# Content hash of the alerts currently in state['raw_alerts'].
+ALERT_SET_KEY_STATE = "raw_alerts_key"
+# {tool name: dependency digest its stored output was produced from}.
+AGENT_MEMO_STATE = "agent_memo"
+
+
+def _digest(value: Any) -> str:
+    blob = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def alert_set_key(alerts: Iterable[Dict[str, Any]]) -> str:
+    """Order-independent content hash of an alert set."""
+    return _digest(sorted((_digest(alert) for alert in alerts)))
+
+
+class MemoizedAgentTool(AgentTool):
+    """
+    AgentTool that reuses the wrapped agent's `output_key` value while the
+    state keys in `depends_on` are unchanged.
+
+    The first dependency must be present for memoization to apply, which
+    is normally ALERT_SET_KEY_STATE. Without loaded alerts every call runs
+    the agent.
+    """
+
+    def __init__(
+        self,
+        agent: LlmAgent,
+        depends_on: Sequence[str] = (ALERT_SET_KEY_STATE,),
+        **kwargs: Any,
+    ) -> None:
+        if not agent.output_key:
+            raise ValueError(f"{agent.name} needs an output_key to be memoized")
+        super().__init__(agent=agent, **kwargs)
+        self._depends_on = tuple(depends_on)
+        self.hits = 0
+        self.misses = 0
+
+    def _dependency_digest(self, state: Any) -> Optional[str]:
+        values = [state.get(key) for key in self._depends_on]
+        if not values or values[0] is None:
+            return None
+        return _digest(values)
+
+    async def run_async(self, *, args: Dict[str, Any], tool_context: ToolContext) -> Any:
+        state = tool_context.state
+        digest = self._dependency_digest(state)
+        memo = dict(state.get(AGENT_MEMO_STATE) or {})
+        stored = state.get(self.agent.output_key)
+        if digest is not None and memo.get(self.name) == digest and stored:
+            self.hits += 1
+            record_event(
+                state=state,
+                event_type=EVENT_TOOL_CALL,
+                actor=self.name,
+                details={"memoized": True, "output_key": self.agent.output_key},
+            )
+            return stored
+
+        self.misses += 1
+        result = await super().run_async(args=args, tool_context=tool_context)
+        if digest is not None:
+            memo[self.name] = digest
+            state[AGENT_MEMO_STATE] = memo
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {"tool": self.name, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,267 @@
+"""Record/replay layer for the Gemini models used by the agents.
+
+Agents get their model from build_model(). By default (AEGIS_MODEL_MODE=live)
+that is a Gemini instance whose calls go through the shared model call
+scheduler (model_scheduler.py). In the other modes it is wrapped in a
+CassetteLlm, which keys every request by a hash of its model-visible content:
+
+  - record: call Gemini and write the responses to the cassette
+  - replay: answer only from the cassette (CassetteMissError otherwise);
+            no network access or API key is needed
+  - auto:   replay when the cassette has the request, record otherwise
+
+Cassettes are one JSON file per request under AEGIS_CASSETTE_DIR.
+
+Typical use:
+    AEGIS_MODEL_MODE=record pytest tests/test_phase6_evaluation.py   # once, with a key
+    AEGIS_MODEL_MODE=replay pytest tests/test_phase6_evaluation.py   # offline, in seconds
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, AsyncGenerator, Dict, Iterable, Iterator, List, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.google_llm import Gemini
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from .model_scheduler import (
+    DEFAULT_RATE_LIMIT_ATTEMPTS,
+    MODEL_SCHEDULER_ENABLED,
+    ScheduledGemini,
+    without_rate_limit_retries,
+)
+
+
+MODE_LIVE = "live"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+MODE_AUTO = "auto"
+MODEL_MODES = (MODE_LIVE, MODE_RECORD, MODE_REPLAY, MODE_AUTO)
+
+MODEL_MODE = os.getenv("AEGIS_MODEL_MODE", MODE_LIVE).strip().lower()
+CASSETTE_DIR = os.getenv(
+    "AEGIS_CASSETTE_DIR",
+    str(Path(__file__).resolve().parent.parent / "tests" / "eval" / "cassettes"),
+)
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+# --- Request keys ------------------------------------------------------------
+
+
+def _canonical_part(part: types.Part) -> Dict[str, Any]:
+    # Function call/response ids are random per run, so they are left out.
+    if part.function_call is not None:
+        return {"function_call": {"name": part.function_call.name, "args": part.function_call.args or {}}}
+    if part.function_response is not None:
+        return {
+            "function_response": {
+                "name": part.function_response.name,
+                "response": part.function_response.response or {},
+            }
+        }
+    if part.text is not None:
+        return {"text": part.text, "thought": bool(part.thought)}
+    if part.inline_data is not None:
+        data = part.inline_data.data or b""
+        return {"inline_data": hashlib.sha256(data).hexdigest()}
+    return {}
+
+
+def _canonical_content(content: Any) -> Dict[str, Any]:
+    if isinstance(content, str):
+        return {"text": content}
+    return {
+        "role": getattr(content, "role", None),
+        "parts": [_canonical_part(p) for p in (getattr(content, "parts", None) or [])],
+    }
+
+
+def _tool_names(config: Optional[types.GenerateContentConfig]) -> List[str]:
+    names: List[str] = []
+    for tool in (config.tools if config else None) or []:
+        for decl in getattr(tool, "function_declarations", None) or []:
+            names.append(decl.name)
+    return sorted(names)
+
+
+def request_key(llm_request: LlmRequest) -> str:
+    """Stable SHA-256 over everything in the request that the model sees."""
+    config = llm_request.config
+    system = config.system_instruction if config else None
+    schema = config.response_schema if config else None
+    canonical = {
+        "model": llm_request.model,
+        "system_instruction": _canonical_content(system) if system is not None else None,
+        "contents": [_canonical_content(c) for c in llm_request.contents or []],
+        "tools": _tool_names(config),
+        "response_schema": (
+            schema.model_dump(mode="json", exclude_none=True)
+            if hasattr(schema, "model_dump")
+            else getattr(schema, "__name__", None)
+        ),
+    }
+    blob = json.dumps(canonical, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+# --- Cassette ----------------------------------------------------------------
+
+
+class Cassette:
+    """Directory of recorded responses, one `<key>.json` file per request."""
+
+    def __init__(self, directory: str | Path = CASSETTE_DIR) -> None:
+        self.directory = Path(directory)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def __contains__(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    def __len__(self) -> int:
+        return len(list(self.directory.glob("*.json"))) if self.directory.exists() else 0
+
+    def load(self, key: str) -> Optional[List[LlmResponse]]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        with path.open("r", encoding="utf-8") as f:
+            entry = json.load(f)
+        return [LlmResponse.model_validate(r) for r in entry["responses"]]
+
+    def save(self, key: str, model: str, responses: Iterable[LlmResponse]) -> None:
+        entry = {
+            "key": key,
+            "model": model,
+            "responses": [r.model_dump(mode="json", exclude_none=True) for r in responses],
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write then rename so parallel recorders never leave a partial file.
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f, indent=2, sort_keys=True, ensure_ascii=False)
+        os.replace(tmp, self._path(key))
+
+
+# --- Model wrapper -----------------------------------------------------------
+
+
+class CassetteLlm(BaseLlm):
+    """Wraps another BaseLlm and records/replays its responses."""
+
+    inner: BaseLlm
+    cassette_dir: str = CASSETTE_DIR
+    mode: str = MODE_REPLAY
+    hits: int = 0
+    recorded: int = 0
+
+    def model_post_init(self, __context: Any) -> None:
+        if self.mode not in MODEL_MODES:
+            raise ValueError(f"Unknown model mode {self.mode!r}; expected one of {MODEL_MODES}.")
+
+    @property
+    def cassette(self) -> Cassette:
+        return Cassette(self.cassette_dir)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if self.mode == MODE_LIVE:
+            async for response in self.inner.generate_content_async(llm_request, stream):
+                yield response
+            return
+
+        key = request_key(llm_request)
+        cassette = self.cassette
+        if self.mode in (MODE_REPLAY, MODE_AUTO):
+            recorded = cassette.load(key)
+            if recorded is not None:
+                self.hits += 1
+                for response in recorded:
+                    yield response
+                return
+            if self.mode == MODE_REPLAY:
+                raise CassetteMissError(
+                    f"No recorded response for request {key[:12]} (model {llm_request.model}) "
+                    f"in {cassette.directory}; re-record with AEGIS_MODEL_MODE=record."
+                )
+
+        responses: List[LlmResponse] = []
+        async for response in self.inner.generate_content_async(llm_request, stream):
+            responses.append(response)
+            yield response
+        cassette.save(key, llm_request.model or self.model, responses)
+        self.recorded += 1
+
+
+def build_model(
+    model: str,
+    retry_options: Optional[types.HttpRetryOptions] = None,
+    mode: Optional[str] = None,
+    cassette_dir: Optional[str] = None,
+    scheduled: Optional[bool] = None,
+) -> BaseLlm:
+    """
+    Gemini for `model`, wrapped for record/replay unless the mode is live.
+
+    Scheduled models (the default) leave 429s to the scheduler, so they are
+    dropped from the client's `retry_options`. Replayed requests never reach
+    the scheduler.
+    """
+    if MODEL_SCHEDULER_ENABLED if scheduled is None else scheduled:
+        gemini: Gemini = ScheduledGemini(
+            model=model,
+            retry_options=without_rate_limit_retries(retry_options),
+            rate_limit_attempts=(retry_options.attempts if retry_options else None)
+            or DEFAULT_RATE_LIMIT_ATTEMPTS,
+        )
+    else:
+        gemini = Gemini(model=model, retry_options=retry_options)
+    mode = (mode or MODEL_MODE).strip().lower()
+    if mode == MODE_LIVE:
+        return gemini
+    return CassetteLlm(
+        model=model, inner=gemini, mode=mode, cassette_dir=cassette_dir or CASSETTE_DIR
+    )
+
+
+@contextmanager
+def cassette_models(
+    agents: Iterable[Any], cassette_dir: str | Path, mode: str = MODE_REPLAY
+) -> Iterator[List[CassetteLlm]]:
+    """
+    Temporarily put each agent's model behind a CassetteLlm (e.g. to replay
+    an eval suite without touching AEGIS_MODEL_MODE). Yields the wrappers.
+    """
+    originals = []
+    wrappers: List[CassetteLlm] = []
+    for agent in agents:
+        inner = agent.model.inner if isinstance(agent.model, CassetteLlm) else agent.model
+        wrapper = CassetteLlm(
+            model=getattr(inner, "model", "unknown"),
+            inner=inner,
+            mode=mode,
+            cassette_dir=str(cassette_dir),
+        )
+        originals.append((agent, agent.model))
+        agent.model = wrapper
+        wrappers.append(wrapper)
+    try:
+        yield wrappers
+    finally:
+        for agent, model in originals:
+            agent.model = model
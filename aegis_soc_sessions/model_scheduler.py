@@ -0,0 +1,386 @@
+"""Adaptive, priority-aware admission of Gemini model calls.
+
+Every Gemini built by model_replay.build_model() (root, parser,
+correlator and the guardrail) is a ScheduledGemini. Before each call it
+takes a token from one process-wide ModelCallScheduler:
+
+  - token bucket: calls are paced at the current rate, bursting up to `burst`
+  - AIMD: each fast success adds `increase` calls/s (up to max_rate); a 429
+    multiplies the rate by `decrease` and drains the bucket; a success slower
+    than the latency target multiplies it by `latency_decrease`
+  - priorities: waiting calls are served high -> normal -> low, so
+    high-severity triage gets quota ahead of low-severity backfill
+
+429s are retried by the scheduler (paced by the reduced rate) instead of
+by the genai client's exponential retry_config schedule, so a burst of
+429s slows every caller a little rather than stalling one for a minute.
+This is the only 429 retry: callers such as batch triage do not replay
+whole conversations on top of it.
+
+A caller can bring its own scheduler for the calls it makes with
+`use_scheduler()`; batch.ProviderRateLimiter is one, for a batch with a
+fixed rate ceiling.
+
+The priority of a call comes from the `model_priority()` context, e.g.
+
+    with model_priority(priority_for_severity(alert["severity"])):
+        async for event in runner.run_async(...):
+            ...
+
+Queue depth, wait time and the current rate are exported as
+aegis_model_* metrics by the instrumentation registry.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncGenerator, Dict, Iterator, List, Optional, Tuple
+
+from google.adk.models.google_llm import Gemini
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import errors as genai_errors
+from google.genai import types
+
+from .instrumentation import registry
+
+
+PRIORITY_HIGH = "high"
+PRIORITY_NORMAL = "normal"
+PRIORITY_LOW = "low"
+# Served in this order.
+PRIORITIES = (PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW)
+
+SEVERITY_PRIORITIES = {
+    "critical": PRIORITY_HIGH,
+    "high": PRIORITY_HIGH,
+    "medium": PRIORITY_NORMAL,
+    "low": PRIORITY_LOW,
+    "info": PRIORITY_LOW,
+    "informational": PRIORITY_LOW,
+}
+
+MODEL_SCHEDULER_ENABLED = os.getenv("AEGIS_MODEL_SCHEDULER", "on").strip().lower() not in (
+    "0", "off", "false", "no",
+)
+DEFAULT_MODEL_RATE = float(os.getenv("AEGIS_MODEL_RATE", "2"))
+DEFAULT_MODEL_MIN_RATE = float(os.getenv("AEGIS_MODEL_MIN_RATE", "0.2"))
+DEFAULT_MODEL_MAX_RATE = float(os.getenv("AEGIS_MODEL_MAX_RATE", "20"))
+DEFAULT_MODEL_BURST = int(os.getenv("AEGIS_MODEL_BURST", "4"))
+DEFAULT_LATENCY_TARGET_SECONDS = float(os.getenv("AEGIS_MODEL_LATENCY_TARGET_SECONDS", "8"))
+DEFAULT_RATE_LIMIT_ATTEMPTS = 5
+
+# AIMD steps.
+DEFAULT_INCREASE = 0.25
+DEFAULT_DECREASE = 0.5
+DEFAULT_LATENCY_DECREASE = 0.9
+# Weight of the newest sample in the latency moving average.
+_LATENCY_EWMA_ALPHA = 0.2
+
+_RATE_LIMITED_CODES = {429}
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    """True if `exc` (or anything it wraps) is a provider 429."""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, genai_errors.APIError) and exc.code in _RATE_LIMITED_CODES:
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+# --- Priorities --------------------------------------------------------------
+
+_call_priority: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "aegis_model_priority", default=PRIORITY_NORMAL
+)
+
+
+def priority_for_severity(severity: Optional[str]) -> str:
+    """Scheduling class for an alert severity (unknown -> normal)."""
+    return SEVERITY_PRIORITIES.get(str(severity or "").strip().lower(), PRIORITY_NORMAL)
+
+
+def current_priority() -> str:
+    return _call_priority.get()
+
+
+@contextmanager
+def model_priority(priority: str) -> Iterator[str]:
+    """Run the model calls made inside the block (and tasks started from it) at `priority`."""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority {priority!r}; expected one of {PRIORITIES}.")
+    token = _call_priority.set(priority)
+    try:
+        yield priority
+    finally:
+        _call_priority.reset(token)
+
+
+# --- Scheduler ---------------------------------------------------------------
+
+registry.describe("aegis_model_queue_wait_seconds", "histogram", "Time model calls waited for scheduler quota.")
+registry.describe("aegis_model_queue_depth", "gauge", "Model calls waiting for scheduler quota.")
+registry.describe("aegis_model_rate_per_second", "gauge", "Current adaptive model call rate.")
+registry.describe("aegis_model_rate_limited_total", "counter", "Provider 429s seen by the model scheduler.")
+
+
+class ModelCallScheduler:
+    """
+    Shared token bucket with an AIMD rate and priority-ordered waiters.
+
+    Each waiter parks on its own future. One timer per scheduler wakes up
+    when the next token is due and resolves the futures of the waiters at
+    the head of the queue, so queued calls never poll.
+    """
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_MODEL_RATE,
+        *,
+        min_rate: float = DEFAULT_MODEL_MIN_RATE,
+        max_rate: float = DEFAULT_MODEL_MAX_RATE,
+        burst: int = DEFAULT_MODEL_BURST,
+        latency_target: float = DEFAULT_LATENCY_TARGET_SECONDS,
+        increase: float = DEFAULT_INCREASE,
+        decrease: float = DEFAULT_DECREASE,
+        latency_decrease: float = DEFAULT_LATENCY_DECREASE,
+    ) -> None:
+        if not 0 < min_rate <= max_rate:
+            raise ValueError("Scheduler rates must satisfy 0 < min_rate <= max_rate.")
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = min(max(rate, min_rate), max_rate)
+        self.burst = max(1, burst)
+        self.latency_target = latency_target
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_decrease = latency_decrease
+        self.latency_ewma: Optional[float] = None
+        self.successes = 0
+        self.rate_limited = 0
+        self.latency_backoffs = 0
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._seq = itertools.count()
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._depth: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        self._waits: Dict[str, Dict[str, float]] = {
+            p: {"count": 0, "total": 0.0, "max": 0.0} for p in PRIORITIES
+        }
+        self._publish_rate()
+
+    def _publish_rate(self) -> None:
+        registry.set_gauge("aegis_model_rate_per_second", {}, self.rate)
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _dispatch(self) -> None:
+        """Grant tokens to the waiters at the head of the queue, then re-arm the timer."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        self._refill(now)
+        while self._waiters:
+            future = self._waiters[0][2]
+            if future.done() or future.get_loop().is_closed():
+                heapq.heappop(self._waiters)  # cancelled while waiting
+                continue
+            if now < self._blocked_until:
+                delay = self._blocked_until - now
+            elif self._tokens < 1.0:
+                delay = (1.0 - self._tokens) / self.rate
+            else:
+                self._tokens -= 1.0
+                heapq.heappop(self._waiters)
+                future.set_result(None)
+                continue
+            self._timer = future.get_loop().call_later(delay, self._dispatch)
+            return
+
+    async def acquire(self, priority: Optional[str] = None) -> float:
+        """Wait for quota at `priority` (default: the current context's); returns the wait."""
+        priority = priority or current_priority()
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}; expected one of {PRIORITIES}.")
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (PRIORITIES.index(priority), next(self._seq), future))
+        self._depth[priority] += 1
+        registry.set_gauge("aegis_model_queue_depth", {"priority": priority}, self._depth[priority])
+        started = time.monotonic()
+        try:
+            self._dispatch()
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just before the cancellation: hand the token back.
+                self._tokens = min(float(self.burst), self._tokens + 1.0)
+            # The cancelled future is dropped from the queue by _dispatch().
+            future.cancel()
+            self._dispatch()
+            raise
+        finally:
+            self._depth[priority] -= 1
+            registry.set_gauge("aegis_model_queue_depth", {"priority": priority}, self._depth[priority])
+
+        waited = time.monotonic() - started
+        stats = self._waits[priority]
+        stats["count"] += 1
+        stats["total"] += waited
+        stats["max"] = max(stats["max"], waited)
+        registry.observe("aegis_model_queue_wait_seconds", {"priority": priority}, waited)
+        return waited
+
+    def record_success(self, latency: float) -> None:
+        """Additive increase, or a gentle decrease if the provider is getting slow."""
+        self.successes += 1
+        self.latency_ewma = (
+            latency
+            if self.latency_ewma is None
+            else (1 - _LATENCY_EWMA_ALPHA) * self.latency_ewma + _LATENCY_EWMA_ALPHA * latency
+        )
+        if self.latency_ewma > self.latency_target:
+            self.latency_backoffs += 1
+            self.rate = max(self.min_rate, self.rate * self.latency_decrease)
+        else:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+        self._publish_rate()
+
+    def record_rate_limited(self) -> float:
+        """Multiplicative decrease on a 429; returns the pause applied to all callers."""
+        self.rate_limited += 1
+        registry.inc("aegis_model_rate_limited_total", {})
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self._publish_rate()
+        now = time.monotonic()
+        self._refill(now)
+        self._tokens = 0.0
+        delay = 1.0 / self.rate
+        self._blocked_until = max(self._blocked_until, now + delay)
+        return delay
+
+    def queue_depth(self) -> Dict[str, int]:
+        return dict(self._depth)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate_per_second": round(self.rate, 4),
+            "latency_ewma_seconds": None if self.latency_ewma is None else round(self.latency_ewma, 4),
+            "successes": self.successes,
+            "rate_limited": self.rate_limited,
+            "latency_backoffs": self.latency_backoffs,
+            "queue_depth": self.queue_depth(),
+            "waits": {
+                p: {
+                    "count": int(s["count"]),
+                    "mean_seconds": round(s["total"] / s["count"], 6) if s["count"] else 0.0,
+                    "max_seconds": round(s["max"], 6),
+                }
+                for p, s in self._waits.items()
+            },
+        }
+
+
+_scheduler: Optional[ModelCallScheduler] = None
+_scheduler_lock = threading.Lock()
+
+# A scheduler that replaces the process-wide one inside `use_scheduler()`.
+_active_scheduler: contextvars.ContextVar[Optional[ModelCallScheduler]] = contextvars.ContextVar(
+    "aegis_model_scheduler", default=None
+)
+
+
+def get_model_scheduler() -> ModelCallScheduler:
+    """The process-wide scheduler shared by every ScheduledGemini."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ModelCallScheduler()
+        return _scheduler
+
+
+def active_scheduler() -> ModelCallScheduler:
+    """The scheduler for model calls made now: the use_scheduler() one, else the process-wide one."""
+    return _active_scheduler.get() or get_model_scheduler()
+
+
+@contextmanager
+def use_scheduler(scheduler: Optional[ModelCallScheduler]) -> Iterator[ModelCallScheduler]:
+    """
+    Admit the model calls made inside the block (and tasks started from it)
+    through `scheduler` instead of the process-wide one (None: no change).
+    """
+    token = _active_scheduler.set(scheduler or _active_scheduler.get())
+    try:
+        yield active_scheduler()
+    finally:
+        _active_scheduler.reset(token)
+
+
+# --- Model wrapper -----------------------------------------------------------
+
+
+def without_rate_limit_retries(
+    retry_options: Optional[types.HttpRetryOptions],
+) -> Optional[types.HttpRetryOptions]:
+    """`retry_options` minus 429, which the scheduler retries instead."""
+    if retry_options is None or not retry_options.http_status_codes:
+        return retry_options
+    codes = [c for c in retry_options.http_status_codes if c not in _RATE_LIMITED_CODES]
+    return retry_options.model_copy(update={"http_status_codes": codes})
+
+
+class ScheduledGemini(Gemini):
+    """Gemini whose calls are admitted, and 429s retried, by a ModelCallScheduler."""
+
+    # None: active_scheduler() at call time.
+    scheduler: Any = None
+    rate_limit_attempts: int = DEFAULT_RATE_LIMIT_ATTEMPTS
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        scheduler = self.scheduler or active_scheduler()
+        attempt = 0
+        while True:
+            attempt += 1
+            await scheduler.acquire()
+            # Provider time only: ADK runs the requested tools (and AgentTool
+            # sub-agents) while this generator is suspended at `yield`.
+            busy = 0.0
+            resumed = time.monotonic()
+            recorded = yielded = False
+            try:
+                async for response in super().generate_content_async(llm_request, stream):
+                    busy += time.monotonic() - resumed
+                    if not recorded and not response.partial:
+                        scheduler.record_success(busy)
+                        recorded = True
+                    yielded = True
+                    yield response
+                    resumed = time.monotonic()
+            except Exception as exc:
+                if not is_rate_limited(exc):
+                    raise
+                scheduler.record_rate_limited()
+                # A partially streamed answer cannot be replayed.
+                if yielded or attempt >= self.rate_limit_attempts:
+                    raise
+                continue
+            if not recorded:
+                scheduler.record_success(busy + time.monotonic() - resumed)
+            return
@@ -0,0 +1,300 @@
+"""Near-duplicate alert collapsing before triage.
+
+Alert storms repeat the same detection many times with only the id, the
+timestamp or a number (port, count, PID) changed. Every alert gets a
+normalized fingerprint:
+
+  - an exact block: source, category, severity, the alert's entities
+    (correlation.extract_entities), its containment/status fields
+    (EXACT_FIELDS) and its taint flags (alert_scanner), so alerts about
+    different users, hosts or IPs, with a different outcome, or with and
+    without injected text, never share a verdict
+    and the order of magnitude of every numeric field (failed_attempts,
+    bytes_out, event_count, ...), so 3 and 500 failed logins never share a
+    verdict
+  - a text template: every other field of the raw alert, lowercased, with
+    hex strings and UUIDs masked; numbers are masked only in free text
+    (TEXT_FIELDS) and in id/port fields
+
+Within a block, alerts whose templates are similar (MinHash estimate of
+the Jaccard similarity of their word shingles >= `threshold`) join the
+group of the first such alert, found through LSH bands. Only each group's
+representative is triaged. Batch triage fans its verdict out to the other
+members, and each member result carries the representative's id and
+session (`duplicate_of`, `session_id`) as the audit link.
+
+    for group in collapse_near_duplicates(alerts):
+        print(group.representative, group.members)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import random
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .alert_scanner import taint_flags
+from .correlation import ENTITY_FIELDS, TAINT_FIELD, extract_entities
+
+
+NEAR_DUP_COLLAPSE = os.getenv("AEGIS_NEAR_DUP_COLLAPSE", "on").strip().lower() not in (
+    "0", "off", "false", "no",
+)
+DEFAULT_THRESHOLD = float(os.getenv("AEGIS_NEAR_DUP_THRESHOLD", "0.8"))
+# 16 bands of 4 rows: pairs above ~0.5 similarity almost always share a band.
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 16
+
+# Containment / status fields: alerts that differ in any of these must be
+# triaged separately, however similar their text is.
+EXACT_FIELDS = ("action_taken", "action", "status", "outcome", "disposition")
+
+# Free text whose numbers (ports, counts, PIDs in prose) are masked.
+TEXT_FIELDS = ("description", "command_line", "message", "summary", "details", "rule_name")
+# Identifier fields: their numbers are masked too, never compared by size.
+_ID_FIELD_RE = re.compile(r"(?:^|_)(?:id|pid|port)s?$")
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+
+# Fields covered by the block or irrelevant to the template.
+_NON_TEMPLATE_FIELDS = (
+    {"id", "timestamp", "source", "severity", "category", TAINT_FIELD, "duplicate_ids"}
+    | set(EXACT_FIELDS)
+    | set(ENTITY_FIELDS)
+    | {f"entities.{name}" for name in ENTITY_FIELDS}
+)
+_MASKS = (
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"), "<uuid>"),
+    (re.compile(r"\b(?:0x)?(?=[0-9a-f]*\d)[0-9a-f]{8,}\b"), "<hex>"),
+)
+_DIGITS_MASK = (re.compile(r"\b\d+\b"), "#")
+_TOKEN_RE = re.compile(r"[a-z#<>_.@-]+")
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def _flatten(alert: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    fields = []
+    for name, value in alert.items():
+        if isinstance(value, dict):
+            fields.extend((f"{name}.{key}", nested) for key, nested in value.items())
+        else:
+            fields.append((name, value))
+    return sorted(fields, key=lambda item: item[0])
+
+
+def _is_id_field(name: str) -> bool:
+    return bool(_ID_FIELD_RE.search(name.rsplit(".", 1)[-1].lower()))
+
+
+def _magnitude(value: Any) -> Optional[str]:
+    """Order of magnitude of a numeric value ('e0' for 1-9, 'e2' for 100-999), else None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        number = float(value)
+    elif isinstance(value, str) and _NUMBER_RE.fullmatch(value.strip()):
+        number = float(value)
+    else:
+        return None
+    if number == 0 or not math.isfinite(number):
+        return str(number)
+    return f"{'-' if number < 0 else ''}e{math.floor(math.log10(abs(number)))}"
+
+
+def _magnitudes(alert: Dict[str, Any]) -> str:
+    parts = []
+    for name, value in _flatten(alert):
+        if name in _NON_TEMPLATE_FIELDS or _is_id_field(name):
+            continue
+        magnitude = _magnitude(value)
+        if magnitude is not None:
+            parts.append(f"{name}~{magnitude}")
+    return ",".join(parts)
+
+
+def _template(alert: Dict[str, Any]) -> str:
+    parts = []
+    for name, value in _flatten(alert):
+        if name in _NON_TEMPLATE_FIELDS or value is None:
+            continue
+        id_field = _is_id_field(name)
+        if not id_field and _magnitude(value) is not None:
+            continue  # compared by magnitude in the block
+        text = ",".join(map(str, value)) if isinstance(value, (list, tuple)) else str(value)
+        text = text.lower()
+        masks = _MASKS
+        if id_field or name.rsplit(".", 1)[-1] in TEXT_FIELDS:
+            masks = _MASKS + (_DIGITS_MASK,)
+        for pattern, mask in masks:
+            text = pattern.sub(mask, text)
+        parts.append(f"{name}: {text}")
+    return " ".join(" | ".join(parts).split())
+
+
+def _block(alert: Dict[str, Any]) -> str:
+    return "|".join(
+        [
+            str(alert.get("source") or ""),
+            str(alert.get("category") or ""),
+            str(alert.get("severity") or "").lower(),
+            ",".join(sorted(extract_entities(alert))),
+            ",".join(f"{name}={alert[name]}" for name in EXACT_FIELDS if alert.get(name) is not None),
+            _magnitudes(alert),
+            ",".join(sorted(taint_flags(alert))),
+        ]
+    )
+
+
+def alert_fingerprint(alert: Dict[str, Any]) -> str:
+    """Digest of the alert's block and masked template; equal for exact repeats."""
+    text = f"{_block(alert)}\n{_template(alert)}"
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _shingles(template: str) -> List[str]:
+    words = _TOKEN_RE.findall(template)
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])] or [""]
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class MinHasher:
+    """MinHash signatures with `num_perm` universal hash permutations."""
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, seed: int = 1) -> None:
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._perms = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, tokens: Iterable[str]) -> Tuple[int, ...]:
+        hashes = {_token_hash(t) for t in tokens}
+        return tuple(
+            min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+            for a, b in self._perms
+        )
+
+    @staticmethod
+    def similarity(left: Tuple[int, ...], right: Tuple[int, ...]) -> float:
+        """Estimated Jaccard similarity of the two token sets."""
+        return sum(1 for a, b in zip(left, right) if a == b) / len(left)
+
+
+@dataclass
+class DuplicateGroup:
+    """A representative alert and the near-duplicates that share its verdict."""
+
+    representative: str
+    fingerprint: str
+    # Every member id (the representative first) -> estimated similarity to it.
+    members: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def duplicates(self) -> List[str]:
+        return [m for m in self.members if m != self.representative]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "representative": self.representative,
+            "fingerprint": self.fingerprint,
+            "members": list(self.members),
+            "similarity": {m: round(s, 4) for m, s in self.members.items()},
+        }
+
+
+class NearDuplicateIndex:
+    """Incremental leader clustering of alerts through MinHash LSH buckets."""
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        num_perm: int = DEFAULT_NUM_PERM,
+        bands: int = DEFAULT_BANDS,
+    ) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands.")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self.groups: List[DuplicateGroup] = []
+        self._signatures: List[Tuple[int, ...]] = []
+        self._buckets: Dict[Tuple[str, int, Tuple[int, ...]], List[int]] = {}
+        # Storms repeat templates, so signatures are computed once per template.
+        self._signature_cache: Dict[str, Tuple[int, ...]] = {}
+
+    def _signature(self, template: str) -> Tuple[int, ...]:
+        signature = self._signature_cache.get(template)
+        if signature is None:
+            signature = self.hasher.signature(_shingles(template))
+            self._signature_cache[template] = signature
+        return signature
+
+    def add(self, alert: Dict[str, Any]) -> DuplicateGroup:
+        """File `alert` under the best matching group (or a new one) and return it."""
+        alert_id = str(alert.get("id"))
+        block = _block(alert)
+        template = _template(alert)
+        signature = self._signature(template)
+        band_keys = [
+            (block, band, signature[band * self.rows : (band + 1) * self.rows])
+            for band in range(self.bands)
+        ]
+
+        best: Optional[int] = None
+        best_similarity = 0.0
+        seen = set()
+        for key in band_keys:
+            for index in self._buckets.get(key, ()):
+                if index in seen:
+                    continue
+                seen.add(index)
+                similarity = MinHasher.similarity(signature, self._signatures[index])
+                if similarity >= self.threshold and similarity > best_similarity:
+                    best, best_similarity = index, similarity
+        if best is not None:
+            group = self.groups[best]
+            group.members[alert_id] = best_similarity
+            return group
+
+        group = DuplicateGroup(
+            representative=alert_id,
+            fingerprint=alert_fingerprint(alert),
+            members={alert_id: 1.0},
+        )
+        index = len(self.groups)
+        self.groups.append(group)
+        self._signatures.append(signature)
+        for key in band_keys:
+            self._buckets.setdefault(key, []).append(index)
+        return group
+
+    def stats(self) -> Dict[str, Any]:
+        alerts = sum(len(g.members) for g in self.groups)
+        return {
+            "alerts": alerts,
+            "groups": len(self.groups),
+            "collapsed": alerts - len(self.groups),
+            "distinct_templates": len(self._signature_cache),
+        }
+
+
+def collapse_near_duplicates(
+    alerts: Iterable[Dict[str, Any]],
+    threshold: float = DEFAULT_THRESHOLD,
+    num_perm: int = DEFAULT_NUM_PERM,
+    bands: int = DEFAULT_BANDS,
+) -> List[DuplicateGroup]:
+    """Group `alerts` into near-duplicate groups, in first-seen order (singletons included)."""
+    index = NearDuplicateIndex(threshold=threshold, num_perm=num_perm, bands=bands)
+    for alert in alerts:
+        index.add(alert)
+    return index.groups
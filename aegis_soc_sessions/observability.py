@@ -1,8 +1,14 @@
 from __future__ import annotations
 
-from dataclasses import asdict, dataclass
+import hashlib
+import json
+import os
+import sys
+import uuid
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
 
 
 EVENT_TOOL_CALL = "tool_call"
@@ -11,6 +17,18 @@ EVENT_AGENT_OUTPUT = "agent_output"
 EVENT_STATE_CHANGE = "state_change"
 EVENT_STATE_SNAPSHOT = "state_snapshot"
 EVENT_GUARDRAIL_RESPONSE = "guardrail_response"
+EVENT_SPAN = "span"
+EVENT_MODEL_USAGE = "model_usage"
+
+# Maximum number of events kept in state['events']. Older events are evicted
+# (and spilled to disk when AEGIS_EVENT_SPILL_DIR is set).
+EVENT_LOG_CAP = int(os.getenv("AEGIS_EVENT_LOG_CAP", "1000"))
+EVENT_SPILL_DIR = os.getenv("AEGIS_EVENT_SPILL_DIR") or None
+
+# Bookkeeping state keys used by the bounded event log and snapshots.
+EVENTS_DROPPED_KEY = "events_dropped"
+EVENT_LOG_ID_KEY = "event_log_id"
+SNAPSHOT_DIGESTS_KEY = "snapshot_digests"
 
 
 @dataclass
@@ -20,6 +38,21 @@ class StructuredEvent:
     actor: str
     details: Dict[str, Any]
 
+    def __post_init__(self) -> None:
+        # A handful of event types/actors repeat across every session, so
+        # share one string object per distinct value.
+        self.event_type = sys.intern(self.event_type)
+        self.actor = sys.intern(self.actor)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict for state['events'], which must stay JSON-serializable."""
+        return {
+            "timestamp": self.timestamp,
+            "event_type": self.event_type,
+            "actor": self.actor,
+            "details": self.details,
+        }
+
 
 def _get_or_init_events(state: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
@@ -33,6 +66,41 @@ def _get_or_init_events(state: Dict[str, Any]) -> List[Dict[str, Any]]:
     return events
 
 
+def _spill_path(state: Dict[str, Any], spill_dir: str) -> Path:
+    log_id = state.get(EVENT_LOG_ID_KEY)
+    if not log_id:
+        log_id = uuid.uuid4().hex
+        state[EVENT_LOG_ID_KEY] = log_id
+    return Path(spill_dir) / f"events-{log_id}.ndjson"
+
+
+def _enforce_cap(
+    state: Dict[str, Any],
+    events: List[Dict[str, Any]],
+    cap: int,
+    spill_dir: Optional[str],
+) -> List[Dict[str, Any]]:
+    """
+    Ring-buffer semantics for state['events'].
+
+    When the log exceeds `cap`, the oldest events (plus 1/8 of the cap of
+    slack, so trimming is amortized) are evicted, optionally appended to an
+    NDJSON spill file, and counted in state['events_dropped'].
+    """
+    if cap <= 0 or len(events) <= cap:
+        return events
+    evict = len(events) - cap + cap // 8
+    evicted, kept = events[:evict], events[evict:]
+    if spill_dir:
+        path = _spill_path(state, spill_dir)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a", encoding="utf-8") as f:
+            for event in evicted:
+                f.write(json.dumps(event, default=str) + "\n")
+    state[EVENTS_DROPPED_KEY] = int(state.get(EVENTS_DROPPED_KEY) or 0) + len(evicted)
+    return kept
+
+
 def record_event(
     state: Dict[str, Any],
     event_type: str,
@@ -45,6 +113,8 @@ def record_event(
     - event_type: 'tool_call', 'agent_output', 'state_update', etc.
     - actor: which tool/agent produced this event.
     - details: JSON-serializable dictionary with context.
+
+    The log is bounded by AEGIS_EVENT_LOG_CAP; see _enforce_cap.
     """
     if details is None:
         details = {}
@@ -56,7 +126,37 @@ def record_event(
         actor=actor,
         details=details,
     )
-    events.append(asdict(event))
+    events.append(event.to_dict())
+    # Re-assign so session services that track state deltas persist the
+    # change, not just the in-place append.
+    state["events"] = _enforce_cap(state, events, EVENT_LOG_CAP, EVENT_SPILL_DIR)
+
+
+def iter_events(
+    state: Dict[str, Any],
+    include_spilled: bool = True,
+    spill_dir: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the full event history as dicts, oldest first.
+
+    Events evicted from state['events'] are read back from the spill file
+    when one exists, so evaluation code sees the complete stream.
+    """
+    spill_dir = spill_dir or EVENT_SPILL_DIR
+    if include_spilled and spill_dir and state.get(EVENT_LOG_ID_KEY):
+        path = _spill_path(state, spill_dir)
+        if path.exists():
+            with path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+    yield from state.get("events", []) or []
+
+
+def _digest(value: Any) -> tuple[str, int]:
+    blob = json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(blob).hexdigest()[:16], len(blob)
 
 
 def record_state_snapshot(
@@ -67,10 +167,29 @@ def record_state_snapshot(
     """
     Convenience helper to log a snapshot of selected state keys.
 
+    Values are recorded by reference rather than copied: each key maps to
+    {"ref", "digest", "bytes", "changed"}, where `changed` tells whether the
+    value differs from the previous snapshot of that key. The value itself
+    lives once, in state[key].
+
     Example:
         record_state_snapshot(state, "root_agent", ["raw_alerts", "parsed_alerts"])
     """
-    snapshot = {key: state.get(key) for key in keys_to_track}
+    previous = dict(state.get(SNAPSHOT_DIGESTS_KEY) or {})
+    snapshot: Dict[str, Any] = {}
+    for key in keys_to_track:
+        if key not in state or state.get(key) is None:
+            snapshot[key] = None
+            continue
+        digest, size = _digest(state.get(key))
+        snapshot[key] = {
+            "ref": key,
+            "digest": digest,
+            "bytes": size,
+            "changed": previous.get(key) != digest,
+        }
+        previous[key] = digest
+    state[SNAPSHOT_DIGESTS_KEY] = previous
     record_event(
         state=state,
         event_type=EVENT_STATE_SNAPSHOT,
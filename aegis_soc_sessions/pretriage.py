@@ -0,0 +1,224 @@
+"""Policy-driven pre-triage: decide high-confidence alert classes without the LLM.
+
+Operators declare rules in a JSON policy file (AEGIS_PRETRIAGE_POLICY). Each
+rule maps alerts that match its conditions directly to one of
+NORMALIZED_ACTIONS, with a rationale. Batch triage checks every alert
+against the policy first. Only alerts that miss every rule go through the
+root agent, parser, correlator and guardrail.
+
+    {
+      "rules": [
+        {
+          "name": "low-firewall-port-scan",
+          "source": ["firewall"],
+          "category": ["port_scan"],
+          "severity": ["low"],
+          "action": "CLOSE",
+          "rationale": "Low-severity perimeter port scans are background noise."
+        }
+      ]
+    }
+
+Rule conditions (all optional; every given condition must hold):
+  - source / category / severity: allowed values, case-insensitive.
+  - fields: {field: [values]} on the alert, "*" meaning "present and non-empty".
+  - entity_allowlist: entity keys as produced by correlation.extract_entities
+    (e.g. "ip:10.0.50.5", "user:svc-scanner@example.com"); the rule matches
+    when the alert names at least one originating entity (user, source IP,
+    host; see correlation.ORIGIN_FIELDS) and every one of them is listed.
+    Targets such as dst_ip never count, so a scan *of* an allowlisted
+    address is not closed as a scan *from* it.
+
+Rules are checked in file order and the first match wins. A rule with no
+conditions is rejected, so a typo cannot turn into "close everything".
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+from .action_schema import NORMALIZED_ACTIONS
+from .correlation import ORIGIN_FIELDS, extract_entities
+
+
+# Unset disables pre-triage: every alert goes to the LLM pipeline.
+PRETRIAGE_POLICY_PATH = os.getenv("AEGIS_PRETRIAGE_POLICY", "")
+
+EXAMPLE_POLICY_PATH = Path(__file__).resolve().parents[1] / "data" / "pretriage_policy.json"
+
+_ANY_VALUE = "*"
+
+
+def _values(raw: Any) -> FrozenSet[str]:
+    if raw is None:
+        return frozenset()
+    if isinstance(raw, (str, int, float, bool)):
+        raw = [raw]
+    return frozenset(str(v).strip().lower() for v in raw)
+
+
+@dataclass(frozen=True)
+class PretriageRule:
+    name: str
+    action: str
+    rationale: str
+    source: FrozenSet[str] = frozenset()
+    category: FrozenSet[str] = frozenset()
+    severity: FrozenSet[str] = frozenset()
+    fields: Mapping[str, FrozenSet[str]] = field(default_factory=dict)
+    entity_allowlist: FrozenSet[str] = frozenset()
+
+    @classmethod
+    def from_dict(cls, raw: Dict[str, Any]) -> "PretriageRule":
+        name = str(raw.get("name") or "").strip()
+        if not name:
+            raise ValueError("Pre-triage rule is missing a name")
+        action = str(raw.get("action") or "").strip().upper()
+        if action not in NORMALIZED_ACTIONS:
+            raise ValueError(
+                f"Pre-triage rule {name!r}: action {action!r} is not one of "
+                f"{sorted(NORMALIZED_ACTIONS)}"
+            )
+        rule = cls(
+            name=name,
+            action=action,
+            rationale=str(raw.get("rationale") or f"Matched pre-triage rule {name}."),
+            source=_values(raw.get("source")),
+            category=_values(raw.get("category")),
+            severity=_values(raw.get("severity")),
+            fields={str(k): _values(v) for k, v in (raw.get("fields") or {}).items()},
+            # Entity keys keep their case for IPs; users/hosts are lowercased
+            # by extract_entities, so compare lowercased on both sides.
+            entity_allowlist=_values(raw.get("entity_allowlist")),
+        )
+        if not (rule.source or rule.category or rule.severity or rule.fields or rule.entity_allowlist):
+            raise ValueError(f"Pre-triage rule {name!r} has no conditions")
+        return rule
+
+    def matches(self, alert: Dict[str, Any]) -> bool:
+        for wanted, key in (
+            (self.source, "source"),
+            (self.category, "category"),
+            (self.severity, "severity"),
+        ):
+            if wanted and str(alert.get(key) or "").strip().lower() not in wanted:
+                return False
+        for name, wanted in self.fields.items():
+            value = alert.get(name)
+            if value is None or str(value).strip() == "":
+                return False
+            if _ANY_VALUE not in wanted and str(value).strip().lower() not in wanted:
+                return False
+        if self.entity_allowlist:
+            origins = {e.lower() for e in extract_entities(alert, ORIGIN_FIELDS)}
+            if not origins or not origins <= self.entity_allowlist:
+                return False
+        return True
+
+
+@dataclass
+class PretriageDecision:
+    alert_id: str
+    rule: str
+    normalized_action: str
+    rationale: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "alert_id": self.alert_id,
+            "rule": self.rule,
+            "normalized_action": self.normalized_action,
+            "rationale": self.rationale,
+        }
+
+
+class PretriagePolicy:
+    """An ordered rule list with per-rule hit counters."""
+
+    def __init__(self, rules: Iterable[PretriageRule] = ()) -> None:
+        self.rules = list(rules)
+        names = [r.name for r in self.rules]
+        if len(set(names)) != len(names):
+            raise ValueError("Pre-triage rule names must be unique")
+        self.hits: Dict[str, int] = {name: 0 for name in names}
+        self.misses = 0
+
+    @classmethod
+    def from_dict(cls, raw: Dict[str, Any]) -> "PretriagePolicy":
+        return cls(PretriageRule.from_dict(r) for r in raw.get("rules") or [])
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> "PretriagePolicy":
+        with Path(path).open("r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def decide(self, alert: Dict[str, Any]) -> Optional[PretriageDecision]:
+        """The first matching rule's decision, or None if the LLM must triage."""
+        for rule in self.rules:
+            if rule.matches(alert):
+                self.hits[rule.name] += 1
+                return PretriageDecision(
+                    alert_id=str(alert.get("id")),
+                    rule=rule.name,
+                    normalized_action=rule.action,
+                    rationale=rule.rationale,
+                )
+        self.misses += 1
+        return None
+
+    def partition(
+        self, alerts: Iterable[Dict[str, Any]]
+    ) -> Tuple[List[PretriageDecision], List[Dict[str, Any]]]:
+        """Split alerts into (rule decisions, alerts left for the LLM)."""
+        decided: List[PretriageDecision] = []
+        remaining: List[Dict[str, Any]] = []
+        for alert in alerts:
+            decision = self.decide(alert)
+            if decision is None:
+                remaining.append(alert)
+            else:
+                decided.append(decision)
+        return decided, remaining
+
+    def stats(self) -> Dict[str, Any]:
+        decided = sum(self.hits.values())
+        total = decided + self.misses
+        return {
+            "rules": len(self.rules),
+            "decided": decided,
+            "sent_to_llm": self.misses,
+            "decided_rate": (decided / total) if total else 0.0,
+            "hits": dict(self.hits),
+        }
+
+
+_policy_lock = threading.Lock()
+_policy: Optional[PretriagePolicy] = None
+_policy_key: Optional[Tuple[str, int]] = None
+
+
+def get_pretriage_policy(path: Optional[str] = None) -> PretriagePolicy:
+    """
+    The operator policy from AEGIS_PRETRIAGE_POLICY (empty when unset).
+
+    The file is re-read when its mtime changes, so rule edits take effect
+    without a restart.
+    """
+    global _policy, _policy_key
+    path = PRETRIAGE_POLICY_PATH if path is None else path
+    if not path:
+        return PretriagePolicy()
+    key = (str(path), Path(path).stat().st_mtime_ns)
+    with _policy_lock:
+        if _policy is None or _policy_key != key:
+            _policy = PretriagePolicy.from_file(path)
+            _policy_key = key
+        return _policy
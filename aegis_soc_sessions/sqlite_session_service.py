@@ -0,0 +1,469 @@
+"""Durable ADK session service on a local SQLite database (WAL mode).
+
+Sessions survive restarts, and several worker processes can share one
+database file: WAL lets readers proceed while a writer commits.
+
+Layout:
+  - sessions:      one row per (app_name, user_id, session_id)
+  - session_state: one row per session state key, so a turn only rewrites
+                   the keys it changed (not the whole state blob)
+  - app_state / user_state: 'app:' and 'user:' scoped state
+  - events:        append-only, indexed by session and insertion order
+
+Writes are buffered per service instance and coalesced: repeated updates to
+the same state key (e.g. 'events' after every tool call, 'parsed_alerts',
+'triage_summary') become a single row write per flush. The buffer is flushed
+in one transaction when it reaches `batch_size` events, at the end of every
+turn (final responses), before any read, and on flush()/close().
+
+Every database call runs in a worker thread (asyncio.to_thread), so a slow
+commit or a busy WAL never blocks the event loop. An asyncio.Lock keeps
+each service call atomic with respect to the others on the loop, and a
+threading.Lock guards the shared connection itself.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events.event import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+
+
+DEFAULT_DB_PATH = os.getenv("AEGIS_SESSION_DB", "aegis_sessions.db")
+DEFAULT_BATCH_SIZE = int(os.getenv("AEGIS_SESSION_DB_BATCH_SIZE", "16"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sessions_by_update
+    ON sessions (app_name, last_update_time);
+
+CREATE TABLE IF NOT EXISTS session_state (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, key)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS app_state (
+    app_name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (app_name, key)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS user_state (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id, key)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS events_by_session
+    ON events (app_name, user_id, session_id, seq);
+CREATE UNIQUE INDEX IF NOT EXISTS events_by_id
+    ON events (app_name, user_id, session_id, event_id);
+"""
+
+SessionKey = Tuple[str, str, str]
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=str, separators=(",", ":"))
+
+
+def _split_state(state: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """Split a state dict into (app, user, session) parts; temp: keys are dropped."""
+    app: Dict[str, Any] = {}
+    user: Dict[str, Any] = {}
+    session: Dict[str, Any] = {}
+    for key, value in state.items():
+        if key.startswith(State.APP_PREFIX):
+            app[key[len(State.APP_PREFIX):]] = value
+        elif key.startswith(State.USER_PREFIX):
+            user[key[len(State.USER_PREFIX):]] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session[key] = value
+    return app, user, session
+
+
+class SqliteSessionService(BaseSessionService):
+    """
+    ADK session service persisted to SQLite.
+
+    Args:
+        db_path: Database file (default: AEGIS_SESSION_DB). Use ":memory:"
+            for a throwaway database.
+        batch_size: Events buffered before a write transaction. 1 writes
+            every event immediately.
+    """
+
+    def __init__(
+        self,
+        db_path: str | Path | None = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> None:
+        self.db_path = str(db_path or DEFAULT_DB_PATH)
+        self.batch_size = max(1, batch_size)
+        # Held only inside worker threads, never across an await.
+        self._db_lock = threading.Lock()
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+
+        # Write-behind buffer. State writes are coalesced by key.
+        self._pending_events: List[Tuple[str, str, str, str, float, str]] = []
+        self._pending_event_ids: set[Tuple[str, str, str, str]] = set()
+        self._pending_session_state: Dict[Tuple[str, str, str, str], str] = {}
+        self._pending_app_state: Dict[Tuple[str, str], str] = {}
+        self._pending_user_state: Dict[Tuple[str, str, str], str] = {}
+        self._pending_touch: Dict[SessionKey, float] = {}
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run `fn(*args)` with the connection lock held, off the event loop."""
+        return await asyncio.to_thread(self._locked, fn, *args)
+
+    def _locked(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._db_lock:
+            return fn(*args)
+
+    # --- Buffer management -----------------------------------------------------
+
+    def _flush_locked(self) -> None:
+        if not (
+            self._pending_events
+            or self._pending_session_state
+            or self._pending_app_state
+            or self._pending_user_state
+            or self._pending_touch
+        ):
+            return
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR IGNORE INTO events "
+                "(app_name, user_id, session_id, event_id, timestamp, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                self._pending_events,
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO session_state VALUES (?, ?, ?, ?, ?)",
+                [(*k, v) for k, v in self._pending_session_state.items()],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO app_state VALUES (?, ?, ?)",
+                [(*k, v) for k, v in self._pending_app_state.items()],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO user_state VALUES (?, ?, ?, ?)",
+                [(*k, v) for k, v in self._pending_user_state.items()],
+            )
+            conn.executemany(
+                "UPDATE sessions SET last_update_time = MAX(last_update_time, ?) "
+                "WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                [(ts, *k) for k, ts in self._pending_touch.items()],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._pending_events.clear()
+        self._pending_event_ids.clear()
+        self._pending_session_state.clear()
+        self._pending_app_state.clear()
+        self._pending_user_state.clear()
+        self._pending_touch.clear()
+
+    async def flush(self) -> None:
+        async with self._get_lock():
+            await self._run(self._flush_locked)
+
+    def close(self) -> None:
+        with self._db_lock:
+            self._flush_locked()
+            self._conn.close()
+
+    # --- Reads ---------------------------------------------------------------
+
+    def _session_exists(self, key: SessionKey) -> bool:
+        row = self._conn.execute(
+            "SELECT 1 FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?",
+            key,
+        ).fetchone()
+        return row is not None
+
+    def _merged_state(self, app_name: str, user_id: str, session_id: str) -> Dict[str, Any]:
+        state: Dict[str, Any] = {}
+        for key, value in self._conn.execute(
+            "SELECT key, value FROM session_state "
+            "WHERE app_name = ? AND user_id = ? AND session_id = ?",
+            (app_name, user_id, session_id),
+        ):
+            state[key] = json.loads(value)
+        for key, value in self._conn.execute(
+            "SELECT key, value FROM app_state WHERE app_name = ?", (app_name,)
+        ):
+            state[State.APP_PREFIX + key] = json.loads(value)
+        for key, value in self._conn.execute(
+            "SELECT key, value FROM user_state WHERE app_name = ? AND user_id = ?",
+            (app_name, user_id),
+        ):
+            state[State.USER_PREFIX + key] = json.loads(value)
+        return state
+
+    # --- Database work (worker thread, connection lock held) -------------------
+
+    def _create_locked(
+        self,
+        key: SessionKey,
+        now: float,
+        app_delta: Dict[str, Any],
+        user_delta: Dict[str, Any],
+        session_state: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        app_name, user_id, session_id = key
+        self._flush_locked()
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._session_exists(key):
+                raise AlreadyExistsError(f"Session with id {session_id} already exists.")
+            conn.execute("INSERT INTO sessions VALUES (?, ?, ?, ?, ?)", (*key, now, now))
+            conn.executemany(
+                "INSERT OR REPLACE INTO session_state VALUES (?, ?, ?, ?, ?)",
+                [(*key, k, _dumps(v)) for k, v in session_state.items()],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO app_state VALUES (?, ?, ?)",
+                [(app_name, k, _dumps(v)) for k, v in app_delta.items()],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO user_state VALUES (?, ?, ?, ?)",
+                [(app_name, user_id, k, _dumps(v)) for k, v in user_delta.items()],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return self._merged_state(app_name, user_id, session_id)
+
+    def _get_locked(
+        self, key: SessionKey, config: Optional[GetSessionConfig]
+    ) -> Optional[Tuple[float, List[str], Dict[str, Any]]]:
+        self._flush_locked()
+        row = self._conn.execute(
+            "SELECT last_update_time FROM sessions "
+            "WHERE app_name = ? AND user_id = ? AND session_id = ?",
+            key,
+        ).fetchone()
+        if row is None:
+            return None
+
+        query = (
+            "SELECT payload FROM events "
+            "WHERE app_name = ? AND user_id = ? AND session_id = ?"
+        )
+        params: List[Any] = list(key)
+        if config and config.after_timestamp:
+            query += " AND timestamp >= ?"
+            params.append(config.after_timestamp)
+        query += " ORDER BY seq DESC"
+        if config and config.num_recent_events is not None:
+            query += " LIMIT ?"
+            params.append(config.num_recent_events)
+        payloads = [p for (p,) in self._conn.execute(query, params)]
+        return row[0], payloads, self._merged_state(*key)
+
+    def _list_locked(self, app_name: str, user_id: Optional[str]) -> List[Session]:
+        self._flush_locked()
+        if user_id is None:
+            rows = self._conn.execute(
+                "SELECT user_id, session_id, last_update_time FROM sessions "
+                "WHERE app_name = ? ORDER BY last_update_time, user_id, session_id",
+                (app_name,),
+            ).fetchall()
+        else:
+            rows = self._conn.execute(
+                "SELECT user_id, session_id, last_update_time FROM sessions "
+                "WHERE app_name = ? AND user_id = ? "
+                "ORDER BY last_update_time, user_id, session_id",
+                (app_name, user_id),
+            ).fetchall()
+        return [
+            Session(
+                app_name=app_name,
+                user_id=uid,
+                id=sid,
+                state=self._merged_state(app_name, uid, sid),
+                last_update_time=updated,
+            )
+            for uid, sid, updated in rows
+        ]
+
+    def _delete_locked(self, key: SessionKey) -> None:
+        self._flush_locked()
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for table in ("events", "session_state", "sessions"):
+                conn.execute(
+                    f"DELETE FROM {table} "
+                    "WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                    key,
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _event_recorded_locked(self, event_key: Tuple[str, str, str, str]) -> bool:
+        return event_key in self._pending_event_ids or self._conn.execute(
+            "SELECT 1 FROM events WHERE app_name = ? AND user_id = ? "
+            "AND session_id = ? AND event_id = ?",
+            event_key,
+        ).fetchone() is not None
+
+    def _buffer_event_locked(self, session: Session, event: Event) -> None:
+        key = (session.app_name, session.user_id, session.id)
+        self._pending_events.append(
+            (*key, event.id, event.timestamp, event.model_dump_json(exclude_none=True))
+        )
+        self._pending_event_ids.add((*key, event.id))
+        self._pending_touch[key] = max(self._pending_touch.get(key, 0.0), event.timestamp)
+        if event.actions and event.actions.state_delta:
+            app_delta, user_delta, session_delta = _split_state(event.actions.state_delta)
+            for k, v in session_delta.items():
+                self._pending_session_state[(*key, k)] = _dumps(v)
+            for k, v in app_delta.items():
+                self._pending_app_state[(session.app_name, k)] = _dumps(v)
+            for k, v in user_delta.items():
+                self._pending_user_state[(session.app_name, session.user_id, k)] = _dumps(v)
+
+        if len(self._pending_events) >= self.batch_size or event.is_final_response():
+            self._flush_locked()
+
+    # --- BaseSessionService ----------------------------------------------------
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = (session_id or "").strip() or uuid.uuid4().hex
+        key = (app_name, user_id, session_id)
+        now = time.time()
+        app_delta, user_delta, session_state = _split_state(state or {})
+
+        async with self._get_lock():
+            merged = await self._run(
+                self._create_locked, key, now, app_delta, user_delta, session_state
+            )
+
+        return Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=merged,
+            last_update_time=now,
+        )
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        session_id = session_id.strip() if session_id else session_id
+        async with self._get_lock():
+            found = await self._run(self._get_locked, (app_name, user_id, session_id), config)
+        if found is None:
+            return None
+        last_update_time, payloads, state = found
+
+        events = [Event.model_validate_json(p) for p in reversed(payloads)]
+        return Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=state,
+            events=events,
+            last_update_time=last_update_time,
+        )
+
+    async def list_sessions(
+        self, *, app_name: str, user_id: Optional[str] = None
+    ) -> ListSessionsResponse:
+        async with self._get_lock():
+            sessions = await self._run(self._list_locked, app_name, user_id)
+        return ListSessionsResponse(sessions=sessions)
+
+    async def delete_session(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> None:
+        key = (app_name, user_id, session_id.strip() if session_id else session_id)
+        async with self._get_lock():
+            await self._run(self._delete_locked, key)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+
+        event_key = (session.app_name, session.user_id, session.id, event.id)
+        async with self._get_lock():
+            # Re-delivered events (same id) must not apply their delta twice.
+            if await self._run(self._event_recorded_locked, event_key):
+                return event
+
+            event = await super().append_event(session=session, event=event)
+            session.last_update_time = event.timestamp
+            await self._run(self._buffer_event_locked, session, event)
+        return event
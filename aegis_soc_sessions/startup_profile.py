@@ -0,0 +1,158 @@
+"""Cold-start profile: per-module import time for the service entry points.
+
+Each target is imported in a fresh interpreter under `python -X importtime`
+(so nothing is warm from a previous import), optionally followed by touching
+an attribute to force lazy construction, e.g. `aegis_soc_sessions.app:app`.
+The report gives the wall time to "ready", the slowest modules by cumulative
+and self time, and the cost per top-level package.
+
+    python -m aegis_soc_sessions.startup_profile
+    python -m aegis_soc_sessions.startup_profile guardrail_agent.app:app --top 25 --json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# Triage worker, guardrail service, and the guardrail fast-path alone.
+DEFAULT_TARGETS = [
+    "aegis_soc_sessions.app:app",
+    "guardrail_agent.app:app",
+    "guardrail_agent.rules",
+]
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+_READY_MARKER = "__aegis_ready__"
+
+_PROBE = """
+import time, warnings
+warnings.simplefilter("ignore")
+started = time.perf_counter()
+import importlib
+module = importlib.import_module({module!r})
+for part in {attrs!r}:
+    module = getattr(module, part)
+print({marker!r}, time.perf_counter() - started, flush=True)
+"""
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Parse `-X importtime` lines into {module, self_us, cumulative_us, depth}."""
+    rows = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            rows.append(
+                {
+                    "module": match.group(4),
+                    "self_us": int(match.group(1)),
+                    "cumulative_us": int(match.group(2)),
+                    "depth": len(match.group(3)) // 2,
+                }
+            )
+    return rows
+
+
+def _package(module: str) -> str:
+    parts = module.split(".")
+    # google.* is a namespace; google.adk and google.genai are the packages.
+    return ".".join(parts[:2]) if parts[0] == "google" and len(parts) > 1 else parts[0]
+
+
+def profile_target(target: str, top: int = 15, python: str = sys.executable) -> Dict[str, Any]:
+    """Import `module[:attr.path]` in a fresh interpreter and summarize it."""
+    module, _, attr_path = target.partition(":")
+    attrs = [a for a in attr_path.split(".") if a]
+    code = _PROBE.format(module=module, attrs=attrs, marker=_READY_MARKER)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(REPO_ROOT), env.get("PYTHONPATH")]))
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=REPO_ROOT,
+        env=env,
+    )
+    ready = None
+    for line in proc.stdout.splitlines():
+        if line.startswith(_READY_MARKER):
+            ready = float(line.split()[1])
+    if proc.returncode != 0 or ready is None:
+        tail = proc.stderr.strip().splitlines()[-5:]
+        return {"target": target, "error": "\n".join(tail) or f"exit code {proc.returncode}"}
+
+    rows = parse_importtime(proc.stderr)
+    packages: Dict[str, int] = {}
+    for row in rows:
+        name = _package(row["module"])
+        packages[name] = packages.get(name, 0) + row["self_us"]
+
+    def ms(us: int) -> float:
+        return round(us / 1000.0, 2)
+
+    return {
+        "target": target,
+        "ready_seconds": round(ready, 4),
+        "modules_imported": len(rows),
+        "import_seconds": round(sum(r["self_us"] for r in rows) / 1e6, 4),
+        "slowest_cumulative_ms": [
+            {"module": r["module"], "ms": ms(r["cumulative_us"])}
+            for r in sorted(rows, key=lambda r: -r["cumulative_us"])[:top]
+        ],
+        "slowest_self_ms": [
+            {"module": r["module"], "ms": ms(r["self_us"])}
+            for r in sorted(rows, key=lambda r: -r["self_us"])[:top]
+        ],
+        "packages_ms": {
+            name: ms(us) for name, us in sorted(packages.items(), key=lambda kv: -kv[1])[:top]
+        },
+    }
+
+
+def _print_report(result: Dict[str, Any]) -> None:
+    print(f"== {result['target']}")
+    if "error" in result:
+        print(f"   failed: {result['error']}")
+        return
+    print(
+        f"   ready in {result['ready_seconds'] * 1000:.0f} ms "
+        f"({result['modules_imported']} modules, {result['import_seconds'] * 1000:.0f} ms importing)"
+    )
+    print("   by package (self time):")
+    for name, ms in result["packages_ms"].items():
+        print(f"     {ms:9.1f} ms  {name}")
+    print("   slowest modules (cumulative):")
+    for row in result["slowest_cumulative_ms"]:
+        print(f"     {row['ms']:9.1f} ms  {row['module']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Report cold-start import time per module.")
+    parser.add_argument(
+        "targets", nargs="*", default=DEFAULT_TARGETS,
+        help="module or module:attr to import (default: worker app, guardrail app, guardrail rules)",
+    )
+    parser.add_argument("--top", type=int, default=15, help="Rows per ranking")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a text report")
+    args = parser.parse_args(argv)
+
+    results = [profile_target(target, top=args.top) for target in args.targets]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            _print_report(result)
+    return 1 if any("error" in r for r in results) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
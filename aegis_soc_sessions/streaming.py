@@ -0,0 +1,170 @@
+"""Streaming consumer API for triage runs.
+
+`Runner.run_async` yields raw ADK events. stream_triage() turns them into
+typed, timestamped TriageUpdates as each pipeline step finishes:
+
+    alerts_loaded -> parser_done -> correlation_done -> guardrail_verdict -> final_summary
+
+A console can show the guardrail's normalized action as soon as the
+guardrail answers. It does not have to wait for the root agent to finish
+its narrative or for the run to drain.
+
+    async for update in stream_triage(runner, user_id="analyst", session_id=sid,
+                                      new_message="Triage ALERT-001"):
+        print(update.timestamp, update.kind, update.data)
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
+
+from google.adk.agents.run_config import RunConfig
+from google.adk.runners import Runner
+from google.genai import types
+
+from .action_schema import NORMALIZED_ACTIONS
+
+
+UPDATE_ALERTS_LOADED = "alerts_loaded"
+UPDATE_PARSER_DONE = "parser_done"
+UPDATE_CORRELATION_DONE = "correlation_done"
+UPDATE_GUARDRAIL_VERDICT = "guardrail_verdict"
+UPDATE_FINAL_SUMMARY = "final_summary"
+
+# Tool / sub-agent name -> update kind for its function response.
+_TOOL_UPDATES = {
+    "load_synthetic_alerts": UPDATE_ALERTS_LOADED,
+    "log_parser_agent": UPDATE_PARSER_DONE,
+    "correlation_agent": UPDATE_CORRELATION_DONE,
+    "guardrail_agent": UPDATE_GUARDRAIL_VERDICT,
+}
+
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+
+@dataclass
+class TriageUpdate:
+    """One step of a triage run, in the order it happened."""
+
+    kind: str
+    # Wall-clock time (ISO 8601, UTC) and seconds since the run started.
+    timestamp: str
+    elapsed_seconds: float
+    data: Dict[str, Any]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "timestamp": self.timestamp,
+            "elapsed_seconds": self.elapsed_seconds,
+            "data": self.data,
+        }
+
+
+def parse_guardrail_verdict(response: Any) -> Optional[Dict[str, Any]]:
+    """
+    Verdict dict from a guardrail_agent function response: the A2A
+    AgentTool wraps the JSON text as {"result": "..."}, function tools may
+    return the verdict itself. None if no normalized_action can be found.
+    """
+    if isinstance(response, dict) and "normalized_action" not in response:
+        response = response.get("result", response)
+    if isinstance(response, str):
+        match = _JSON_OBJECT_RE.search(response)
+        if not match:
+            return None
+        try:
+            response = json.loads(match.group(0))
+        except (json.JSONDecodeError, ValueError):
+            return None
+    if not isinstance(response, dict) or response.get("normalized_action") not in NORMALIZED_ACTIONS:
+        return None
+    return response
+
+
+def _tool_data(name: str, response: Any) -> Optional[Dict[str, Any]]:
+    result = response.get("result", response) if isinstance(response, dict) else response
+    if name == "load_synthetic_alerts":
+        alerts = result if isinstance(result, list) else []
+        return {
+            "count": len(alerts),
+            "alert_ids": [a.get("id") for a in alerts if isinstance(a, dict)],
+        }
+    if name == "guardrail_agent":
+        return parse_guardrail_verdict(response)
+    return {"text": "" if result is None else str(result)}
+
+
+def _text(content: Optional[types.Content]) -> str:
+    if content is None or not content.parts:
+        return ""
+    return "".join(part.text or "" for part in content.parts if not part.thought)
+
+
+async def stream_triage(
+    runner: Runner,
+    *,
+    user_id: str,
+    session_id: str,
+    new_message: Union[str, types.Content],
+    run_config: Optional[RunConfig] = None,
+) -> AsyncIterator[TriageUpdate]:
+    """
+    Run one triage turn and yield a TriageUpdate per completed step.
+
+    The final_summary update carries the root agent's answer and the
+    normalized action of the last guardrail verdict (None if the guardrail
+    was not called).
+    """
+    if isinstance(new_message, str):
+        new_message = types.Content(role="user", parts=[types.Part(text=new_message)])
+    started = time.perf_counter()
+    root_name = runner.agent.name if runner.agent is not None else None
+    verdict: Optional[Dict[str, Any]] = None
+    summary_parts: List[str] = []
+
+    def update(kind: str, data: Dict[str, Any]) -> TriageUpdate:
+        return TriageUpdate(
+            kind=kind,
+            timestamp=datetime.now(timezone.utc).isoformat(),
+            elapsed_seconds=round(time.perf_counter() - started, 6),
+            data=data,
+        )
+
+    async for event in runner.run_async(
+        user_id=user_id,
+        session_id=session_id,
+        new_message=new_message,
+        run_config=run_config,
+    ):
+        for response in event.get_function_responses():
+            kind = _TOOL_UPDATES.get(response.name)
+            if kind is None:
+                continue
+            data = _tool_data(response.name, response.response)
+            if data is None:
+                continue
+            if kind == UPDATE_GUARDRAIL_VERDICT:
+                verdict = data
+            yield update(kind, data)
+
+        if event.partial or (root_name and event.author != root_name):
+            continue
+        if event.is_final_response():
+            text = _text(event.content)
+            if text:
+                summary_parts.append(text)
+
+    yield update(
+        UPDATE_FINAL_SUMMARY,
+        {
+            "triage_summary": "".join(summary_parts),
+            "normalized_action": verdict.get("normalized_action") if verdict else None,
+            "guardrail_allow": verdict.get("allow") if verdict else None,
+        },
+    )
@@ -0,0 +1,334 @@
+"""Durable local work queue for sharded triage workers (SQLite, WAL mode).
+
+Each job is one alert ID assigned to a shard. Alerts are sharded by their
+primary entity (user, else host, else IP, else the alert ID), so every
+alert about the same entity is handled by the same worker. That worker's
+sessions and caches then see all of that entity's alerts.
+
+Delivery is at-least-once:
+  - lease() hands out ready jobs of one shard and hides them for a
+    visibility timeout. A job whose lease expires (the worker died or
+    stalled) becomes visible again and is re-delivered.
+  - Every lease gets a fresh token. ack()/nack()/extend() with a stale
+    token are ignored, so a worker that lost its lease cannot complete a job
+    that was re-delivered to someone else.
+  - nack() retries a job after a delay. A job delivered max_attempts times
+    without an ack is moved to 'dead'.
+
+Workers also write a heartbeat row (processed / failed / in-flight counts,
+last beat time), which stats() and the pool CLI report.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .correlation import extract_entities
+
+
+DEFAULT_QUEUE_DB = os.getenv("AEGIS_QUEUE_DB", "aegis_queue.db")
+DEFAULT_VISIBILITY_TIMEOUT_SECONDS = float(os.getenv("AEGIS_QUEUE_VISIBILITY_TIMEOUT_SECONDS", "300"))
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("AEGIS_QUEUE_MAX_ATTEMPTS", "5"))
+
+READY = "ready"
+LEASED = "leased"
+DONE = "done"
+DEAD = "dead"
+
+# Entity kinds in the order they are preferred as the shard key.
+_SHARD_ENTITY_ORDER = ("user", "host", "ip")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    shard INTEGER NOT NULL,
+    alert_id TEXT NOT NULL,
+    shard_key TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    visible_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_token TEXT,
+    enqueued_at REAL NOT NULL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_ready
+    ON jobs (shard, state, visible_at, job_id);
+
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    shard INTEGER NOT NULL,
+    pid INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    last_heartbeat REAL NOT NULL,
+    processed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    in_flight INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def shard_key(alert: Dict[str, Any]) -> str:
+    """The entity an alert is sharded on, e.g. 'user:alice@example.com'."""
+    entities = sorted(extract_entities(alert))
+    for kind in _SHARD_ENTITY_ORDER:
+        for entity in entities:
+            if entity.startswith(f"{kind}:"):
+                return entity
+    return f"alert:{alert.get('id')}"
+
+
+def shard_for(key: str, shards: int) -> int:
+    """Stable shard number for a key (identical across processes and runs)."""
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % max(1, shards)
+
+
+@dataclass
+class Lease:
+    job_id: int
+    alert_id: str
+    shard: int
+    token: str
+    attempts: int
+
+
+class WorkQueue:
+    """
+    SQLite-backed job queue shared by the dispatcher and worker processes.
+
+    Each process opens its own WorkQueue on the same file.
+    """
+
+    def __init__(
+        self,
+        db_path: str | Path | None = None,
+        *,
+        visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT_SECONDS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.db_path = str(db_path or DEFAULT_QUEUE_DB)
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max(1, max_attempts)
+        # Wall clock: lease deadlines are compared across processes.
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=10000")
+        self._conn.executescript(_SCHEMA)
+
+    def _transaction(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return result
+
+    # --- Producer ---------------------------------------------------------------
+
+    def enqueue(self, jobs: Iterable[Tuple[int, str, str]]) -> int:
+        """Add (shard, alert_id, shard_key) jobs; returns how many were added."""
+        now = self._clock()
+        rows = [(shard, alert_id, key, READY, now, now) for shard, alert_id, key in jobs]
+        self._transaction(
+            lambda conn: conn.executemany(
+                "INSERT INTO jobs (shard, alert_id, shard_key, state, visible_at, enqueued_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        )
+        return len(rows)
+
+    def enqueue_alerts(self, alerts: Iterable[Dict[str, Any]], shards: int) -> int:
+        """Shard alerts by entity and enqueue them."""
+        jobs = []
+        for alert in alerts:
+            key = shard_key(alert)
+            jobs.append((shard_for(key, shards), str(alert.get("id")), key))
+        return self.enqueue(jobs)
+
+    # --- Consumer ---------------------------------------------------------------
+
+    def lease(
+        self,
+        shard: int,
+        worker_id: str,
+        limit: int = 1,
+        visibility_timeout: Optional[float] = None,
+    ) -> List[Lease]:
+        """Lease up to `limit` visible jobs of `shard` (ready, or with an expired lease)."""
+        timeout = self.visibility_timeout if visibility_timeout is None else visibility_timeout
+
+        def take(conn: sqlite3.Connection) -> List[Lease]:
+            now = self._clock()
+            # Expired leases that already used every attempt are dead, not re-delivered.
+            conn.execute(
+                "UPDATE jobs SET state = ?, finished_at = ?, "
+                "error = COALESCE(error, 'lease expired after final attempt') "
+                "WHERE shard = ? AND state = ? AND visible_at <= ? AND attempts >= ?",
+                (DEAD, now, shard, LEASED, now, self.max_attempts),
+            )
+            rows = conn.execute(
+                "SELECT job_id, alert_id, attempts FROM jobs "
+                "WHERE shard = ? AND state IN (?, ?) AND visible_at <= ? "
+                "ORDER BY job_id LIMIT ?",
+                (shard, READY, LEASED, now, max(1, limit)),
+            ).fetchall()
+            leases = []
+            for job_id, alert_id, attempts in rows:
+                token = uuid.uuid4().hex
+                conn.execute(
+                    "UPDATE jobs SET state = ?, attempts = attempts + 1, visible_at = ?, "
+                    "lease_owner = ?, lease_token = ? WHERE job_id = ?",
+                    (LEASED, now + timeout, worker_id, token, job_id),
+                )
+                leases.append(Lease(job_id, alert_id, shard, token, attempts + 1))
+            return leases
+
+        return self._transaction(take)
+
+    def _update_leased(self, lease: Lease, sql: str, params: Tuple[Any, ...]) -> bool:
+        cursor = self._transaction(
+            lambda conn: conn.execute(
+                sql + " WHERE job_id = ? AND state = ? AND lease_token = ?",
+                (*params, lease.job_id, LEASED, lease.token),
+            )
+        )
+        return cursor.rowcount == 1
+
+    def extend(self, lease: Lease, visibility_timeout: Optional[float] = None) -> bool:
+        """Push the lease deadline out; False if the lease was lost."""
+        timeout = self.visibility_timeout if visibility_timeout is None else visibility_timeout
+        return self._update_leased(lease, "UPDATE jobs SET visible_at = ?", (self._clock() + timeout,))
+
+    def ack(self, lease: Lease, result: Optional[Dict[str, Any]] = None) -> bool:
+        """Mark the job done; False (and no change) if the lease was lost."""
+        return self._update_leased(
+            lease,
+            "UPDATE jobs SET state = ?, finished_at = ?, result = ?, error = NULL",
+            (DONE, self._clock(), json.dumps(result, default=str) if result is not None else None),
+        )
+
+    def nack(self, lease: Lease, error: str, retry_delay: float = 0.0) -> bool:
+        """Return the job for another attempt, or move it to 'dead' after the last one."""
+        now = self._clock()
+        if lease.attempts >= self.max_attempts:
+            return self._update_leased(
+                lease, "UPDATE jobs SET state = ?, finished_at = ?, error = ?", (DEAD, now, error)
+            )
+        return self._update_leased(
+            lease, "UPDATE jobs SET state = ?, visible_at = ?, error = ?", (READY, now + retry_delay, error)
+        )
+
+    # --- Heartbeats and stats ---------------------------------------------------
+
+    def heartbeat(
+        self,
+        worker_id: str,
+        shard: int,
+        *,
+        processed: int,
+        failed: int,
+        in_flight: int,
+        status: str = "running",
+        pid: Optional[int] = None,
+    ) -> None:
+        now = self._clock()
+        self._transaction(
+            lambda conn: conn.execute(
+                "INSERT INTO workers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (worker_id) DO UPDATE SET last_heartbeat = excluded.last_heartbeat, "
+                "processed = excluded.processed, failed = excluded.failed, "
+                "in_flight = excluded.in_flight, status = excluded.status, pid = excluded.pid",
+                (worker_id, shard, pid or os.getpid(), now, now, processed, failed, in_flight, status),
+            )
+        )
+
+    def pending(self, shard: Optional[int] = None) -> int:
+        """Jobs not yet done or dead (optionally for one shard)."""
+        sql = "SELECT COUNT(*) FROM jobs WHERE state IN (?, ?)"
+        params: Tuple[Any, ...] = (READY, LEASED)
+        if shard is not None:
+            sql += " AND shard = ?"
+            params += (shard,)
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()[0]
+
+    def results(self) -> List[Dict[str, Any]]:
+        """Finished jobs (done and dead) with their results, in job order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, alert_id, shard, shard_key, state, attempts, lease_owner, result, error "
+                "FROM jobs WHERE state IN (?, ?) ORDER BY job_id",
+                (DONE, DEAD),
+            ).fetchall()
+        return [
+            {
+                "job_id": job_id,
+                "alert_id": alert_id,
+                "shard": shard,
+                "shard_key": key,
+                "state": state,
+                "attempts": attempts,
+                "worker_id": owner,
+                "result": json.loads(result) if result else None,
+                "error": error,
+            }
+            for job_id, alert_id, shard, key, state, attempts, owner, result, error in rows
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        now = self._clock()
+        with self._lock:
+            by_state = dict(
+                self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+            )
+            by_shard: Dict[int, Dict[str, int]] = {}
+            for shard, state, count in self._conn.execute(
+                "SELECT shard, state, COUNT(*) FROM jobs GROUP BY shard, state"
+            ):
+                by_shard.setdefault(shard, {})[state] = count
+            workers = [
+                {
+                    "worker_id": worker_id,
+                    "shard": shard,
+                    "pid": pid,
+                    "status": status,
+                    "processed": processed,
+                    "failed": failed,
+                    "in_flight": in_flight,
+                    "seconds_since_heartbeat": round(now - last, 3),
+                }
+                for worker_id, shard, pid, last, processed, failed, in_flight, status in self._conn.execute(
+                    "SELECT worker_id, shard, pid, last_heartbeat, processed, failed, in_flight, status "
+                    "FROM workers ORDER BY shard, worker_id"
+                )
+            ]
+        return {
+            "jobs": {state: by_state.get(state, 0) for state in (READY, LEASED, DONE, DEAD)},
+            "shards": {str(k): v for k, v in sorted(by_shard.items())},
+            "workers": workers,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,308 @@
+"""Sharded multi-process triage over the durable work queue.
+
+The dispatcher shards the selected alerts by entity into a WorkQueue
+(work_queue.py) and starts one worker process per shard. Each worker
+leases jobs for its shard, triages them with batch triage (pre-triage
+rules, bounded concurrency, provider rate limiting), acks or nacks each
+job, and heartbeats its counters. While it works, it keeps extending its
+in-flight leases. A worker that crashes is restarted while its shard
+still has work. Its in-flight jobs are re-delivered once their leases
+expire.
+
+    python -m aegis_soc_sessions.worker_pool --workers 8 --severity high
+    python -m aegis_soc_sessions.worker_pool ALERT-001 ALERT-002 --workers 2 --results
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional
+
+from .alert_columns import get_alert_columns
+from .work_queue import DEFAULT_QUEUE_DB, DEFAULT_VISIBILITY_TIMEOUT_SECONDS, Lease, WorkQueue
+
+
+DEFAULT_WORKERS = int(os.getenv("AEGIS_WORKERS", "0")) or os.cpu_count() or 1
+DEFAULT_WORKER_CONCURRENCY = int(os.getenv("AEGIS_WORKER_CONCURRENCY", "4"))
+DEFAULT_HEARTBEAT_SECONDS = float(os.getenv("AEGIS_WORKER_HEARTBEAT_SECONDS", "5"))
+DEFAULT_POLL_SECONDS = 0.5
+# Delay before a failed job is offered again.
+DEFAULT_RETRY_DELAY_SECONDS = 5.0
+MAX_WORKER_RESTARTS = 3
+
+# triage(alert_ids) yields one result per alert: an object with `alert_id`,
+# `error` and `to_dict()`, such as batch.BatchTriageResult.
+TriageFn = Callable[[List[str]], AsyncIterator[Any]]
+
+
+def build_default_triage(concurrency: int = DEFAULT_WORKER_CONCURRENCY) -> TriageFn:
+    """Batch triage on this process's own runner, session service and model scheduler."""
+    from google.adk.runners import Runner
+
+    from .app import app, session_service
+    from .batch import triage_batch
+
+    runner = Runner(app=app, session_service=session_service)
+
+    async def triage(alert_ids: List[str]) -> AsyncIterator[Any]:
+        async for result in triage_batch(
+            alert_ids,
+            concurrency=concurrency,
+            runner=runner,
+            session_service=session_service,
+            user_id="worker-pool",
+        ):
+            yield result
+
+    return triage
+
+
+class ShardWorker:
+    """Leases, triages and acknowledges the jobs of one shard."""
+
+    def __init__(
+        self,
+        queue: WorkQueue,
+        shard: int,
+        triage: TriageFn,
+        *,
+        worker_id: Optional[str] = None,
+        concurrency: int = DEFAULT_WORKER_CONCURRENCY,
+        heartbeat_seconds: float = DEFAULT_HEARTBEAT_SECONDS,
+        poll_seconds: float = DEFAULT_POLL_SECONDS,
+        retry_delay: float = DEFAULT_RETRY_DELAY_SECONDS,
+        stop_when_empty: bool = True,
+    ) -> None:
+        self.queue = queue
+        self.shard = shard
+        self.triage = triage
+        self.worker_id = worker_id or f"shard{shard}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.concurrency = max(1, concurrency)
+        self.heartbeat_seconds = heartbeat_seconds
+        self.poll_seconds = poll_seconds
+        self.retry_delay = retry_delay
+        self.stop_when_empty = stop_when_empty
+        self.processed = 0
+        self.failed = 0
+        self.lost_leases = 0
+        # job_id -> lease, for the jobs leased but not yet settled.
+        self._in_flight: Dict[int, Lease] = {}
+        self._stopping = False
+
+    def stop(self) -> None:
+        self._stopping = True
+
+    def _beat(self, status: str = "running") -> None:
+        self.queue.heartbeat(
+            self.worker_id,
+            self.shard,
+            processed=self.processed,
+            failed=self.failed,
+            in_flight=len(self._in_flight),
+            status=status,
+        )
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            self._beat()
+            for lease in list(self._in_flight.values()):
+                if not self.queue.extend(lease):
+                    self.lost_leases += 1
+
+    async def run(self) -> None:
+        self._beat("starting")
+        heartbeat = asyncio.create_task(self._heartbeat_loop())
+        try:
+            while not self._stopping:
+                leases = self.queue.lease(self.shard, self.worker_id, limit=self.concurrency)
+                if leases:
+                    await self._process(leases)
+                    continue
+                if self.stop_when_empty and self.queue.pending(self.shard) == 0:
+                    break
+                # Nothing visible: wait for new jobs or for leases to expire.
+                await asyncio.sleep(self.poll_seconds)
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+            self._beat("stopped")
+
+    def _settle(self, lease: Lease, error: Optional[str], result: Optional[Dict[str, Any]] = None) -> None:
+        # Settled jobs are no longer extended or reported as in flight.
+        self._in_flight.pop(lease.job_id, None)
+        if error is None:
+            settled = self.queue.ack(lease, result)
+            self.processed += int(settled)
+        else:
+            settled = self.queue.nack(lease, error, retry_delay=self.retry_delay)
+            self.failed += 1
+        if not settled:
+            # The lease expired and the job went elsewhere; its outcome wins.
+            self.lost_leases += 1
+
+    async def _process(self, leases: List[Lease]) -> None:
+        by_alert: Dict[str, List[Lease]] = {}
+        for lease in leases:
+            by_alert.setdefault(lease.alert_id, []).append(lease)
+        self._in_flight = {lease.job_id: lease for lease in leases}
+        try:
+            async for result in self.triage(list(by_alert)):
+                for lease in by_alert.pop(result.alert_id, []):
+                    self._settle(lease, result.error, result.to_dict())
+        except Exception as exc:  # noqa: BLE001 - unsettled jobs are retried
+            error = f"{type(exc).__name__}: {exc}"
+        else:
+            error = "triage returned no result for this alert"
+        for pending in by_alert.values():
+            for lease in pending:
+                self._settle(lease, error)
+
+
+def dispatch(
+    queue: WorkQueue,
+    shards: int,
+    alert_ids: Optional[Iterable[str]] = None,
+    *,
+    source: Optional[str] = None,
+    severity: Optional[str] = None,
+    category: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> int:
+    """Select alerts (explicit IDs or feed filters), shard them by entity and enqueue them."""
+    columns = get_alert_columns()
+    if alert_ids is None:
+        ids = columns.ids(sources=source, severity=severity, category=category, limit=limit)
+    else:
+        ids = [str(a) for a in alert_ids][:limit]
+    # Unknown IDs still go through triage, which reports them as not found.
+    return queue.enqueue_alerts((columns.get(i) or {"id": i} for i in ids), shards)
+
+
+def _worker_main(
+    db_path: str,
+    shard: int,
+    visibility_timeout: float,
+    concurrency: int,
+    heartbeat_seconds: float,
+    triage_factory: Optional[Callable[[], TriageFn]],
+) -> None:
+    queue = WorkQueue(db_path, visibility_timeout=visibility_timeout)
+    triage = triage_factory() if triage_factory is not None else build_default_triage(concurrency)
+    worker = ShardWorker(
+        queue,
+        shard,
+        triage,
+        concurrency=concurrency,
+        heartbeat_seconds=heartbeat_seconds,
+    )
+    try:
+        asyncio.run(worker.run())
+    finally:
+        queue.close()
+
+
+def run_pool(
+    db_path: str,
+    workers: int = DEFAULT_WORKERS,
+    *,
+    visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT_SECONDS,
+    concurrency: int = DEFAULT_WORKER_CONCURRENCY,
+    heartbeat_seconds: float = DEFAULT_HEARTBEAT_SECONDS,
+    triage_factory: Optional[Callable[[], TriageFn]] = None,
+    max_restarts: int = MAX_WORKER_RESTARTS,
+) -> Dict[str, Any]:
+    """
+    Run one worker process per shard until every shard is drained.
+
+    `triage_factory` must be picklable (a module-level function), since
+    workers are started with the 'spawn' method. Returns the queue stats.
+    """
+    context = multiprocessing.get_context("spawn")
+
+    def start(shard: int) -> Any:
+        process = context.Process(
+            target=_worker_main,
+            args=(db_path, shard, visibility_timeout, concurrency, heartbeat_seconds, triage_factory),
+            name=f"aegis-triage-shard-{shard}",
+        )
+        process.start()
+        return process
+
+    queue = WorkQueue(db_path, visibility_timeout=visibility_timeout)
+    try:
+        processes = {shard: start(shard) for shard in range(max(1, workers))}
+        restarts = {shard: 0 for shard in processes}
+        while processes:
+            time.sleep(DEFAULT_POLL_SECONDS)
+            for shard, process in list(processes.items()):
+                if process.is_alive():
+                    continue
+                process.join()
+                crashed = process.exitcode != 0
+                if crashed and queue.pending(shard) and restarts[shard] < max_restarts:
+                    restarts[shard] += 1
+                    processes[shard] = start(shard)
+                else:
+                    del processes[shard]
+        stats = queue.stats()
+        stats["restarts"] = {str(k): v for k, v in restarts.items() if v}
+        return stats
+    finally:
+        queue.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Triage alerts with sharded worker processes.")
+    parser.add_argument("alert_ids", nargs="*", help="Alert IDs (default: select with the filters)")
+    parser.add_argument("--source")
+    parser.add_argument("--severity")
+    parser.add_argument("--category")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Worker processes (= shards)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_WORKER_CONCURRENCY, help="Triages in flight per worker")
+    parser.add_argument("--db", default=DEFAULT_QUEUE_DB, help="Queue database file")
+    parser.add_argument("--visibility-timeout", type=float, default=DEFAULT_VISIBILITY_TIMEOUT_SECONDS)
+    parser.add_argument("--heartbeat", type=float, default=DEFAULT_HEARTBEAT_SECONDS)
+    parser.add_argument("--results", action="store_true", help="Print per-alert results as JSON lines")
+    args = parser.parse_args(argv)
+
+    queue = WorkQueue(args.db, visibility_timeout=args.visibility_timeout)
+    try:
+        enqueued = dispatch(
+            queue,
+            args.workers,
+            args.alert_ids or None,
+            source=args.source,
+            severity=args.severity,
+            category=args.category,
+            limit=args.limit,
+        )
+    finally:
+        queue.close()
+    started = time.perf_counter()
+    stats = run_pool(
+        args.db,
+        args.workers,
+        visibility_timeout=args.visibility_timeout,
+        concurrency=args.concurrency,
+        heartbeat_seconds=args.heartbeat,
+    )
+    stats.update(enqueued=enqueued, elapsed_seconds=round(time.perf_counter() - started, 3))
+    if args.results:
+        queue = WorkQueue(args.db)
+        for row in queue.results():
+            print(json.dumps(row, default=str))
+        queue.close()
+    print(json.dumps(stats, indent=2))
+    return 0 if not stats["jobs"].get("dead") else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
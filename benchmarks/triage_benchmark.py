@@ -0,0 +1,330 @@
+"""Throughput / latency benchmark for the triage pipeline.
+
+Runs the real root agent graph (root -> load_synthetic_alerts -> log parser
+-> correlator -> A2A guardrail) with every Gemini model replaced by the
+deterministic StubModel from tests/helpers.py, and the guardrail A2A app
+served in-process over httpx.ASGITransport. Nothing leaves the process, so
+numbers are comparable across commits.
+
+For every combination of alert-file scale, concurrency and session count it
+reports alerts/sec, end-to-end p50/p95/p99 latency, per-hop span latency,
+guardrail HTTP latency and peak RSS, and writes everything to JSON.
+
+Usage:
+    python -m benchmarks.triage_benchmark --scales 1,10,100 \\
+        --concurrency 1,8,32 --sessions 50,200 --output bench.json
+
+Each run executes in a fresh spawned process by default (--no-isolate to
+disable) so peak RSS and warm caches are per configuration.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported.
+    resource = None  # type: ignore[assignment]
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+BASE_ALERTS_PATH = REPO_ROOT / "data" / "synthetic_alerts.json"
+STUB_MODEL_NAME = "gemini-2.5-flash-lite"
+ROOT_STEPS = ["load_synthetic_alerts", "log_parser_agent", "correlation_agent", "guardrail_agent"]
+STUB_VERDICT = {"allow": True, "normalized_action": "MONITOR", "rationale": "Stub guardrail verdict."}
+
+
+# --- Synthetic scaling -------------------------------------------------------
+
+
+def _shift(timestamp: Any, hours: int) -> Any:
+    if not isinstance(timestamp, str) or hours == 0:
+        return timestamp
+    try:
+        ts = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return timestamp
+    return (ts + timedelta(hours=hours)).isoformat().replace("+00:00", "Z")
+
+
+def scale_alerts(alerts: List[Dict[str, Any]], factor: int) -> List[Dict[str, Any]]:
+    """`factor` copies of the feed; copy n gets '-x<n>' ids and +n hours."""
+    scaled: List[Dict[str, Any]] = []
+    for n in range(factor):
+        for alert in alerts:
+            clone = dict(alert)
+            if n:
+                clone["id"] = f"{alert.get('id')}-x{n}"
+                clone["timestamp"] = _shift(alert.get("timestamp"), n)
+            scaled.append(clone)
+    return scaled
+
+
+def write_scaled_feed(factor: int, directory: Path) -> Path:
+    with BASE_ALERTS_PATH.open("r", encoding="utf-8") as f:
+        alerts = json.load(f)
+    path = directory / f"alerts_x{factor}.ndjson"
+    with path.open("w", encoding="utf-8") as f:
+        for alert in scale_alerts(alerts, factor):
+            f.write(json.dumps(alert) + "\n")
+    return path
+
+
+# --- Stub pipeline -----------------------------------------------------------
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(values)
+
+    def pick(pct: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": pick(50),
+        "p95": pick(95),
+        "p99": pick(99),
+        "max": ordered[-1],
+    }
+
+
+@asynccontextmanager
+async def stub_pipeline(model_delay: float = 0.0) -> AsyncIterator[Any]:
+    """
+    Swap every model for StubModel and route the guardrail hop to the
+    in-process A2A app; restores the originals on exit. Yields the
+    GuardrailHttpPool so its HTTP metrics can be read.
+    """
+    import httpx
+
+    from aegis_soc_sessions.agent import (
+        correlation_agent,
+        guardrail_remote_agent,
+        log_parser_agent,
+        root_agent,
+    )
+    from aegis_soc_sessions.guardrail_client import GuardrailHttpPool
+    from guardrail_agent.agent import guardrail_agent
+    from guardrail_agent.app import app as guardrail_app
+    from tests.helpers import StubModel
+
+    stubs = [
+        (root_agent, StubModel(model=STUB_MODEL_NAME, steps=ROOT_STEPS, delay=model_delay)),
+        (log_parser_agent, StubModel(model=STUB_MODEL_NAME, delay=model_delay)),
+        (correlation_agent, StubModel(model=STUB_MODEL_NAME, delay=model_delay)),
+        # Only reached when the guardrail's rule fast path and cache both pass.
+        (guardrail_agent, StubModel(model=STUB_MODEL_NAME, text=json.dumps(STUB_VERDICT))),
+    ]
+    originals = [(agent, agent.model) for agent, _ in stubs]
+    pool = GuardrailHttpPool(transport=httpx.ASGITransport(app=guardrail_app))
+
+    for agent, stub in stubs:
+        agent.model = stub
+    original_pool = guardrail_remote_agent.use_pool(pool)
+    try:
+        async with guardrail_app.router.lifespan_context(guardrail_app):
+            yield pool
+    finally:
+        for agent, model in originals:
+            agent.model = model
+        guardrail_remote_agent.use_pool(original_pool)
+        await pool.aclose()
+
+
+async def _run_config(
+    alerts_path: Path, concurrency: int, sessions: int, model_delay: float
+) -> Dict[str, Any]:
+    from aegis_soc_sessions.alert_columns import use_alert_feed
+
+    # The tools read the process-wide feed; point this run (and the tasks it
+    # starts) at the scaled one. An env var would be read only once per process.
+    with use_alert_feed(alerts_path) as columns:
+        return await _run_feed(columns.ids(), concurrency, sessions, model_delay)
+
+
+async def _run_feed(
+    ids: List[str], concurrency: int, sessions: int, model_delay: float
+) -> Dict[str, Any]:
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+
+    from aegis_soc_sessions.app import app
+    from aegis_soc_sessions.batch import ProviderRateLimiter, triage_batch
+    from aegis_soc_sessions.observability import EVENT_SPAN
+
+    alert_ids = [ids[i % len(ids)] for i in range(sessions)]
+
+    session_service = InMemorySessionService()
+    runner = Runner(app=app, session_service=session_service)
+    latencies: List[float] = []
+    errors = 0
+    session_ids: List[str] = []
+
+    async with stub_pipeline(model_delay) as pool:
+        started = time.perf_counter()
+        async for result in triage_batch(
+            alert_ids,
+            concurrency=concurrency,
+            runner=runner,
+            session_service=session_service,
+            limiter=ProviderRateLimiter(rate_per_second=0),
+        ):
+            latencies.append(result.latency_seconds)
+            errors += int(result.error is not None)
+            if result.session_id:
+                session_ids.append(result.session_id)
+        elapsed = time.perf_counter() - started
+        guardrail_http = pool.metrics.snapshot()
+
+    hops: Dict[str, List[float]] = {}
+    for session_id in session_ids:
+        session = await session_service.get_session(
+            app_name=runner.app_name, user_id="batch-triage", session_id=session_id
+        )
+        for event in (session.state.get("events") or []) if session else []:
+            if event.get("event_type") == EVENT_SPAN:
+                details = event["details"]
+                hops.setdefault(f"{details['kind']}:{details['name']}", []).append(
+                    details["duration_ms"] / 1000.0
+                )
+
+    return {
+        "alerts_in_file": len(ids),
+        "concurrency": concurrency,
+        "sessions": sessions,
+        "model_delay_seconds": model_delay,
+        "elapsed_seconds": elapsed,
+        "alerts_per_second": sessions / elapsed if elapsed else 0.0,
+        "errors": errors,
+        "latency_seconds": _percentiles(latencies),
+        "hops_seconds": {name: _percentiles(v) for name, v in sorted(hops.items())},
+        "guardrail_http": guardrail_http,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (
+        1024 * 1024 if sys.platform == "darwin" else 1024
+    )
+
+
+def run_config(
+    alerts_path: str, concurrency: int, sessions: int, model_delay: float = 0.0
+) -> Dict[str, Any]:
+    """Run one benchmark configuration in this process."""
+    return asyncio.run(_run_config(Path(alerts_path), concurrency, sessions, model_delay))
+
+
+def _run_isolated(alerts_path: str, concurrency: int, sessions: int, model_delay: float) -> Dict[str, Any]:
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        return pool.apply(run_config, (alerts_path, concurrency, sessions, model_delay))
+
+
+# --- CLI ---------------------------------------------------------------------
+
+
+def _ints(text: str) -> List[int]:
+    return [int(part) for part in text.split(",") if part.strip()]
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run_benchmarks(
+    scales: List[int],
+    concurrency_levels: List[int],
+    session_counts: List[int],
+    model_delay: float = 0.0,
+    isolate: bool = True,
+) -> Dict[str, Any]:
+    runs: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory(prefix="aegis-bench-") as tmp:
+        for scale in scales:
+            path = str(write_scaled_feed(scale, Path(tmp)))
+            for concurrency in concurrency_levels:
+                for sessions in session_counts:
+                    runner = _run_isolated if isolate else run_config
+                    result = runner(path, concurrency, sessions, model_delay)
+                    result["scale"] = scale
+                    runs.append(result)
+                    rss = result["peak_rss_mb"]
+                    print(
+                        f"scale={scale:<4} concurrency={concurrency:<3} sessions={sessions:<5} "
+                        f"{result['alerts_per_second']:8.1f} alerts/s  "
+                        f"p95={result['latency_seconds']['p95'] * 1000:7.1f} ms  "
+                        f"rss={'n/a' if rss is None else f'{rss:6.1f} MB'}",
+                        file=sys.stderr,
+                    )
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "isolated": isolate,
+        },
+        "runs": runs,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--scales", default="1,10", help="Alert-file multipliers, e.g. 1,10,100")
+    parser.add_argument("--concurrency", default="1,8", help="Concurrent sessions, e.g. 1,8,32")
+    parser.add_argument("--sessions", default="50", help="Triage sessions per run, e.g. 50,200")
+    parser.add_argument(
+        "--model-delay-ms", type=float, default=0.0,
+        help="Simulated latency of each stub model call",
+    )
+    parser.add_argument("--no-isolate", action="store_true", help="Run every config in this process")
+    parser.add_argument("--output", default="-", help="JSON output path ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(
+        _ints(args.scales),
+        _ints(args.concurrency),
+        _ints(args.sessions),
+        model_delay=args.model_delay_ms / 1000.0,
+        isolate=not args.no_isolate,
+    )
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,5 +1,40 @@
 # guardrail_agent/__init__.py
-from .agent import guardrail_agent
-from .app import app
+"""Guardrail agent and its A2A service, resolved on first access (PEP 562).
+
+`guardrail_agent.rules` and `guardrail_agent.cache` can be imported on their
+own without building the agent or the A2A app.
+"""
+
+from __future__ import annotations
+
+import importlib
+import sys
+import types
+from typing import Any
+
+_LAZY_EXPORTS = {
+    "guardrail_agent": ".agent",
+    "app": ".app",
+}
 
 __all__ = ["guardrail_agent", "app"]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+class _Package(types.ModuleType):
+    def __setattr__(self, name: str, value: Any) -> None:
+        # Keep `app` bound to the Starlette app, not the `.app` submodule.
+        if name in _LAZY_EXPORTS and isinstance(value, types.ModuleType):
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
@@ -1,7 +1,17 @@
 import textwrap
+import threading
+from typing import Any
 
 from google.adk.agents import LlmAgent
-from google.adk.models import Gemini
+
+from aegis_soc_sessions.model_replay import build_model
+
+from .cache import (
+    cached_verdict_callback,
+    release_on_model_error_callback,
+    store_verdict_callback,
+)
+from .rules import rule_based_guardrail_callback
 
 ALLOWED_ACTIONS = ["ESCALATE", "MONITOR", "CLOSE", "NEEDS_MORE_INFO"]
 
@@ -53,12 +63,35 @@ guardrail_instruction = textwrap.dedent(
 )
 
 
-guardrail_agent = LlmAgent(
-    model=Gemini(model="gemini-2.5-flash-lite"),
-    name="guardrail_agent",
-    description=(
-        "Guardrail agent that validates SOC triage recommendations and "
-        "normalizes actions."
-    ),
-    instruction=guardrail_instruction,
-)
+def build_guardrail_agent() -> LlmAgent:
+    """Build the guardrail LlmAgent with its rule and cache callbacks."""
+    return LlmAgent(
+        # Plain Gemini unless AEGIS_MODEL_MODE selects record/replay.
+        model=build_model("gemini-2.5-flash-lite"),
+        name="guardrail_agent",
+        description=(
+            "Guardrail agent that validates SOC triage recommendations and "
+            "normalizes actions."
+        ),
+        instruction=guardrail_instruction,
+        # Deterministic pre-filter, then the verdict cache: decidable or
+        # repeated payloads never reach Gemini, and identical concurrent
+        # payloads share one call.
+        before_model_callback=[rule_based_guardrail_callback, cached_verdict_callback],
+        after_model_callback=store_verdict_callback,
+        on_model_error_callback=release_on_model_error_callback,
+    )
+
+
+# Built on first access (PEP 562), so importing this module for its
+# instruction or constants does not construct the agent.
+_agent_lock = threading.Lock()
+
+
+def __getattr__(name: str) -> Any:
+    if name != "guardrail_agent":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _agent_lock:
+        if "guardrail_agent" not in globals():
+            globals()["guardrail_agent"] = build_guardrail_agent()
+    return globals()["guardrail_agent"]
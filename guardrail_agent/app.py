@@ -1,14 +1,39 @@
 from google.adk.a2a.utils.agent_to_a2a import to_a2a
+from starlette.requests import Request
+from starlette.responses import JSONResponse
 
 from .agent import guardrail_agent
+from .batch import batch_endpoint
+from .cache import decision_cache, single_flight
+from .serving import ConcurrencyLimiter, ConcurrencyLimitMiddleware
 
 # FastAPI/Starlette A2A app
 app = to_a2a(guardrail_agent, port=8001)
 
+# Bounded concurrency + queue; overflow gets 429 with Retry-After.
+concurrency_limiter = ConcurrencyLimiter()
+app.add_middleware(ConcurrencyLimitMiddleware, limiter=concurrency_limiter)
+
+
+async def cache_stats(request: Request) -> JSONResponse:
+  """Expose decision-cache hit/miss counters for dashboards and load tests."""
+  return JSONResponse({**decision_cache.stats(), "single_flight": single_flight.stats()})
+
+
+async def serving_stats(request: Request) -> JSONResponse:
+  """Admission-control counters: active, waiting, admitted and rejected requests."""
+  return JSONResponse(concurrency_limiter.stats())
+
+
+app.add_route("/cache/stats", cache_stats, methods=["GET"])
+app.add_route("/serving/stats", serving_stats, methods=["GET"])
+# Bulk validation: rules + cache in bulk, one model call for the remainder.
+app.add_route("/validate/batch", batch_endpoint, methods=["POST"])
+
 
 if __name__ == "__main__":
-  # Optional convenience entry point for local testing:
-  #   python -m guardrail_agent.app
-  import uvicorn
+  # Local / production entry point (see serving.py for worker and limit flags):
+  #   python -m guardrail_agent.app --workers 4
+  from .serving import main
 
-  uvicorn.run("guardrail_agent.app:app", host="127.0.0.1", port=8001, reload=False)
+  raise SystemExit(main())
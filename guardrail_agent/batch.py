@@ -0,0 +1,256 @@
+"""Bulk guardrail validation: POST /validate/batch.
+
+The endpoint takes up to GUARDRAIL_BATCH_MAX_ITEMS
+`{proposed_action, evidence_summary, triage_summary}` payloads. Each one goes
+through the same layers as a single A2A request, but in bulk:
+
+  1. the compiled rule fast path (rules.evaluate_payload),
+  2. the verdict cache,
+  3. single-flight: a payload already in flight elsewhere waits for that call.
+
+Only the ambiguous remainder reaches the model. It is sent as one
+structured, multi-item prompt that must answer with a JSON array of
+verdicts. Items the model skips or answers malformed fail closed
+(NEEDS_MORE_INFO, allow=false) and are not cached.
+
+    POST /validate/batch   {"items": [{...}, {...}]}
+    -> {"verdicts": [{allow, normalized_action, rationale, source}, ...],
+        "sources": {"rules": 3, "cache": 1, "model": 2}, "model_calls": 1}
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import textwrap
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from google.adk.models.base_llm import BaseLlm
+    from google.adk.models.llm_request import LlmRequest
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse
+
+from .cache import decision_cache, payload_key, single_flight
+from .rules import ACTION_PATTERNS, PAYLOAD_FIELDS, evaluate_payload
+
+
+logger = logging.getLogger(__name__)
+
+GUARDRAIL_BATCH_MAX_ITEMS = int(os.getenv("GUARDRAIL_BATCH_MAX_ITEMS", "32"))
+
+ALLOWED_ACTIONS = set(ACTION_PATTERNS)
+
+# Appended to the guardrail instruction for multi-item prompts.
+BATCH_INSTRUCTION = textwrap.dedent(
+    """
+    BATCH MODE:
+    The user message is a JSON array of payloads, each with an integer
+    "index". Judge every payload independently, using the rules above.
+    Output STRICT JSON only: an array with exactly one object per payload,
+    each with keys index, allow, normalized_action and rationale.
+    """
+)
+
+
+def _fail_closed(rationale: str) -> Dict[str, Any]:
+    return {"allow": False, "normalized_action": "NEEDS_MORE_INFO", "rationale": rationale}
+
+
+def normalize_verdict(raw: Any) -> Optional[Dict[str, Any]]:
+    """Validate one model verdict; None unless it matches the guardrail contract."""
+    if not isinstance(raw, dict):
+        return None
+    action = str(raw.get("normalized_action") or "").strip().upper()
+    allow = raw.get("allow")
+    if action not in ALLOWED_ACTIONS or not isinstance(allow, bool):
+        return None
+    return {"allow": allow, "normalized_action": action, "rationale": str(raw.get("rationale") or "")}
+
+
+def parse_batch_verdicts(text: str, count: int) -> List[Optional[Dict[str, Any]]]:
+    """
+    Map a model's JSON-array answer onto `count` items.
+
+    Entries are matched by their "index" when present, otherwise by
+    position. Missing or malformed entries come back as None.
+    """
+    verdicts: List[Optional[Dict[str, Any]]] = [None] * count
+    text = text.replace("```json", "").replace("```", "").strip()
+    try:
+        parsed = json.loads(text)
+    except (json.JSONDecodeError, ValueError):
+        return verdicts
+    if isinstance(parsed, dict):
+        parsed = parsed.get("verdicts")
+    if not isinstance(parsed, list):
+        return verdicts
+    for position, raw in enumerate(parsed):
+        index = raw.get("index", position) if isinstance(raw, dict) else position
+        if isinstance(index, int) and 0 <= index < count and verdicts[index] is None:
+            verdicts[index] = normalize_verdict(raw)
+    return verdicts
+
+
+def build_batch_request(
+    payloads: List[Dict[str, Any]], model_name: str, instruction: str
+) -> LlmRequest:
+    """One LlmRequest judging every payload, answered as a JSON array."""
+    from google.adk.models.llm_request import LlmRequest
+    from google.genai import types
+
+    items = [
+        {"index": i, **{field: str(p.get(field) or "") for field in PAYLOAD_FIELDS}}
+        for i, p in enumerate(payloads)
+    ]
+    return LlmRequest(
+        model=model_name,
+        contents=[types.Content(role="user", parts=[types.Part(text=json.dumps(items))])],
+        config=types.GenerateContentConfig(
+            system_instruction=instruction + BATCH_INSTRUCTION,
+            response_mime_type="application/json",
+        ),
+    )
+
+
+def _default_model() -> Tuple[BaseLlm, str]:
+    from .agent import guardrail_agent, guardrail_instruction
+
+    return guardrail_agent.canonical_model, guardrail_instruction
+
+
+async def judge_with_model(
+    payloads: List[Dict[str, Any]],
+    model: Optional[BaseLlm] = None,
+    instruction: Optional[str] = None,
+) -> List[Optional[Dict[str, Any]]]:
+    """Send `payloads` to the model as a single prompt; one verdict (or None) each."""
+    if not payloads:
+        return []
+    if model is None:
+        model, default_instruction = _default_model()
+        instruction = instruction if instruction is not None else default_instruction
+    request = build_batch_request(payloads, model.model, instruction or "")
+    text = ""
+    async for response in model.generate_content_async(request, stream=False):
+        if response.partial or response.content is None:
+            continue
+        text += "".join(part.text or "" for part in response.content.parts or [])
+    return parse_batch_verdicts(text, len(payloads))
+
+
+async def validate_batch(
+    items: List[Any],
+    model: Optional[BaseLlm] = None,
+    instruction: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Decide every item: rules, cache and single-flight first, then one model call."""
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    # key -> indexes of items sharing that payload (deduplicated per batch).
+    pending: Dict[str, List[int]] = {}
+    payloads: Dict[str, Dict[str, Any]] = {}
+
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[i] = {**_fail_closed("Batch item is not a JSON object."), "source": "invalid"}
+            continue
+        verdict = evaluate_payload(item)
+        if verdict is not None:
+            results[i] = {**verdict, "source": "rules"}
+            continue
+        key = payload_key(item)
+        if key not in pending:
+            cached = decision_cache.get(key) if decision_cache.enabled else None
+            if cached is not None:
+                results[i] = {**cached, "source": "cache"}
+                continue
+            payloads[key] = item
+        pending.setdefault(key, []).append(i)
+
+    leading: List[str] = []
+    following: Dict[str, "asyncio.Future[Optional[Dict[str, Any]]]"] = {}
+    for key in pending:
+        future = single_flight.claim(key) if single_flight.enabled else None
+        if future is None:
+            leading.append(key)
+        else:
+            following[key] = future
+
+    decided: Dict[str, Tuple[Dict[str, Any], str]] = {}
+    model_calls = 0
+
+    async def judge(keys: List[str]) -> None:
+        nonlocal model_calls
+        if not keys:
+            return
+        model_calls += 1
+        verdicts = await judge_with_model([payloads[k] for k in keys], model, instruction)
+        for key, verdict in zip(keys, verdicts):
+            if verdict is None:
+                decided[key] = (
+                    _fail_closed("The guardrail model returned no valid verdict for this item."),
+                    "model_invalid",
+                )
+                continue
+            decision_cache.put(key, verdict)
+            decided[key] = (verdict, "model")
+
+    async def lead() -> None:
+        try:
+            await judge(leading)
+        finally:
+            for key in leading:
+                verdict = decided.get(key)
+                single_flight.resolve(key, verdict[0] if verdict and verdict[1] == "model" else None)
+
+    async def follow() -> List[str]:
+        keys = list(following)
+        verdicts = await asyncio.gather(*(single_flight.follow(following[k], k) for k in keys))
+        orphans = []
+        for key, verdict in zip(keys, verdicts):
+            if verdict is None:
+                orphans.append(key)
+            else:
+                decided[key] = (verdict, "coalesced")
+        return orphans
+
+    # Our own model call runs while we wait on other callers' in-flight keys,
+    # so two batches leading each other's keys cannot deadlock.
+    _, orphans = await asyncio.gather(lead(), follow())
+    # Keys whose leader elsewhere failed or timed out are judged here.
+    await judge(orphans)
+
+    for key, indexes in pending.items():
+        verdict, source = decided[key]
+        for i in indexes:
+            results[i] = {**verdict, "source": source}
+
+    sources: Dict[str, int] = {}
+    for result in results:
+        sources[result["source"]] = sources.get(result["source"], 0) + 1
+    return {"verdicts": results, "sources": sources, "model_calls": model_calls}
+
+
+async def batch_endpoint(request: Request) -> JSONResponse:
+    """POST /validate/batch handler."""
+    from starlette.responses import JSONResponse
+
+    try:
+        body = await request.json()
+    except ValueError:
+        return JSONResponse({"error": "request body must be JSON"}, status_code=400)
+    items = body.get("items") if isinstance(body, dict) else None
+    if not isinstance(items, list):
+        return JSONResponse({"error": "expected {\"items\": [...]}"}, status_code=400)
+    if len(items) > GUARDRAIL_BATCH_MAX_ITEMS:
+        return JSONResponse(
+            {"error": f"at most {GUARDRAIL_BATCH_MAX_ITEMS} items per batch"}, status_code=413
+        )
+    try:
+        result = await validate_batch(items)
+    except Exception as exc:
+        logger.exception("Guardrail batch validation failed")
+        return JSONResponse({"error": f"guardrail model call failed: {exc}"}, status_code=502)
+    return JSONResponse(result)
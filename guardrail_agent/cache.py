@@ -0,0 +1,381 @@
+"""Content-addressed cache of guardrail verdicts.
+
+Identical `{proposed_action, evidence_summary, triage_summary}` payloads are
+common during alert storms. The cache keys on a canonical hash of the payload
+and serves repeated requests without calling the model. Identical payloads
+that arrive while the first one is still waiting on the model are coalesced
+onto that single call (single-flight) instead of each calling the model.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from google.adk.agents.callback_context import CallbackContext
+    from google.adk.models.llm_request import LlmRequest
+    from google.adk.models.llm_response import LlmResponse
+
+from .rules import PAYLOAD_FIELDS, latest_user_text, parse_payload, verdict_response
+
+
+DEFAULT_TTL_SECONDS = float(os.getenv("GUARDRAIL_CACHE_TTL_SECONDS", "300"))
+DEFAULT_MAX_ENTRIES = int(os.getenv("GUARDRAIL_CACHE_MAX_ENTRIES", "1024"))
+# How long a duplicate request waits for the in-flight leader; 0 disables
+# coalescing.
+DEFAULT_COALESCE_TIMEOUT_SECONDS = float(os.getenv("GUARDRAIL_COALESCE_TIMEOUT_SECONDS", "60"))
+
+# Per-invocation state key carrying the cache key from the before- to the
+# after-model callback ("temp:" keys are never persisted by ADK).
+PENDING_KEY_STATE = "temp:guardrail_cache_key"
+# Set when this invocation owns the in-flight model call for its key.
+LEADER_STATE = "temp:guardrail_single_flight_leader"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _canonical_text(value: Any) -> str:
+    return _WHITESPACE_RE.sub(" ", str(value if value is not None else "")).strip()
+
+
+def payload_key(payload: Dict[str, Any]) -> str:
+    """
+    Stable SHA-256 key for a guardrail payload.
+
+    Only the three contract fields participate, and whitespace is collapsed,
+    so cosmetic differences (key order, extra metadata, reflowed text) still
+    hit the same entry.
+    """
+    canonical = {field: _canonical_text(payload.get(field)) for field in PAYLOAD_FIELDS}
+    blob = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def request_key(text: str) -> str:
+    """Cache key for a raw request message (structured payload or free text)."""
+    payload = parse_payload(text)
+    if payload is not None:
+        return payload_key(payload)
+    blob = _canonical_text(text)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class DecisionCache:
+    """
+    Thread-safe LRU cache with per-entry TTL and hit/miss counters.
+
+    A ttl_seconds or max_entries of 0 disables caching entirely.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, verdict = entry
+            if self._clock() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(verdict)
+
+    def put(self, key: str, verdict: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, dict(verdict))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+decision_cache = DecisionCache()
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight requests onto one model call.
+
+    The first request for a key becomes the leader and calls the model.
+    Requests for the same key that arrive before it finishes await the
+    leader's verdict instead. If the leader fails or produces no usable
+    verdict, one waiter takes over as the new leader. A leader whose task
+    ends without resolving (e.g. cancelled on a client disconnect, when no
+    model callback runs) is abandoned and its waiters re-elect at once; a
+    waiter that times out replaces the stuck leader's entry and leads.
+    """
+
+    def __init__(self, timeout_seconds: float = DEFAULT_COALESCE_TIMEOUT_SECONDS) -> None:
+        self.timeout_seconds = timeout_seconds
+        self._inflight: Dict[str, "asyncio.Future[Optional[Dict[str, Any]]]"] = {}
+        # key -> (leader task, its done-callback)
+        self._leader_tasks: Dict[str, Tuple["asyncio.Task[Any]", Callable[[Any], None]]] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.abandoned = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.timeout_seconds > 0
+
+    def _lead(self, key: str) -> None:
+        """Make the current task the leader of `key`, releasing any stale leader's waiters."""
+        stale = self._inflight.get(key)
+        if stale is not None and not stale.done():
+            self.resolve(key, None)
+        self._forget_leader(key)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.leaders += 1
+        task = asyncio.current_task()
+        if task is None:
+            return
+
+        def abandoned(_: Any) -> None:
+            # The leader's task ended (or was cancelled) without resolving.
+            if self._inflight.get(key) is future:
+                self.abandoned += 1
+                self.resolve(key, None)
+
+        task.add_done_callback(abandoned)
+        self._leader_tasks[key] = (task, abandoned)
+
+    def _forget_leader(self, key: str) -> None:
+        leader = self._leader_tasks.pop(key, None)
+        if leader is not None:
+            leader[0].remove_done_callback(leader[1])
+
+    def claim(self, key: str) -> "Optional[asyncio.Future[Optional[Dict[str, Any]]]]":
+        """Lead `key` and return None, or return the in-flight leader's future."""
+        loop = asyncio.get_running_loop()
+        future = self._inflight.get(key)
+        leader = self._leader_tasks.get(key)
+        if (
+            future is None
+            or future.done()
+            or future.get_loop() is not loop
+            or (leader is not None and leader[0].done())
+        ):
+            self._lead(key)
+            return None
+        return future
+
+    def _release_stale(self, key: Optional[str], future: "asyncio.Future[Any]") -> bool:
+        """Drop `key`'s entry if it is still the stuck `future`; True if it was."""
+        if key is None or self._inflight.get(key) is not future:
+            return False
+        self.resolve(key, None)
+        return True
+
+    async def follow(
+        self, future: "asyncio.Future[Optional[Dict[str, Any]]]", key: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Await a claimed leader's verdict; None if it gave up or timed out.
+        On a timeout the stuck leader's entry for `key` is dropped, so later
+        requests do not wait on it too.
+        """
+        try:
+            verdict = await asyncio.wait_for(asyncio.shield(future), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self._release_stale(key, future)
+            return None
+        if verdict is None:
+            return None
+        self.coalesced += 1
+        return dict(verdict)
+
+    async def wait_or_lead(self, key: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Return (True, None) to lead, (False, verdict) when coalesced, or
+        (False, None) to call the model without leading (a newer leader
+        took over while this request timed out).
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout_seconds
+        while True:
+            future = self.claim(key)
+            if future is None:
+                return True, None
+            remaining = deadline - loop.time()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                verdict = await asyncio.wait_for(asyncio.shield(future), remaining)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                # Replace the stuck leader so the key is not poisoned for
+                # every later request.
+                if self._release_stale(key, future) or key not in self._inflight:
+                    self._lead(key)
+                    return True, None
+                return False, None
+            if verdict is not None:
+                self.coalesced += 1
+                return False, dict(verdict)
+            # The leader gave up without a verdict; loop to elect a new one.
+
+    def resolve(self, key: str, verdict: Optional[Dict[str, Any]]) -> None:
+        """Release the waiters on `key` with the leader's verdict (or None)."""
+        future = self._inflight.pop(key, None)
+        self._forget_leader(key)
+        if future is None or future.done():
+            return
+        result = dict(verdict) if verdict is not None else None
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is future.get_loop():
+            future.set_result(result)
+        else:
+            future.get_loop().call_soon_threadsafe(
+                lambda: future.done() or future.set_result(result)
+            )
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+            "abandoned": self.abandoned,
+            "timeout_seconds": self.timeout_seconds,
+        }
+
+    def clear(self) -> None:
+        for key in list(self._inflight):
+            self.resolve(key, None)
+        self.leaders = self.coalesced = self.timeouts = self.abandoned = 0
+
+
+single_flight = SingleFlight()
+
+
+def _parse_verdict(llm_response: LlmResponse) -> Optional[Dict[str, Any]]:
+    if llm_response.partial or llm_response.content is None:
+        return None
+    text = "".join(part.text or "" for part in llm_response.content.parts or [])
+    text = text.replace("```json", "").replace("```", "").strip()
+    try:
+        verdict = json.loads(text)
+    except (json.JSONDecodeError, ValueError):
+        return None
+    if not isinstance(verdict, dict) or "normalized_action" not in verdict:
+        return None
+    return verdict
+
+
+async def cached_verdict_callback(
+    callback_context: CallbackContext,
+    llm_request: LlmRequest,
+) -> Optional[LlmResponse]:
+    """before_model_callback: serve a cached or coalesced verdict, or lead the call."""
+    if not decision_cache.enabled and not single_flight.enabled:
+        return None
+    key = request_key(latest_user_text(llm_request))
+    if decision_cache.enabled:
+        verdict = decision_cache.get(key)
+        if verdict is not None:
+            return verdict_response(verdict)
+    if single_flight.enabled:
+        leader, verdict = await single_flight.wait_or_lead(key)
+        if verdict is not None:
+            return verdict_response(verdict)
+        callback_context.state[LEADER_STATE] = leader
+    callback_context.state[PENDING_KEY_STATE] = key
+    return None
+
+
+def _finish(callback_context: CallbackContext, key: str, verdict: Optional[Dict[str, Any]]) -> None:
+    if callback_context.state.get(LEADER_STATE):
+        single_flight.resolve(key, verdict)
+        callback_context.state[LEADER_STATE] = False
+    callback_context.state[PENDING_KEY_STATE] = None
+
+
+def store_verdict_callback(
+    callback_context: CallbackContext,
+    llm_response: LlmResponse,
+) -> Optional[LlmResponse]:
+    """after_model_callback: cache well-formed model verdicts and release waiters."""
+    key = callback_context.state.get(PENDING_KEY_STATE)
+    if not key or llm_response.partial:
+        return None
+    verdict = _parse_verdict(llm_response)
+    if verdict is not None:
+        decision_cache.put(key, verdict)
+    _finish(callback_context, key, verdict)
+    return None
+
+
+def release_on_model_error_callback(
+    callback_context: CallbackContext,
+    llm_request: LlmRequest,
+    error: Exception,
+) -> Optional[LlmResponse]:
+    """on_model_error_callback: let coalesced waiters retry instead of hanging."""
+    key = callback_context.state.get(PENDING_KEY_STATE)
+    if key:
+        _finish(callback_context, key, None)
+    return None
@@ -0,0 +1,258 @@
+"""Deterministic fast path for the guardrail agent.
+
+Trivially decidable payloads (exact or unambiguous actions, obvious
+prompt-injection markers, first-person claims of executed containment) are
+answered here from precompiled regexes. Anything else returns None and falls
+through to the LLM.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+if TYPE_CHECKING:
+    # Annotations only: the scanners are used outside the agent (e.g. at alert
+    # load time) and should not pay for importing the ADK/genai stack.
+    from google.adk.agents.callback_context import CallbackContext
+    from google.adk.models.llm_request import LlmRequest
+    from google.adk.models.llm_response import LlmResponse
+
+
+PAYLOAD_FIELDS = ("proposed_action", "evidence_summary", "triage_summary")
+
+INJECTION_PATTERNS = [
+    r"\bignore\s+(?:all\s+)?(?:of\s+)?(?:the\s+|your\s+)?(?:previous|prior|above|earlier|preceding)\s+(?:instructions?|rules|prompts?|directions)",
+    r"\b(?:disregard|forget)\s+(?:all\s+)?(?:the\s+|your\s+)?(?:previous|prior|above|earlier)?\s*(?:instructions?|rules|guidelines|prompts?)",
+    r"\boutput\s+only\s+['\"]",
+    r"\b(?:respond|reply|answer)\s+(?:only\s+)?with\s+(?:only\s+)?['\"]",
+    r"\boverride\s+(?:the\s+|your\s+|all\s+)?(?:guardrails?|rules|policy|polic(?:ies)|safety)",
+    r"\byou\s+are\s+now\s+(?:a|an|in)\b",
+    r"\b(?:reveal|print|show)\s+(?:your\s+|the\s+)?system\s+prompt",
+    r"\bnew\s+instructions\s*:",
+    r"\bdo\s+not\s+(?:follow|apply)\s+(?:the\s+|your\s+|any\s+)?(?:rules|guardrails?|instructions|policy)",
+]
+
+_CONTAINMENT_VERBS = (
+    r"(?:disabled|blocked|reset|isolated|quarantined|deleted|removed|locked|"
+    r"revoked|terminated|killed|shut\s+down|contained|wiped|re-?imaged|"
+    r"suspended|banned|patched|executed|deployed)"
+)
+
+FAKE_EXECUTION_PATTERNS = [
+    rf"\b(?:I|we)\s+(?:have|'ve|had|already|just)\s+(?:already\s+|just\s+|now\s+)?{_CONTAINMENT_VERBS}\b",
+    rf"\b(?:I|we)\s+{_CONTAINMENT_VERBS}\s+(?:the|their|his|her|this|that)\b",
+    rf"\bhas\s+(?:already\s+)?been\s+{_CONTAINMENT_VERBS}\s+by\s+(?:me|us|the\s+(?:triage\s+)?agent)\b",
+]
+
+# Literal anchors for cheap prefiltering: every match of the patterns above
+# contains (case-insensitively) at least one of these words. Keep them in
+# step with the patterns.
+INJECTION_KEYWORDS = (
+    "ignore", "disregard", "forget", "output", "respond", "reply", "answer",
+    "override", "you", "system", "instructions", "follow", "apply",
+)
+FAKE_EXECUTION_KEYWORDS = (
+    "disabled", "blocked", "reset", "isolated", "quarantined", "deleted",
+    "removed", "locked", "revoked", "terminated", "killed", "shut", "contained",
+    "wiped", "imaged", "suspended", "banned", "patched", "executed", "deployed",
+)
+
+ACTION_PATTERNS: Dict[str, list[str]] = {
+    "ESCALATE": [
+        r"\bescalat\w*",
+        r"\btier[\s-]*[23]\b",
+        r"\bincident\s+response\b",
+        r"\bpage\s+(?:the\s+)?on-?call\b",
+    ],
+    "CLOSE": [
+        r"\bclos(?:e|ed|ing)\b",
+        r"\bfalse\s+positive\b",
+        r"\bbenign\b",
+        r"\bno\s+(?:further\s+)?action\b",
+        r"\bdismiss\w*",
+    ],
+    "MONITOR": [
+        r"\bmonitor\w*",
+        r"\bkeep\s+an\s+eye\b",
+        r"\bwatch\s*list\w*",
+        r"\bobserve\b",
+    ],
+    "NEEDS_MORE_INFO": [
+        r"\bneeds?\s+more\s+info\w*",
+        r"\b(?:more|additional)\s+(?:data|information|context|logs)\b",
+        r"\binsufficient\b",
+        r"\bcannot\s+(?:decide|determine)\b",
+        r"\b(?:data|information|logs?)\s+(?:is\s+|are\s+)?missing\b",
+    ],
+}
+
+# Negations flip the meaning of an otherwise clear synonym ("do not close"),
+# so they always defer to the model.
+NEGATION_PATTERN = r"\b(?:not|don't|do\s+not|never|shouldn't|should\s+not|without|avoid)\b"
+
+
+def _compile_any(patterns: list[str]) -> re.Pattern[str]:
+    return re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+
+
+_INJECTION_RE = _compile_any(INJECTION_PATTERNS)
+_FAKE_EXECUTION_RE = _compile_any(FAKE_EXECUTION_PATTERNS)
+_NEGATION_RE = re.compile(NEGATION_PATTERN, re.IGNORECASE)
+_ACTION_RES = {action: _compile_any(p) for action, p in ACTION_PATTERNS.items()}
+_EXACT_ACTION_RE = re.compile(r"[\s\-]+")
+
+
+def _verdict(allow: bool, action: str, rationale: str) -> Dict[str, Any]:
+    return {"allow": allow, "normalized_action": action, "rationale": rationale}
+
+
+def _exact_action(text: str) -> Optional[str]:
+    candidate = _EXACT_ACTION_RE.sub("_", text.strip().strip("'\".").upper())
+    return candidate if candidate in _ACTION_RES else None
+
+
+def match_action(proposed_action: str) -> Optional[str]:
+    """
+    Map a free-text action onto exactly one allowed action, or None when the
+    text is empty, negated, or matches more than one action.
+    """
+    if not proposed_action:
+        return None
+    exact = _exact_action(proposed_action)
+    if exact is not None:
+        return exact
+    if _NEGATION_RE.search(proposed_action):
+        return None
+    hits = [action for action, regex in _ACTION_RES.items() if regex.search(proposed_action)]
+    return hits[0] if len(hits) == 1 else None
+
+
+MARKER_PROMPT_INJECTION = "prompt_injection"
+MARKER_FAKE_EXECUTION = "fake_execution"
+
+
+def _contains_any(text: str, keywords: tuple[str, ...]) -> bool:
+    # A plain loop beats any() over a generator here.
+    for keyword in keywords:
+        if keyword in text:
+            return True
+    return False
+
+
+def find_markers(text: str) -> list[str]:
+    """
+    Marker families found in `text` (prompt_injection, fake_execution).
+    The keyword prefilter skips the regexes for the vast majority of texts,
+    which makes this cheap enough to run over every loaded alert field.
+    """
+    lowered = text.lower()
+    markers = []
+    if _contains_any(lowered, INJECTION_KEYWORDS) and _INJECTION_RE.search(text):
+        markers.append(MARKER_PROMPT_INJECTION)
+    if _contains_any(lowered, FAKE_EXECUTION_KEYWORDS) and _FAKE_EXECUTION_RE.search(text):
+        markers.append(MARKER_FAKE_EXECUTION)
+    return markers
+
+
+def scan_text(text: str) -> Optional[Dict[str, Any]]:
+    """Return a blocking verdict if `text` carries injection or fake-execution markers."""
+    if _INJECTION_RE.search(text):
+        return _verdict(
+            False,
+            "NEEDS_MORE_INFO",
+            "Prompt-injection pattern detected in the request; refusing to act on it.",
+        )
+    if _FAKE_EXECUTION_RE.search(text):
+        return _verdict(
+            False,
+            "NEEDS_MORE_INFO",
+            "The recommendation claims containment was already executed; "
+            "agents may only recommend actions, not perform them.",
+        )
+    return None
+
+
+def evaluate_payload(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Decide a guardrail payload deterministically.
+
+    Returns a verdict dict (allow / normalized_action / rationale) or None if
+    the payload is ambiguous and must be judged by the LLM.
+    """
+    text = "\n".join(str(payload.get(field) or "") for field in PAYLOAD_FIELDS)
+    blocked = scan_text(text)
+    if blocked is not None:
+        return blocked
+
+    action = match_action(str(payload.get("proposed_action") or ""))
+    if action is None:
+        return None
+    return _verdict(
+        True,
+        action,
+        f"Proposed action maps unambiguously to {action}; no unsafe claims "
+        "or injection markers found.",
+    )
+
+
+def parse_payload(text: str) -> Optional[Dict[str, Any]]:
+    """Extract the JSON guardrail payload from a request message, if any."""
+    candidates = [text]
+    start, end = text.find("{"), text.rfind("}")
+    if 0 <= start < end:
+        candidates.append(text[start : end + 1])
+    for candidate in candidates:
+        try:
+            payload = json.loads(candidate)
+        except (json.JSONDecodeError, ValueError):
+            continue
+        if isinstance(payload, dict) and "proposed_action" in payload:
+            return payload
+    return None
+
+
+def evaluate_text(text: str) -> Optional[Dict[str, Any]]:
+    """Evaluate a raw request message (JSON payload or free text)."""
+    payload = parse_payload(text)
+    if payload is not None:
+        return evaluate_payload(payload)
+    # Unstructured requests are never auto-approved, but obvious attacks
+    # are still blocked without a model call.
+    return scan_text(text)
+
+
+def latest_user_text(llm_request: LlmRequest) -> str:
+    """Concatenate the text parts of the most recent user turn."""
+    for content in reversed(llm_request.contents or []):
+        if content.role != "user":
+            continue
+        texts = [part.text for part in content.parts or [] if part.text]
+        if texts:
+            return "\n".join(texts)
+    return ""
+
+
+def verdict_response(verdict: Dict[str, Any]) -> LlmResponse:
+    """Wrap a verdict as the strict-JSON model response the caller expects."""
+    from google.adk.models.llm_response import LlmResponse
+    from google.genai import types
+
+    return LlmResponse(
+        content=types.Content(
+            role="model",
+            parts=[types.Part(text=json.dumps(verdict))],
+        )
+    )
+
+
+def rule_based_guardrail_callback(
+    callback_context: CallbackContext,
+    llm_request: LlmRequest,
+) -> Optional[LlmResponse]:
+    """before_model_callback: answer decidable payloads without calling Gemini."""
+    verdict = evaluate_text(latest_user_text(llm_request))
+    if verdict is None:
+        return None
+    return verdict_response(verdict)
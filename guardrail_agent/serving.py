@@ -0,0 +1,198 @@
+"""Production serving for the guardrail A2A service.
+
+  - ConcurrencyLimiter / ConcurrencyLimitMiddleware: at most N guardrail
+    requests run at once, up to M more wait in a FIFO queue, and everything
+    beyond that (or anything that waited longer than the queue timeout) is
+    rejected immediately with HTTP 429 and a Retry-After header, so callers
+    back off instead of piling onto a saturated model.
+  - main(): runs the app under uvicorn with configurable worker processes.
+    Each worker has its own limiter, verdict cache and single-flight table,
+    so limits are per worker.
+
+    python -m guardrail_agent.serving --workers 4 --max-concurrency 16 --max-queue 64
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+GUARDRAIL_HOST = os.getenv("GUARDRAIL_HOST", "127.0.0.1")
+GUARDRAIL_PORT = int(os.getenv("GUARDRAIL_PORT", "8001"))
+GUARDRAIL_WORKERS = int(os.getenv("GUARDRAIL_WORKERS", "1"))
+# 0 disables the limit.
+GUARDRAIL_MAX_CONCURRENCY = int(os.getenv("GUARDRAIL_MAX_CONCURRENCY", "16"))
+GUARDRAIL_MAX_QUEUE = int(os.getenv("GUARDRAIL_MAX_QUEUE", "64"))
+GUARDRAIL_QUEUE_TIMEOUT_SECONDS = float(os.getenv("GUARDRAIL_QUEUE_TIMEOUT_SECONDS", "10"))
+GUARDRAIL_RETRY_AFTER_SECONDS = float(os.getenv("GUARDRAIL_RETRY_AFTER_SECONDS", "1"))
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+
+class ConcurrencyLimiter:
+    """Admission control shared by the middleware and the /serving/stats route."""
+
+    def __init__(
+        self,
+        max_concurrency: int = GUARDRAIL_MAX_CONCURRENCY,
+        max_queue: int = GUARDRAIL_MAX_QUEUE,
+        queue_timeout_seconds: float = GUARDRAIL_QUEUE_TIMEOUT_SECONDS,
+        retry_after_seconds: float = GUARDRAIL_RETRY_AFTER_SECONDS,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self._semaphores: Dict[int, asyncio.Semaphore] = {}
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrency > 0
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # One per event loop (tests and in-process benchmarks use several).
+        loop_id = id(asyncio.get_running_loop())
+        semaphore = self._semaphores.get(loop_id)
+        if semaphore is None:
+            semaphore = self._semaphores[loop_id] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def acquire(self) -> bool:
+        """Take a slot, queueing if allowed; False means reject with 429."""
+        semaphore = self._semaphore()
+        if not semaphore.locked():
+            await semaphore.acquire()
+        else:
+            if self.waiting >= self.max_queue:
+                self.rejected_full += 1
+                return False
+            self.waiting += 1
+            self.queued += 1
+            try:
+                await asyncio.wait_for(semaphore.acquire(), self.queue_timeout_seconds)
+            except asyncio.TimeoutError:
+                self.rejected_timeout += 1
+                return False
+            finally:
+                self.waiting -= 1
+        self.active += 1
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+        self._semaphore().release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_full": self.rejected_full,
+            "rejected_timeout": self.rejected_timeout,
+        }
+
+
+class ConcurrencyLimitMiddleware:
+    """ASGI middleware applying a ConcurrencyLimiter to non-exempt requests."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiter: ConcurrencyLimiter,
+        exempt_methods: Iterable[str] = ("GET", "HEAD", "OPTIONS"),
+    ) -> None:
+        self.app = app
+        self.limiter = limiter
+        # Agent-card and stats reads stay cheap and are never queued.
+        self.exempt_methods = {m.upper() for m in exempt_methods}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not self.limiter.enabled
+            or scope.get("method", "").upper() in self.exempt_methods
+        ):
+            await self.app(scope, receive, send)
+            return
+        if not await self.limiter.acquire():
+            await self._reject(send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release()
+
+    async def _reject(self, send: Send) -> None:
+        retry_after = self.limiter.retry_after_seconds
+        body = json.dumps(
+            {"error": "guardrail saturated, retry later", "retry_after_seconds": retry_after}
+        ).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("ascii")),
+                    (b"retry-after", str(max(1, math.ceil(retry_after))).encode("ascii")),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+# --- Entry point ---------------------------------------------------------------
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the guardrail A2A app.")
+    parser.add_argument("--host", default=GUARDRAIL_HOST)
+    parser.add_argument("--port", type=int, default=GUARDRAIL_PORT)
+    parser.add_argument("--workers", type=int, default=GUARDRAIL_WORKERS)
+    parser.add_argument("--max-concurrency", type=int, default=GUARDRAIL_MAX_CONCURRENCY)
+    parser.add_argument("--max-queue", type=int, default=GUARDRAIL_MAX_QUEUE)
+    parser.add_argument("--queue-timeout", type=float, default=GUARDRAIL_QUEUE_TIMEOUT_SECONDS)
+    parser.add_argument("--retry-after", type=float, default=GUARDRAIL_RETRY_AFTER_SECONDS)
+    args = parser.parse_args(argv)
+
+    # Worker processes import the app fresh and read their limits from here.
+    os.environ.update(
+        {
+            "GUARDRAIL_MAX_CONCURRENCY": str(args.max_concurrency),
+            "GUARDRAIL_MAX_QUEUE": str(args.max_queue),
+            "GUARDRAIL_QUEUE_TIMEOUT_SECONDS": str(args.queue_timeout),
+            "GUARDRAIL_RETRY_AFTER_SECONDS": str(args.retry_after),
+        }
+    )
+
+    import uvicorn
+
+    uvicorn.run(
+        "guardrail_agent.app:app",
+        host=args.host,
+        port=args.port,
+        workers=max(1, args.workers),
+        reload=False,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from aegis_soc_sessions.agent import load_synthetic_alerts
+from aegis_soc_sessions.alert_columns import AlertColumns, get_alert_columns, use_alert_feed
+from aegis_soc_sessions.alert_store import AlertStore
+from aegis_soc_sessions.alert_stream import DEFAULT_ALERTS_PATH, iter_alerts
+
+
+@pytest.fixture
+def columns(tmp_path) -> AlertColumns:
+    return AlertColumns(DEFAULT_ALERTS_PATH, cache_dir=tmp_path / "cache")
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {},
+        {"sources": "EDR"},
+        {"sources": ["siem", "o365"], "since": "2025-01-01T12:00:00Z"},
+        {"until": "2025-01-01T10:00:00Z"},
+        {"sources": "firewall", "since": "2025-01-01T00:00:00Z", "until": "2025-01-02T00:00:00Z"},
+    ],
+)
+def test_queries_match_the_streaming_reader(columns, filters) -> None:
+    assert list(columns.query(**filters)) == list(iter_alerts(DEFAULT_ALERTS_PATH, **filters))
+    assert columns.count(**filters) == len(list(iter_alerts(DEFAULT_ALERTS_PATH, **filters)))
+    assert list(columns.query(limit=2, **filters)) == list(
+        iter_alerts(DEFAULT_ALERTS_PATH, limit=2, **filters)
+    )
+
+
+def test_categorical_filters_and_lookup_match_the_alert_store(columns) -> None:
+    store = AlertStore(DEFAULT_ALERTS_PATH)
+    expected = [
+        a["id"] for a in store.by_source("edr") if a in store.by_severity("high")
+    ]
+    assert columns.ids(sources="edr", severity="high") == expected
+    assert columns.ids(category="credential_dumping") == [
+        a["id"] for a in store.by_category("credential_dumping")
+    ]
+    assert columns.get("ALERT-021") == store.get("ALERT-021")
+    assert columns.get("ALERT-404") is None
+    with pytest.raises(ValueError):
+        columns.count(since="not-a-time")
+
+
+def test_cache_is_reused_and_rebuilt_when_the_feed_changes(tmp_path) -> None:
+    feed = tmp_path / "alerts.ndjson"
+    feed.write_text(json.dumps({"id": "A", "source": "edr", "timestamp": "2025-01-01T00:00:00Z"}) + "\n")
+    cache_dir = tmp_path / "cache"
+
+    first = AlertColumns(feed, cache_dir=cache_dir)
+    assert first.ids() == ["A"] and first.builds == 1
+    # A second process (fresh handle) maps the existing file instead of rebuilding.
+    second = AlertColumns(feed, cache_dir=cache_dir)
+    assert len(second) == 1 and second.builds == 0
+
+    with feed.open("a") as f:
+        f.write(json.dumps({"id": "B", "source": "siem"}) + "\n")
+    stat = feed.stat()
+    os.utime(feed, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert second.ids() == ["A", "B"] and second.builds == 1
+    assert second.count(since="2024-01-01T00:00:00Z") == 1
+    assert len(list(cache_dir.glob("*.cols"))) == 1
+
+
+@pytest.mark.asyncio
+async def test_use_alert_feed_points_the_tools_at_another_feed(tmp_path) -> None:
+    feed = tmp_path / "alerts.ndjson"
+    feed.write_text(json.dumps({"id": "ONLY-HERE", "source": "edr"}) + "\n")
+
+    with use_alert_feed(feed):
+        # Tasks started inside the block (e.g. one per batch session) inherit it.
+        ids = await asyncio.create_task(asyncio.to_thread(lambda: get_alert_columns().ids()))
+        assert ids == ["ONLY-HERE"]
+        assert load_synthetic_alerts(alert_id="ONLY-HERE")[0]["id"] == "ONLY-HERE"
+    assert get_alert_columns().path == DEFAULT_ALERTS_PATH
+    assert load_synthetic_alerts(alert_id="ONLY-HERE") == []
+
+
+def test_replaced_caches_are_closed_once_their_readers_finish(tmp_path) -> None:
+    feed = tmp_path / "alerts.ndjson"
+    feed.write_text("".join(json.dumps({"id": f"A{i}", "source": "edr"}) + "\n" for i in range(3)))
+    columns = AlertColumns(feed, cache_dir=tmp_path / "cache")
+
+    def touch(extra_id: str) -> None:
+        with feed.open("a") as f:
+            f.write(json.dumps({"id": extra_id, "source": "siem"}) + "\n")
+        stat = feed.stat()
+        os.utime(feed, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    first = columns.cache()
+    reader = columns.query()
+    assert next(reader)["id"] == "A0"  # holds `first` open
+    touch("B")
+    second = columns.cache()
+    assert second is not first and not first.closed
+    assert [a["id"] for a in reader] == ["A1", "A2"]  # finishes on the old snapshot
+    assert first.closed
+
+    # Nobody is reading `second`, so the next change closes it right away.
+    touch("C")
+    assert columns.ids() == ["A0", "A1", "A2", "B", "C"]
+    assert second.closed
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX ownership checks")
+def test_cache_dir_must_be_private(tmp_path) -> None:
+    feed = tmp_path / "alerts.ndjson"
+    feed.write_text(json.dumps({"id": "A", "source": "edr"}) + "\n")
+    cache_dir = tmp_path / "cache"
+
+    columns = AlertColumns(feed, cache_dir=cache_dir)
+    assert columns.ids() == ["A"]
+    assert cache_dir.stat().st_mode & 0o777 == 0o700
+
+    # A cache file others could have written is rebuilt, not mapped.
+    (planted,) = cache_dir.glob("*.cols")
+    planted.chmod(0o666)
+    fresh = AlertColumns(feed, cache_dir=cache_dir)
+    assert fresh.ids() == ["A"] and fresh.builds == 1
+    assert planted.stat().st_mode & 0o022 == 0
+
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+    with pytest.raises(PermissionError):
+        AlertColumns(feed, cache_dir=shared).ids()
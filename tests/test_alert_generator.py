@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from aegis_soc_sessions.alert_generator import (
+    CAMPAIGN_STAGES,
+    GeneratorConfig,
+    GroundTruth,
+    generate_alerts,
+    main,
+    write_alerts,
+)
+from aegis_soc_sessions.alert_stream import iter_alerts
+from aegis_soc_sessions.correlation import build_correlation
+from guardrail_agent.rules import scan_text
+
+
+CONFIG = GeneratorConfig(count=3000, campaigns=4, injection_rate=0.01, fake_execution_rate=0.01)
+
+
+def test_generation_is_deterministic_and_time_ordered() -> None:
+    first = list(generate_alerts(CONFIG))
+    assert first == list(generate_alerts(CONFIG))
+    assert len(first) == 3000
+    assert len({a["id"] for a in first}) == 3000
+    timestamps = [a["timestamp"] for a in first]
+    assert timestamps == sorted(timestamps)
+
+    by_source = {a["source"]: a for a in first}
+    assert {"username", "ip", "location"} <= set(by_source["o365"])
+    assert {"src_ip", "dst_ip"} <= set(by_source["firewall"])
+    assert {"hostname", "process", "command_line"} <= set(by_source["edr"])
+    assert set(by_source["siem"]["entities"]) == {"username", "src_ip", "dst_ip", "hostname"}
+
+
+def test_planted_campaigns_are_recovered_by_correlation() -> None:
+    truth = GroundTruth()
+    alerts = list(generate_alerts(CONFIG, truth))
+    graph = build_correlation(alerts)
+
+    assert truth.count == 3000
+    assert len(truth.campaigns) == 4
+    clusters = [set(c["alert_ids"]) for c in graph["clusters"]]
+    for campaign in truth.campaigns.values():
+        assert campaign["stages"] == [category for _, category, _ in CAMPAIGN_STAGES]
+        assert set(campaign["alert_ids"]) in clusters
+
+
+def test_tainted_alerts_trip_the_guardrail_rules() -> None:
+    truth = GroundTruth()
+    alerts = {a["id"]: a for a in generate_alerts(CONFIG, truth)}
+
+    assert truth.injection_ids and truth.fake_execution_ids
+    for alert_id in truth.injection_ids + truth.fake_execution_ids:
+        assert scan_text(alerts[alert_id]["description"]) is not None
+    clean = set(alerts) - set(truth.injection_ids) - set(truth.fake_execution_ids)
+    assert all(scan_text(alerts[i]["description"]) is None for i in list(clean)[:500])
+
+
+@pytest.mark.parametrize("suffix", [".json", ".ndjson"])
+def test_written_corpus_streams_back_through_iter_alerts(tmp_path, suffix) -> None:
+    path = tmp_path / f"alerts{suffix}"
+    config = GeneratorConfig(count=250, campaigns=1)
+    assert write_alerts(path, generate_alerts(config)) == 250
+    assert list(iter_alerts(path)) == list(generate_alerts(config))
+    assert len(list(iter_alerts(path, sources="edr"))) > 0
+
+
+def test_cli_writes_ground_truth(tmp_path) -> None:
+    out, truth = tmp_path / "alerts.ndjson", tmp_path / "truth.json"
+    assert main([
+        "--count", "100", "--campaigns", "2", "--output", str(out), "--ground-truth", str(truth),
+    ]) == 0
+    manifest = json.loads(truth.read_text())
+    assert manifest["count"] == 100
+    assert sorted(manifest["campaigns"]) == ["CAMPAIGN-0001", "CAMPAIGN-0002"]
+    assert sum(1 for _ in out.open()) == 100
@@ -0,0 +1,70 @@
+import json
+import os
+
+import pytest
+
+from aegis_soc_sessions.alert_store import AlertStore, get_alert_store
+
+
+def _write_alerts(path, alerts) -> None:
+    path.write_text(json.dumps(alerts), encoding="utf-8")
+
+
+def test_indexes_cover_id_source_severity_category(tmp_path) -> None:
+    alerts_path = tmp_path / "alerts.json"
+    _write_alerts(
+        alerts_path,
+        [
+            {"id": "A-1", "source": "o365", "severity": "high", "category": "login"},
+            {"id": "A-2", "source": "edr", "severity": "high", "category": "malware"},
+            {"id": "A-3", "source": "o365", "severity": "low", "category": "login"},
+        ],
+    )
+    store = AlertStore(alerts_path)
+
+    assert len(store) == 3
+    assert store.get("A-2")["source"] == "edr"
+    assert store.get("missing") is None
+    assert [a["id"] for a in store.by_source("o365")] == ["A-1", "A-3"]
+    assert [a["id"] for a in store.by_severity("high")] == ["A-1", "A-2"]
+    assert [a["id"] for a in store.by_category("login")] == ["A-1", "A-3"]
+
+
+def test_store_reloads_when_file_changes(tmp_path) -> None:
+    alerts_path = tmp_path / "alerts.json"
+    _write_alerts(alerts_path, [{"id": "A-1"}])
+    store = AlertStore(alerts_path)
+    assert [a["id"] for a in store.all()] == ["A-1"]
+
+    _write_alerts(alerts_path, [{"id": "A-1"}, {"id": "A-2"}])
+    # Bump mtime explicitly so the test does not depend on clock resolution.
+    stat = alerts_path.stat()
+    os.utime(alerts_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert store.get("A-2") is not None
+    assert len(store) == 2
+
+
+def test_store_rejects_missing_or_malformed_files(tmp_path) -> None:
+    with pytest.raises(FileNotFoundError):
+        AlertStore(tmp_path / "nope.json").all()
+
+    bad_path = tmp_path / "bad.json"
+    bad_path.write_text(json.dumps({"id": "A-1"}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        AlertStore(bad_path).all()
+
+
+def test_default_store_is_shared_and_serves_synthetic_feed() -> None:
+    store = get_alert_store()
+    assert store is get_alert_store()
+    assert store.get("ALERT-001")["source"] == "o365"
+
+
+def test_aegis_soc_app_loader_reuses_the_parsed_feed() -> None:
+    from aegis_soc_app.agent import load_synthetic_alerts
+
+    first = load_synthetic_alerts()
+    assert len(first) == len(get_alert_store())
+    # Served from the store's parsed list, not decoded again per call.
+    assert load_synthetic_alerts()[0] is first[0] is get_alert_store().all()[0]
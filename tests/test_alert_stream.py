@@ -0,0 +1,77 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from aegis_soc_sessions.agent import load_synthetic_alerts
+from aegis_soc_sessions.alert_stream import iter_alerts
+
+
+ALERTS = [
+    {"id": "A-1", "source": "o365", "timestamp": "2025-01-01T12:00:00Z"},
+    {"id": "A-2", "source": "firewall", "timestamp": "2025-01-01T13:00:00Z"},
+    {"id": "A-3", "source": "O365", "timestamp": "2025-01-02T09:00:00Z"},
+    {"id": "A-4", "source": "edr"},
+]
+
+
+def test_json_array_streams_across_small_chunks(tmp_path) -> None:
+    path = tmp_path / "alerts.json"
+    path.write_text(json.dumps(ALERTS, indent=2), encoding="utf-8")
+
+    streamed = list(iter_alerts(path, chunk_size=7))
+    assert streamed == ALERTS
+
+
+def test_ndjson_is_read_line_by_line(tmp_path) -> None:
+    path = tmp_path / "alerts.ndjson"
+    path.write_text(
+        "\n".join(json.dumps(a) for a in ALERTS) + "\n\n", encoding="utf-8"
+    )
+
+    assert [a["id"] for a in iter_alerts(path)] == ["A-1", "A-2", "A-3", "A-4"]
+
+
+def test_source_time_window_and_limit_filters(tmp_path) -> None:
+    path = tmp_path / "alerts.json"
+    path.write_text(json.dumps(ALERTS), encoding="utf-8")
+
+    assert [a["id"] for a in iter_alerts(path, sources="o365")] == ["A-1", "A-3"]
+    assert [
+        a["id"]
+        for a in iter_alerts(
+            path, since="2025-01-01T12:30:00Z", until="2025-01-02T00:00:00+00:00"
+        )
+    ] == ["A-2"]
+    assert [a["id"] for a in iter_alerts(path, limit=2)] == ["A-1", "A-2"]
+
+
+def test_malformed_inputs_raise_value_error(tmp_path) -> None:
+    not_a_list = tmp_path / "object.json"
+    not_a_list.write_text(json.dumps({"id": "A-1"}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_alerts(not_a_list))
+
+    truncated = tmp_path / "truncated.json"
+    truncated.write_text('[{"id": "A-1"}, {"id": ', encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_alerts(truncated))
+
+
+def test_tool_returns_only_requested_slice() -> None:
+    firewall = load_synthetic_alerts(source="firewall", limit=2)
+    assert len(firewall) == 2
+    assert all(a["source"] == "firewall" for a in firewall)
+
+    single = load_synthetic_alerts(alert_id="ALERT-021")
+    assert [a["id"] for a in single] == ["ALERT-021"]
+
+
+def test_tool_reports_malformed_time_bounds_as_an_error() -> None:
+    context = SimpleNamespace(state={"raw_alerts": ["kept"]})
+
+    result = load_synthetic_alerts(since="yesterday-ish", tool_context=context)
+
+    assert "Invalid 'since' timestamp" in result["error"]
+    assert "Invalid 'until'" in load_synthetic_alerts(until="2025-13-45")["error"]
+    assert context.state == {"raw_alerts": ["kept"]}
@@ -0,0 +1,184 @@
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.apps.app import App
+from google.adk.models.google_llm import Gemini
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import errors as genai_errors
+
+from aegis_soc_sessions.agent import load_synthetic_alerts
+from aegis_soc_sessions.batch import (
+    ProviderRateLimiter,
+    extract_normalized_action,
+    is_rate_limited,
+    select_alert_ids,
+    triage_batch,
+)
+from aegis_soc_sessions.model_scheduler import ScheduledGemini
+from tests.helpers import StubModel
+
+
+def _runner(model: StubModel) -> Runner:
+    agent = LlmAgent(
+        name="root_triage_agent",
+        model=model,
+        tools=[load_synthetic_alerts],
+        output_key="triage_summary",
+    )
+    return Runner(
+        app=App(name="batch_test_app", root_agent=agent),
+        session_service=InMemorySessionService(),
+    )
+
+
+def test_select_alert_ids_intersects_filters() -> None:
+    ids = select_alert_ids(source="edr", severity="high")
+    assert ids and "ALERT-021" in ids
+    assert select_alert_ids(["ALERT-001", "ALERT-002"], limit=1) == ["ALERT-001"]
+
+
+@pytest.mark.asyncio
+async def test_batch_streams_results_with_bounded_concurrency() -> None:
+    model = StubModel(steps=["load_synthetic_alerts"], delay=0.01)
+    runner = _runner(model)
+    ids = ["ALERT-001", "ALERT-002", "ALERT-003", "ALERT-021", "ALERT-031"]
+
+    results = [
+        r
+        async for r in triage_batch(
+            ids,
+            runner=runner,
+            session_service=runner.session_service,
+            concurrency=2,
+            limiter=ProviderRateLimiter(rate_per_second=0),
+        )
+    ]
+
+    assert sorted(r.alert_id for r in results) == sorted(ids)
+    assert len({r.session_id for r in results}) == len(ids)
+    assert 1 < model.max_in_flight <= 2
+    by_id = {r.alert_id: r for r in results}
+    assert by_id["ALERT-021"].normalized_action == "ESCALATE"
+    assert by_id["ALERT-031"].normalized_action == "CLOSE"
+    assert all(r.error is None and r.latency_seconds > 0 for r in results)
+
+
+@pytest.mark.asyncio
+async def test_429s_are_retried_per_model_call_not_per_conversation(monkeypatch) -> None:
+    stub = StubModel(steps=["load_synthetic_alerts"])
+    failures = [1]
+
+    async def flaky_generate(self, llm_request, stream=False):
+        if failures[0]:
+            failures[0] -= 1
+            raise genai_errors.ClientError(429, {"error": {"message": "quota"}})
+        async for response in stub.generate_content_async(llm_request, stream):
+            yield response
+
+    monkeypatch.setattr(Gemini, "generate_content_async", flaky_generate)
+    model = ScheduledGemini(model="gemini-2.5-flash-lite")
+    agent = LlmAgent(
+        name="root_triage_agent",
+        model=model,
+        tools=[load_synthetic_alerts],
+        output_key="triage_summary",
+    )
+    runner = Runner(
+        app=App(name="batch_retry_test_app", root_agent=agent),
+        session_service=InMemorySessionService(),
+    )
+    limiter = ProviderRateLimiter(rate_per_second=0)
+
+    results = [
+        r
+        async for r in triage_batch(
+            ["ALERT-001"], runner=runner, session_service=runner.session_service, limiter=limiter
+        )
+    ]
+
+    assert results[0].error is None
+    assert results[0].attempts == 1
+    assert results[0].normalized_action == "ESCALATE"
+    # The batch's own limiter saw the 429; the conversation was not replayed.
+    assert limiter.rate_limited == 1 and stub.calls == 2
+
+    # Without a scheduled model nothing retries the 429 at the batch level.
+    class RateLimitedModel(StubModel):
+        async def generate_content_async(self, llm_request, stream: bool = False):
+            raise genai_errors.ClientError(429, {"error": {"message": "quota"}})
+            yield  # pragma: no cover
+
+    runner = _runner(RateLimitedModel(steps=["load_synthetic_alerts"]))
+    (result,) = [
+        r
+        async for r in triage_batch(
+            ["ALERT-001"], runner=runner, session_service=runner.session_service, limiter=limiter
+        )
+    ]
+    assert result.attempts == 1 and "429" in (result.error or "")
+
+
+def test_is_rate_limited_unwraps_causes() -> None:
+    try:
+        try:
+            raise genai_errors.ClientError(429, {"error": {"message": "quota"}})
+        except genai_errors.ClientError as inner:
+            raise RuntimeError("node failed") from inner
+    except RuntimeError as outer:
+        assert is_rate_limited(outer)
+    assert not is_rate_limited(ValueError("nope"))
+
+
+def test_summary_fallback_needs_exactly_one_named_action() -> None:
+    def action(summary: str):
+        return extract_normalized_action({"triage_summary": summary})
+
+    assert action("No need to escalate; recommended action: CLOSE.") == "CLOSE"
+    assert action("Recommended action: CLOSE (no further monitoring required)") == "CLOSE"
+    assert action("**Recommended action:** needs more info") == "NEEDS_MORE_INFO"
+    assert action("Verdict: ESCALATE to tier 2.") == "ESCALATE"
+    assert action("Either MONITOR or CLOSE, depending on the owner.") is None
+    assert action("We should probably close this.") is None
+
+
+@pytest.mark.asyncio
+async def test_limiter_is_taken_once_per_model_call(monkeypatch) -> None:
+    stub = StubModel(steps=["load_synthetic_alerts"])
+
+    async def fake_generate(self, llm_request, stream=False):
+        async for response in stub.generate_content_async(llm_request, stream):
+            yield response
+
+    monkeypatch.setattr(Gemini, "generate_content_async", fake_generate)
+
+    class CountingLimiter(ProviderRateLimiter):
+        acquired = 0
+
+        async def acquire(self, priority=None) -> float:
+            self.acquired += 1
+            return await super().acquire(priority)
+
+    # No scheduler of its own: the batch's limiter replaces the process-wide one.
+    model = ScheduledGemini(model="gemini-2.5-flash-lite")
+    agent = LlmAgent(name="root_triage_agent", model=model, tools=[load_synthetic_alerts])
+    runner = Runner(
+        app=App(name="batch_limiter_test_app", root_agent=agent),
+        session_service=InMemorySessionService(),
+    )
+    limiter = CountingLimiter(rate_per_second=0)
+
+    results = [
+        r
+        async for r in triage_batch(
+            ["ALERT-001", "ALERT-021"],
+            runner=runner,
+            session_service=runner.session_service,
+            limiter=limiter,
+            collapse_duplicates=False,
+        )
+    ]
+
+    assert all(r.error is None for r in results)
+    # Tool call + final answer per alert.
+    assert stub.calls == 4 and limiter.acquired == 4
+    assert limiter.successes == 4
@@ -0,0 +1,37 @@
+import json
+
+from benchmarks.triage_benchmark import main, run_config, scale_alerts, write_scaled_feed
+
+
+def test_scale_alerts_keeps_ids_unique() -> None:
+    base = [{"id": "A", "timestamp": "2025-01-01T12:00:00Z"}, {"id": "B", "timestamp": None}]
+    scaled = scale_alerts(base, 3)
+    assert [a["id"] for a in scaled] == ["A", "B", "A-x1", "B-x1", "A-x2", "B-x2"]
+    assert scaled[4]["timestamp"] == "2025-01-01T14:00:00Z"
+
+
+def test_benchmark_run_reports_throughput_latency_and_hops(tmp_path) -> None:
+    feed = write_scaled_feed(2, tmp_path)
+    result = run_config(str(feed), concurrency=3, sessions=6)
+
+    assert result["alerts_in_file"] == 86
+    assert result["errors"] == 0
+    assert result["alerts_per_second"] > 0
+    assert result["latency_seconds"]["count"] == 6
+    assert result["latency_seconds"]["p50"] <= result["latency_seconds"]["p99"]
+    assert "tool:guardrail_agent" in result["hops_seconds"]
+    assert "model:root_triage_agent" in result["hops_seconds"]
+    assert result["guardrail_http"]["POST /"]["count"] == 6
+    assert result["peak_rss_mb"] > 0
+
+
+def test_cli_writes_json_report(tmp_path) -> None:
+    out = tmp_path / "bench.json"
+    assert main([
+        "--scales", "1,2", "--concurrency", "2", "--sessions", "2",
+        "--no-isolate", "--output", str(out),
+    ]) == 0
+    report = json.loads(out.read_text())
+    assert report["meta"]["isolated"] is False
+    # Without isolation every scale still reads its own feed.
+    assert [(r["scale"], r["alerts_in_file"]) for r in report["runs"]] == [(1, 43), (2, 86)]
@@ -0,0 +1,98 @@
+import json
+
+from aegis_soc_sessions.alert_store import get_alert_store
+from aegis_soc_sessions.compaction import (
+    EXTRA_FIELD,
+    compact_alerts,
+    dedupe_alerts,
+    estimate_tokens,
+    project_alert,
+)
+
+
+def test_projection_is_per_source_and_flattens_siem_entities() -> None:
+    store = get_alert_store()
+    firewall = project_alert(store.get("ALERT-002"))
+    assert set(firewall) == {
+        "id", "severity", "category", "timestamp", "src_ip", "dst_ip", "ip",
+        "failed_attempts", "description", "extra",
+    }
+
+    siem = project_alert(store.get("ALERT-SIEM-001"))
+    assert siem["entities.username"] == "maria.finance@example.com"
+    assert "entities" not in siem
+
+
+def test_duplicates_collapse_with_count_and_time_range() -> None:
+    base = {"source": "firewall", "severity": "medium", "category": "port_scan",
+            "src_ip": "198.51.100.23", "dst_ip": "10.0.10.15", "description": "scan"}
+    alerts = [
+        {**base, "id": "A1", "timestamp": "2025-01-01T12:05:00Z"},
+        {**base, "id": "A2", "timestamp": "2025-01-01T12:00:00Z"},
+        {**base, "id": "A3", "timestamp": "2025-01-01T12:09:00Z", "dst_ip": "10.0.10.16"},
+    ]
+    rows = dedupe_alerts(alerts)
+    assert [row["_count"] for row in rows] == [2, 1]
+    assert rows[0]["_ids"] == ["A1", "A2"]
+
+    text = compact_alerts(alerts)["text"]
+    assert "2025-01-01T12:00:00Z..2025-01-01T12:05:00Z" in text
+    assert text.count("# source=firewall") == 1
+
+
+def test_compact_table_is_smaller_and_respects_budget() -> None:
+    alerts = get_alert_store().all()
+    full = compact_alerts(alerts, token_budget=0)
+    assert full["row_count"] == len(alerts)
+    assert full["estimated_tokens"] < estimate_tokens(json.dumps(alerts)) * 2 // 3
+
+    tight = compact_alerts(alerts, token_budget=400)
+    assert tight["estimated_tokens"] <= 400
+    assert tight["omitted_alerts"] > 0
+    assert tight["text"].endswith("lower-severity alerts (token budget)")
+    kept = [line for line in tight["text"].splitlines() if line.startswith("ALERT")]
+    assert all("|high|" in line for line in kept)
+
+
+def test_strings_are_capped_and_pipes_escaped() -> None:
+    alert = {"id": "X", "source": "edr", "severity": "low", "category": "c",
+             "command_line": "a|b " + "x" * 500, "description": "d"}
+    row = compact_alerts([alert], token_budget=0)["text"].splitlines()[-1]
+    assert "a/b" in row and "…" in row
+    assert len(row) < 250
+
+
+def _leaf_values(value):
+    if isinstance(value, dict):
+        for nested in value.values():
+            yield from _leaf_values(nested)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _leaf_values(item)
+    elif value is not None and value != "":
+        yield " ".join(str(value).split())
+
+
+def test_no_field_value_is_lost_from_the_bundled_feed() -> None:
+    alerts = get_alert_store().all()
+    text = compact_alerts(alerts, token_budget=0)["text"]
+    rows = {line.split("|", 1)[0]: line for line in text.splitlines() if "|" in line}
+
+    for alert in alerts:
+        row = rows[alert["id"]]
+        missing = [v for v in _leaf_values(alert) if v not in row and v != alert["source"]]
+        assert not missing, (alert["id"], missing)
+
+    assert "|quarantined|" in rows["ALERT-021"]
+    assert "|incomplete|" in rows["ALERT-031"]
+
+
+def test_unnamed_fields_go_to_extra_and_split_duplicates() -> None:
+    base = {"id": "A1", "source": "firewall", "severity": "low", "category": "port_scan",
+            "src_ip": "198.51.100.23", "description": "scan"}
+    row = project_alert({**base, "rule": "r-7", "tags": ["a", "b"], "note": ""})
+    assert row[EXTRA_FIELD] == "rule=r-7; tags=a,b"
+    assert project_alert(base)[EXTRA_FIELD] is None
+
+    rows = dedupe_alerts([{**base, "verdict": "allowed"}, {**base, "id": "A2", "verdict": "blocked"}])
+    assert len(rows) == 2
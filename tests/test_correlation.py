@@ -0,0 +1,77 @@
+import pytest
+
+from aegis_soc_sessions.agent import correlate_alerts
+from aegis_soc_sessions.correlation import build_correlation, extract_entities
+
+
+ALERTS = [
+    {"id": "A-1", "source": "o365", "timestamp": "2025-01-01T12:00:00Z",
+     "username": "Alice@Example.com", "ip": "203.0.113.10"},
+    {"id": "A-2", "source": "firewall", "timestamp": "2025-01-01T12:20:00Z",
+     "src_ip": "203.0.113.10", "dst_ip": "10.0.0.5"},
+    {"id": "A-3", "source": "siem", "timestamp": "2025-01-01T12:40:00Z",
+     "entities": {"username": "alice@example.com", "hostname": "WS-1"}},
+    {"id": "A-4", "source": "edr", "timestamp": "2025-01-03T08:00:00Z",
+     "hostname": "ws-1"},
+    {"id": "A-5", "source": "edr", "timestamp": "2025-01-01T12:10:00Z",
+     "hostname": "WS-9"},
+]
+
+
+def test_extract_entities_handles_flat_and_nested_schemas() -> None:
+    assert extract_entities(ALERTS[0]) == {"user:alice@example.com", "ip:203.0.113.10"}
+    assert extract_entities(ALERTS[2]) == {"user:alice@example.com", "host:ws-1"}
+
+
+def test_clusters_join_shared_entities_within_time_window() -> None:
+    graph = build_correlation(ALERTS, window_minutes=60)
+
+    assert len(graph["clusters"]) == 1
+    cluster = graph["clusters"][0]
+    assert cluster["cluster_id"] == "C1"
+    assert cluster["alert_ids"] == ["A-1", "A-2", "A-3"]
+    assert cluster["shared_entities"] == ["ip:203.0.113.10", "user:alice@example.com"]
+    assert cluster["sources"] == ["firewall", "o365", "siem"]
+
+    # A-4 shares host ws-1 with A-3 but is two days later.
+    assert graph["isolated_alert_ids"] == ["A-4", "A-5"]
+    assert graph["shared_entities"]["host:ws-1"] == ["A-3", "A-4"]
+    assert graph["time_buckets"]["2025-01-01T12:00:00Z"] == ["A-1", "A-2", "A-3", "A-5"]
+
+
+def test_high_fanout_entities_do_not_merge_clusters() -> None:
+    alerts = [
+        {"id": f"A-{i}", "timestamp": "2025-01-01T12:00:00Z", "dst_ip": "10.0.0.1"}
+        for i in range(5)
+    ]
+    graph = build_correlation(alerts, max_entity_fanout=3)
+    assert graph["clusters"] == []
+    assert graph["high_fanout_entities"] == ["ip:10.0.0.1"]
+
+
+def test_correlate_alerts_tool_writes_session_state() -> None:
+    class _Ctx:
+        def __init__(self) -> None:
+            self.state = {"raw_alerts": ALERTS}
+
+    ctx = _Ctx()
+    graph = correlate_alerts(window_minutes=5000, tool_context=ctx)
+
+    assert ctx.state["correlation_graph"] is graph
+    assert graph["clusters"][0]["alert_ids"] == ["A-1", "A-2", "A-3", "A-4"]
+    assert ctx.state["events"][-1]["actor"] == "correlate_alerts"
+
+
+def test_window_minutes_must_be_a_whole_number_of_minutes() -> None:
+    for bad in (0, -5, 0.5, float("nan"), "30", True):
+        with pytest.raises(ValueError):
+            build_correlation(ALERTS, window_minutes=bad)
+
+    class _Ctx:
+        def __init__(self) -> None:
+            self.state = {"raw_alerts": ALERTS}
+
+    ctx = _Ctx()
+    assert "window_minutes" in correlate_alerts(window_minutes=0, tool_context=ctx)["error"]
+    assert "correlation_graph" not in ctx.state
+    assert correlate_alerts(window_minutes=30.0, tool_context=ctx)["window_minutes"] == 30
@@ -0,0 +1,61 @@
+import pytest
+
+from aegis_soc_sessions import observability
+from aegis_soc_sessions.observability import (
+    EVENT_STATE_SNAPSHOT,
+    StructuredEvent,
+    iter_events,
+    record_event,
+    record_state_snapshot,
+)
+
+
+def test_structured_event_is_interned_and_logged_as_a_dict(monkeypatch) -> None:
+    monkeypatch.setattr(observability, "EVENT_LOG_CAP", 1000)
+    a = StructuredEvent("t", "tool" + "_call", "load_" + "synthetic_alerts", {})
+    b = StructuredEvent("t", "tool_call", "load_synthetic_alerts", {})
+    assert a.event_type is b.event_type
+    assert a.actor is b.actor
+
+    state: dict = {}
+    record_event(state, "tool" + "_call", "load_" + "synthetic_alerts", {"n": 1})
+    (logged,) = state["events"]
+    assert type(logged) is dict
+    assert logged["event_type"] is a.event_type
+    assert logged["actor"] is a.actor
+
+
+def test_event_log_is_bounded_and_spills_to_disk(monkeypatch, tmp_path) -> None:
+    monkeypatch.setattr(observability, "EVENT_LOG_CAP", 8)
+    monkeypatch.setattr(observability, "EVENT_SPILL_DIR", str(tmp_path))
+    state: dict = {}
+
+    for i in range(50):
+        record_event(state, "tool_call", "load_synthetic_alerts", {"n": i})
+
+    assert len(state["events"]) <= 8
+    assert state["events"][-1]["details"] == {"n": 49}
+    assert state["events_dropped"] + len(state["events"]) == 50
+
+    full_history = list(iter_events(state))
+    assert [e["details"]["n"] for e in full_history] == list(range(50))
+
+
+def test_snapshots_store_references_not_values(monkeypatch) -> None:
+    monkeypatch.setattr(observability, "EVENT_LOG_CAP", 1000)
+    big_alerts = [{"id": f"A-{i}", "description": "x" * 500} for i in range(100)]
+    state: dict = {"raw_alerts": big_alerts}
+
+    record_state_snapshot(state, "root_agent", ["raw_alerts", "parsed_alerts"])
+    record_state_snapshot(state, "root_agent", ["raw_alerts"])
+    state["raw_alerts"] = big_alerts[:1]
+    record_state_snapshot(state, "root_agent", ["raw_alerts"])
+
+    snapshots = [e for e in state["events"] if e["event_type"] == EVENT_STATE_SNAPSHOT]
+    first, second, third = (s["details"]["state"] for s in snapshots)
+    assert first["raw_alerts"]["ref"] == "raw_alerts"
+    assert first["raw_alerts"]["changed"] is True
+    assert first["parsed_alerts"] is None
+    assert second["raw_alerts"]["changed"] is False
+    assert third["raw_alerts"]["changed"] is True
+    assert "x" * 500 not in str(state["events"])
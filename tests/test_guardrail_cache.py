@@ -0,0 +1,95 @@
+import json
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.apps.app import App
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from guardrail_agent.agent import guardrail_agent
+from guardrail_agent.cache import DecisionCache, decision_cache, payload_key
+
+
+class _CountingModel(BaseLlm):
+    model: str = "counting-stub"
+    calls: int = 0
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        self.calls += 1
+        verdict = {"allow": True, "normalized_action": "MONITOR", "rationale": "stub"}
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=json.dumps(verdict))])
+        )
+
+
+def test_payload_key_ignores_order_whitespace_and_extra_fields() -> None:
+    a = {"proposed_action": "Escalate  now", "evidence_summary": "x", "triage_summary": "y"}
+    b = {"triage_summary": "y", "evidence_summary": "x\n", "proposed_action": "Escalate now", "id": 7}
+    assert payload_key(a) == payload_key(b)
+    assert payload_key(a) != payload_key({**a, "evidence_summary": "z"})
+
+
+def test_ttl_expiry_lru_eviction_and_counters() -> None:
+    now = [0.0]
+    cache = DecisionCache(ttl_seconds=10, max_entries=2, clock=lambda: now[0])
+
+    cache.put("a", {"normalized_action": "CLOSE"})
+    cache.put("b", {"normalized_action": "MONITOR"})
+    assert cache.get("a") == {"normalized_action": "CLOSE"}  # "a" is now most recent
+    cache.put("c", {"normalized_action": "ESCALATE"})  # evicts "b"
+    assert cache.get("b") is None
+
+    now[0] = 11.0
+    assert cache.get("a") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["expirations"]) == (1, 2, 1, 1)
+
+
+def test_disabled_cache_stores_nothing() -> None:
+    cache = DecisionCache(ttl_seconds=0)
+    cache.put("a", {"normalized_action": "CLOSE"})
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_repeated_ambiguous_payload_skips_model() -> None:
+    model = _CountingModel()
+    agent = LlmAgent(
+        name="guardrail_agent",
+        model=model,
+        instruction="stub",
+        before_model_callback=guardrail_agent.before_model_callback,
+        after_model_callback=guardrail_agent.after_model_callback,
+    )
+    app = App(name="guardrail_cache_test", root_agent=agent)
+    session_service = InMemorySessionService()
+    runner = Runner(app=app, session_service=session_service)
+    decision_cache.clear()
+
+    # Negated wording is not decidable by the rule engine, so it needs the model.
+    payload = {
+        "proposed_action": "Suspicious but not confirmed",
+        "evidence_summary": "One failed login",
+        "triage_summary": "Unclear.",
+    }
+    responses = []
+    for _ in range(2):
+        session = await session_service.create_session(app_name=app.name, user_id="u")
+        text = ""
+        async for event in runner.run_async(
+            user_id="u",
+            session_id=session.id,
+            new_message=types.Content(role="user", parts=[types.Part(text=json.dumps(payload))]),
+        ):
+            if event.content and event.content.parts:
+                text += "".join(p.text or "" for p in event.content.parts)
+        responses.append(json.loads(text))
+
+    assert model.calls == 1
+    assert responses[0] == responses[1]
+    assert decision_cache.stats()["hits"] == 1
+    decision_cache.clear()
@@ -0,0 +1,134 @@
+import asyncio
+import inspect
+import json
+
+import httpx
+import pytest
+from google.adk.agents.remote_a2a_agent import RemoteA2aAgent
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from aegis_soc_sessions.guardrail_client import (
+    RESOLUTION_ATTRS,
+    AgentCardCache,
+    GuardrailHttpPool,
+    build_guardrail_remote_agent,
+)
+
+CARD_URL = "http://localhost:8001/.well-known/agent-card.json"
+
+
+def _card(version: str = "0.0.1") -> dict:
+    return {
+        "name": "guardrail_agent",
+        "description": "stub guardrail",
+        "url": "http://localhost:8001",
+        "version": version,
+        "capabilities": {},
+        "defaultInputModes": ["text/plain"],
+        "defaultOutputModes": ["text/plain"],
+        "skills": [],
+    }
+
+
+class _StubCardServer:
+    def __init__(self) -> None:
+        self.version = "0.0.1"
+        self.fail = False
+        self.requests = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if self.fail:
+            return httpx.Response(503)
+        return httpx.Response(200, json=_card(self.version))
+
+
+async def test_card_is_cached_and_refreshed_after_ttl() -> None:
+    server = _StubCardServer()
+    pool = GuardrailHttpPool(transport=httpx.MockTransport(server))
+    now = [0.0]
+    cache = AgentCardCache(CARD_URL, pool, ttl_seconds=60, clock=lambda: now[0])
+
+    first = await cache.get()
+    assert await cache.get() is first
+    assert server.requests == 1
+
+    now[0] = 61.0
+    server.version = "0.0.2"
+    refreshed = await cache.get()
+    assert refreshed.version == "0.0.2"
+    assert server.requests == 2
+    assert cache.stats()["fetches"] == 2
+
+    # A failed refresh keeps serving the last good card.
+    now[0] = 200.0
+    server.fail = True
+    assert (await cache.get()) is refreshed
+
+    snapshot = pool.metrics.snapshot()["GET /.well-known/agent-card.json"]
+    assert snapshot["count"] == 3
+    assert snapshot["errors"] == 1
+
+
+async def test_first_card_fetch_failure_raises() -> None:
+    server = _StubCardServer()
+    server.fail = True
+    pool = GuardrailHttpPool(transport=httpx.MockTransport(server))
+    with pytest.raises(Exception):
+        await AgentCardCache(CARD_URL, pool).get()
+
+
+def test_pool_rebuilds_client_for_a_new_event_loop() -> None:
+    pool = GuardrailHttpPool(transport=httpx.MockTransport(_StubCardServer()))
+
+    async def grab():
+        return pool.client(), pool.client()
+
+    a1, a2 = asyncio.run(grab())
+    b1, _ = asyncio.run(grab())
+    assert a1 is a2
+    assert b1 is not a1
+    assert pool.clients_created == 2
+
+
+async def test_remote_agent_reuses_card_and_client_against_local_app() -> None:
+    # Run the real guardrail A2A app in-process; the rule fast path answers
+    # this payload, so no model call is made.
+    from guardrail_agent.app import app
+
+    pool = GuardrailHttpPool(transport=httpx.ASGITransport(app=app))
+    agent = build_guardrail_remote_agent(CARD_URL, pool=pool, description="guardrail")
+    payload = json.dumps({"proposed_action": "Escalate to the on-call analyst."})
+
+    async with app.router.lifespan_context(app):
+        runner = InMemoryRunner(agent=agent, app_name="guardrail_client_test")
+        session = await runner.session_service.create_session(
+            app_name="guardrail_client_test", user_id="u"
+        )
+        texts = []
+        for _ in range(3):
+            message = types.Content(role="user", parts=[types.Part(text=payload)])
+            async for event in runner.run_async(
+                user_id="u", session_id=session.id, new_message=message
+            ):
+                if event.content and event.content.parts and event.content.parts[0].text:
+                    texts.append(event.content.parts[0].text)
+
+    assert any('"normalized_action": "ESCALATE"' in t for t in texts)
+    metrics = pool.metrics.snapshot()
+    assert metrics["GET /.well-known/agent-card.json"]["count"] == 1
+    assert metrics["POST /"]["count"] == 3
+    assert pool.clients_created == 1
+
+
+def test_remote_a2a_agent_still_has_the_attributes_the_pooled_agent_swaps() -> None:
+    # Fails on a google-adk upgrade that renames or drops them.
+    agent = RemoteA2aAgent(name="probe", agent_card=CARD_URL)
+    assert [attr for attr in RESOLUTION_ATTRS if not hasattr(agent, attr)] == []
+
+    resolve = inspect.getsource(RemoteA2aAgent._ensure_resolved)
+    for attr in ("_agent_card", "_a2a_client_factory", "_a2a_client", "_is_resolved"):
+        assert f"self.{attr}" in resolve, attr
+    assert "self._httpx_client" in inspect.getsource(RemoteA2aAgent._ensure_httpx_client)
+    assert "self._httpx_client_needs_cleanup" in inspect.getsource(RemoteA2aAgent.cleanup)
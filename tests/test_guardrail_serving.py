@@ -0,0 +1,233 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.apps.app import App
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from aegis_soc_sessions.guardrail_client import GuardrailHttpPool
+from guardrail_agent.agent import guardrail_agent
+from guardrail_agent.cache import SingleFlight, decision_cache, single_flight
+from guardrail_agent.serving import ConcurrencyLimiter, ConcurrencyLimitMiddleware
+
+
+# --- Admission control -------------------------------------------------------
+
+
+def _slow_app(limiter: ConcurrencyLimiter, release: asyncio.Event) -> Starlette:
+    async def work(request):
+        await release.wait()
+        return JSONResponse({"ok": True})
+
+    async def card(request):
+        return JSONResponse({"name": "card"})
+
+    app = Starlette(routes=[Route("/", work, methods=["POST"]), Route("/card", card)])
+    app.add_middleware(ConcurrencyLimitMiddleware, limiter=limiter)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_limit_queues_then_rejects_with_retry_after() -> None:
+    release = asyncio.Event()
+    limiter = ConcurrencyLimiter(max_concurrency=1, max_queue=1, queue_timeout_seconds=5, retry_after_seconds=2)
+    transport = httpx.ASGITransport(app=_slow_app(limiter, release))
+    async with httpx.AsyncClient(transport=transport, base_url="http://guardrail") as client:
+        running = asyncio.create_task(client.post("/", json={}))
+        queued = asyncio.create_task(client.post("/", json={}))
+        await asyncio.sleep(0.05)
+        assert (limiter.active, limiter.waiting) == (1, 1)
+
+        rejected = await client.post("/", json={})
+        assert rejected.status_code == 429
+        assert rejected.headers["retry-after"] == "2"
+        # Reads are exempt from the limit.
+        assert (await client.get("/card")).status_code == 200
+
+        release.set()
+        assert [r.status_code for r in await asyncio.gather(running, queued)] == [200, 200]
+    assert limiter.stats()["admitted"] == 2
+    assert limiter.stats()["rejected_full"] == 1
+    assert limiter.active == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_timeout_rejects() -> None:
+    release = asyncio.Event()
+    limiter = ConcurrencyLimiter(max_concurrency=1, max_queue=5, queue_timeout_seconds=0.05)
+    transport = httpx.ASGITransport(app=_slow_app(limiter, release))
+    async with httpx.AsyncClient(transport=transport, base_url="http://guardrail") as client:
+        running = asyncio.create_task(client.post("/", json={}))
+        await asyncio.sleep(0.01)
+        assert (await client.post("/", json={})).status_code == 429
+        release.set()
+        await running
+    assert limiter.stats()["rejected_timeout"] == 1
+
+
+@pytest.mark.asyncio
+async def test_client_backs_off_and_retries_on_429() -> None:
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.content)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"retry-after": "0"})
+        return httpx.Response(200, json={"ok": True})
+
+    pool = GuardrailHttpPool(transport=httpx.MockTransport(handler))
+    response = await pool.client().post("http://guardrail/", json={"x": 1})
+    assert response.status_code == 200
+    # The request body is replayed unchanged.
+    assert len(calls) == 2 and calls[0] == calls[1]
+    assert pool.metrics.snapshot()["POST /"]["throttled"] == 1
+    await pool.aclose()
+
+
+def test_guardrail_app_exposes_serving_stats() -> None:
+    from starlette.testclient import TestClient
+
+    from guardrail_agent.app import app
+
+    stats = TestClient(app).get("/serving/stats").json()
+    assert {"active", "waiting", "admitted", "rejected_full"} <= set(stats)
+
+
+# --- Single-flight coalescing ------------------------------------------------
+
+
+class _SlowModel(BaseLlm):
+    model: str = "slow-stub"
+    calls: int = 0
+    fail_first: bool = False
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        self.calls += 1
+        call = self.calls
+        await asyncio.sleep(0.1)
+        if self.fail_first and call == 1:
+            raise RuntimeError("model unavailable")
+        verdict = {"allow": True, "normalized_action": "MONITOR", "rationale": f"call {call}"}
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=json.dumps(verdict))])
+        )
+
+
+async def _concurrent_verdicts(model: BaseLlm, n: int) -> list:
+    agent = LlmAgent(
+        name="guardrail_agent",
+        model=model,
+        instruction="stub",
+        before_model_callback=guardrail_agent.before_model_callback,
+        after_model_callback=guardrail_agent.after_model_callback,
+        on_model_error_callback=guardrail_agent.on_model_error_callback,
+    )
+    app = App(name="guardrail_single_flight_test", root_agent=agent)
+    session_service = InMemorySessionService()
+    runner = Runner(app=app, session_service=session_service)
+    payload = {
+        "proposed_action": "Suspicious but not confirmed",
+        "evidence_summary": "Two failed logins",
+        "triage_summary": "Unclear.",
+    }
+
+    async def one():
+        session = await session_service.create_session(app_name=app.name, user_id="u")
+        text = ""
+        try:
+            async for event in runner.run_async(
+                user_id="u",
+                session_id=session.id,
+                new_message=types.Content(role="user", parts=[types.Part(text=json.dumps(payload))]),
+            ):
+                if event.content and event.content.parts:
+                    text += "".join(p.text or "" for p in event.content.parts)
+        except Exception as exc:  # the failed leader
+            return exc
+        return json.loads(text)
+
+    return await asyncio.gather(*(one() for _ in range(n)))
+
+
+@pytest.mark.asyncio
+async def test_identical_in_flight_payloads_share_one_model_call() -> None:
+    decision_cache.clear()
+    single_flight.clear()
+    model = _SlowModel()
+
+    verdicts = await _concurrent_verdicts(model, 5)
+
+    assert model.calls == 1
+    assert all(v == verdicts[0] for v in verdicts)
+    assert single_flight.stats()["coalesced"] == 4
+    assert len(single_flight) == 0
+    decision_cache.clear()
+    single_flight.clear()
+
+
+@pytest.mark.asyncio
+async def test_waiters_take_over_when_the_leader_fails() -> None:
+    decision_cache.clear()
+    single_flight.clear()
+    model = _SlowModel(fail_first=True)
+
+    results = await _concurrent_verdicts(model, 3)
+
+    assert sum(isinstance(r, Exception) for r in results) == 1
+    verdicts = [r for r in results if isinstance(r, dict)]
+    assert len(verdicts) == 2 and verdicts[0] == verdicts[1]
+    assert model.calls == 2
+    decision_cache.clear()
+    single_flight.clear()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_is_abandoned_and_replaced() -> None:
+    flight = SingleFlight(timeout_seconds=60)
+    outcomes = []
+
+    async def request(done: asyncio.Event) -> None:
+        outcomes.append(await flight.wait_or_lead("k"))
+        done.set()
+        await asyncio.sleep(3600)  # the model call; no callback will resolve it
+
+    first_done, second_done = asyncio.Event(), asyncio.Event()
+    first = asyncio.create_task(request(first_done))
+    await first_done.wait()
+    second = asyncio.create_task(request(second_done))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    # The waiter takes over right away instead of sitting out the 60 s timeout.
+    await asyncio.wait_for(second_done.wait(), timeout=1)
+    assert outcomes == [(True, None), (True, None)]
+    assert flight.stats()["abandoned"] == 1 and flight.stats()["leaders"] == 2
+    flight.resolve("k", {"normalized_action": "MONITOR"})
+    second.cancel()
+    await asyncio.gather(first, second, return_exceptions=True)
+    assert len(flight) == 0 and flight.stats()["abandoned"] == 1
+
+
+@pytest.mark.asyncio
+async def test_timed_out_waiter_replaces_a_stuck_leader() -> None:
+    flight = SingleFlight(timeout_seconds=0.05)
+    assert await flight.wait_or_lead("k") == (True, None)  # leads, never resolves
+
+    # Same task, so the leader looks alive: only the timeout can detect it.
+    assert await flight.wait_or_lead("k") == (True, None)
+    assert flight.timeouts == 1 and flight.leaders == 2
+
+    # Later requests follow the new leader, not the stuck one.
+    follower = asyncio.create_task(flight.wait_or_lead("k"))
+    await asyncio.sleep(0)
+    flight.resolve("k", {"normalized_action": "CLOSE"})
+    assert await follower == (False, {"normalized_action": "CLOSE"})
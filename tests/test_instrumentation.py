@@ -0,0 +1,136 @@
+import logging
+import urllib.request
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.apps.app import App
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from aegis_soc_sessions.agent import load_synthetic_alerts
+from aegis_soc_sessions.instrumentation import (
+    _current_model_call,
+    _span_starts,
+    install_retry_counter,
+    instrument_agent,
+    registry,
+    serve_metrics,
+)
+from aegis_soc_sessions.observability import EVENT_MODEL_USAGE, EVENT_SPAN
+from tests.helpers import StubModel
+
+
+@pytest.mark.asyncio
+async def test_spans_and_token_usage_are_recorded_per_hop() -> None:
+    registry.reset()
+    agent = instrument_agent(
+        LlmAgent(
+            name="instrumented_agent",
+            model=StubModel(steps=["load_synthetic_alerts"]),
+            tools=[load_synthetic_alerts],
+        )
+    )
+    # Instrumenting twice must not double-register callbacks.
+    instrument_agent(agent)
+    assert len(agent.before_model_callback) == 1
+
+    session_service = InMemorySessionService()
+    runner = Runner(
+        app=App(name="instrumentation_test", root_agent=agent),
+        session_service=session_service,
+    )
+    await session_service.create_session(
+        app_name="instrumentation_test", user_id="u", session_id="s"
+    )
+    message = types.Content(role="user", parts=[types.Part(text="Triage ALERT-001 please.")])
+    async for _ in runner.run_async(user_id="u", session_id="s", new_message=message):
+        pass
+
+    session = await session_service.get_session(
+        app_name="instrumentation_test", user_id="u", session_id="s"
+    )
+    events = session.state["events"]
+    spans = [e["details"] for e in events if e["event_type"] == EVENT_SPAN]
+    kinds = {(s["kind"], s["name"]) for s in spans}
+    assert ("tool", "load_synthetic_alerts") in kinds
+    assert ("model", "instrumented_agent") in kinds
+    assert ("agent", "instrumented_agent") in kinds
+    assert all(s["duration_ms"] >= 0 for s in spans)
+
+    usage = [e["details"] for e in events if e["event_type"] == EVENT_MODEL_USAGE]
+    assert len(usage) == 2
+    assert usage[-1]["response_tokens"] > 0
+    assert usage[-1]["prompt_bytes"] > 0
+    assert usage[-1]["retries"] == 0
+
+    assert registry.counter_value("aegis_model_calls_total", {"agent": "instrumented_agent"}) == 2
+    assert registry.histogram_count(
+        "aegis_span_duration_seconds", {"kind": "tool", "name": "load_synthetic_alerts"}
+    ) == 1
+
+
+def test_genai_retry_records_are_counted_and_not_leaked(caplog) -> None:
+    registry.reset()
+    install_retry_counter()
+    genai_logger = logging.getLogger("google_genai._api_client")
+
+    token = _current_model_call.set({"agent": "root_triage_agent", "retries": 0, "prompt_bytes": 0})
+    try:
+        with caplog.at_level(logging.WARNING):
+            genai_logger.info("Retrying _request_once in 1 seconds as it raised ClientError: 429.")
+            genai_logger.info("Retrying _request_once in 7 seconds as it raised ClientError: 429.")
+        call = _current_model_call.get()
+    finally:
+        _current_model_call.reset(token)
+
+    assert call["retries"] == 2
+    assert registry.counter_value("aegis_model_retries_total", {"agent": "root_triage_agent"}) == 2
+    assert not [r for r in caplog.records if r.name == "google_genai._api_client"]
+
+
+def test_metrics_endpoint_serves_prometheus_and_openmetrics() -> None:
+    registry.reset()
+    registry.inc("aegis_model_tokens_total", {"agent": "a", "direction": "prompt"}, 12)
+    registry.observe("aegis_span_duration_seconds", {"kind": "tool", "name": 't"x'}, 0.2)
+
+    server = serve_metrics(0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        text = urllib.request.urlopen(url, timeout=5).read().decode()
+        request = urllib.request.Request(url, headers={"Accept": "application/openmetrics-text"})
+        openmetrics = urllib.request.urlopen(request, timeout=5).read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert 'aegis_model_tokens_total{agent="a",direction="prompt"} 12.0' in text
+    assert "# TYPE aegis_model_tokens_total counter" in text
+    assert 'aegis_span_duration_seconds_bucket{kind="tool",name="t\\"x",le="0.25"} 1' in text
+    assert 'aegis_span_duration_seconds_bucket{kind="tool",name="t\\"x",le="0.1"} 0' in text
+    assert "# TYPE aegis_model_tokens counter" in openmetrics
+    assert openmetrics.rstrip().endswith("# EOF")
+
+
+class _FailingModel(StubModel):
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        raise RuntimeError("provider unavailable")
+        yield  # pragma: no cover - makes this an async generator
+
+
+@pytest.mark.asyncio
+async def test_failed_model_calls_close_their_span() -> None:
+    agent = instrument_agent(LlmAgent(name="failing_agent", model=_FailingModel()))
+    session_service = InMemorySessionService()
+    runner = Runner(app=App(name="instrumentation_errors", root_agent=agent), session_service=session_service)
+    session = await session_service.create_session(app_name="instrumentation_errors", user_id="u")
+    message = types.Content(role="user", parts=[types.Part(text="Triage ALERT-001 please.")])
+
+    with pytest.raises(RuntimeError):
+        async for _ in runner.run_async(user_id="u", session_id=session.id, new_message=message):
+            pass
+
+    assert not [key for key in _span_starts if key[0] == "model" and key[2] == "failing_agent"]
+    assert registry.histogram_count(
+        "aegis_span_duration_seconds", {"kind": "model", "name": "failing_agent"}
+    ) >= 1
@@ -0,0 +1,121 @@
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.apps.app import App
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from aegis_soc_sessions.agent import correlate_alerts, load_synthetic_alerts
+from aegis_soc_sessions.memo import ALERT_SET_KEY_STATE, MemoizedAgentTool, alert_set_key
+from tests.helpers import StubModel
+
+
+class _EveryTurnModel(BaseLlm):
+    """Calls each step once per user turn (unlike StubModel, which calls once per session)."""
+
+    model: str = "every-turn-stub"
+    steps: list = []
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        contents = llm_request.contents or []
+        last_user = max(
+            (i for i, c in enumerate(contents) if c.role == "user" and any(p.text for p in c.parts or [])),
+            default=0,
+        )
+        user_text = next(p.text for p in contents[last_user].parts if p.text)
+        done = {
+            part.function_response.name
+            for content in contents[last_user:]
+            for part in content.parts or []
+            if part.function_response
+        }
+        for step in self.steps:
+            if step in done:
+                continue
+            words = user_text.split()
+            if step == "load_synthetic_alerts":
+                args = {"alert_id": next(w for w in words if w.startswith("ALERT-"))}
+            elif step == "correlate_alerts":
+                args = {"window_minutes": int(words[-1])}
+            else:
+                args = {"request": user_text}
+            yield LlmResponse(
+                content=types.Content(
+                    role="model", parts=[types.Part(function_call=types.FunctionCall(name=step, args=args))]
+                )
+            )
+            return
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="done")]))
+
+
+def _session_runner(root_steps):
+    parser_model = StubModel(text="parsed")
+    correlator_model = StubModel(text="correlated")
+    parser = LlmAgent(name="log_parser_agent", model=parser_model, instruction="p", output_key="parsed_alerts")
+    correlator = LlmAgent(
+        name="correlation_agent", model=correlator_model, instruction="c", output_key="correlation_summary"
+    )
+    parser_tool = MemoizedAgentTool(parser)
+    correlator_tool = MemoizedAgentTool(correlator, depends_on=(ALERT_SET_KEY_STATE, "correlation_graph"))
+    root = LlmAgent(
+        name="root_triage_agent",
+        model=_EveryTurnModel(steps=root_steps),
+        tools=[load_synthetic_alerts, correlate_alerts, parser_tool, correlator_tool],
+    )
+    runner = Runner(app=App(name="memo_test_app", root_agent=root), session_service=InMemorySessionService())
+    return runner, parser_model, correlator_model, parser_tool
+
+
+async def _turn(runner, session_id: str, text: str) -> None:
+    message = types.Content(role="user", parts=[types.Part(text=text)])
+    async for _ in runner.run_async(user_id="u", session_id=session_id, new_message=message):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_follow_up_turns_reuse_sub_agent_outputs() -> None:
+    runner, parser_model, correlator_model, parser_tool = _session_runner(
+        ["load_synthetic_alerts", "log_parser_agent", "correlation_agent"]
+    )
+    session = await runner.session_service.create_session(app_name="memo_test_app", user_id="u")
+
+    await _turn(runner, session.id, "Triage ALERT-001")
+    await _turn(runner, session.id, "Is it related to ALERT-001")
+    assert (parser_model.calls, correlator_model.calls) == (1, 1)
+    assert parser_tool.stats() == {"tool": "log_parser_agent", "hits": 1, "misses": 1}
+
+    # A different alert set invalidates both outputs.
+    await _turn(runner, session.id, "Now look at ALERT-002")
+    assert (parser_model.calls, correlator_model.calls) == (2, 2)
+
+    state = (await runner.session_service.get_session(
+        app_name="memo_test_app", user_id="u", session_id=session.id
+    )).state
+    memoized = [e for e in state["events"] if e["details"].get("memoized")]
+    assert {e["actor"] for e in memoized} == {"log_parser_agent", "correlation_agent"}
+    assert any(e["details"].get("unchanged") for e in state["events"] if e["actor"] == "load_synthetic_alerts")
+
+
+@pytest.mark.asyncio
+async def test_correlator_reruns_when_the_correlation_graph_changes() -> None:
+    runner, parser_model, correlator_model, _ = _session_runner(
+        ["load_synthetic_alerts", "log_parser_agent", "correlate_alerts", "correlation_agent"]
+    )
+    session = await runner.session_service.create_session(app_name="memo_test_app", user_id="u")
+
+    await _turn(runner, session.id, "Triage ALERT-001 window 5")
+    await _turn(runner, session.id, "Again ALERT-001 window 5")
+    assert (parser_model.calls, correlator_model.calls) == (1, 1)
+    # Same alerts, new correlation window: only the correlator runs again.
+    await _turn(runner, session.id, "Wider ALERT-001 window 120")
+    assert (parser_model.calls, correlator_model.calls) == (1, 2)
+
+
+def test_alert_set_key_is_order_independent() -> None:
+    a, b = {"id": "A", "severity": "low"}, {"id": "B"}
+    assert alert_set_key([a, b]) == alert_set_key([b, a])
+    assert alert_set_key([a]) != alert_set_key([{**a, "severity": "high"}])
+    with pytest.raises(ValueError):
+        MemoizedAgentTool(LlmAgent(name="no_output", model=StubModel()))
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.apps.app import App
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.google_llm import Gemini
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.adk.tools.agent_tool import AgentTool
+from google.genai import types
+
+from aegis_soc_sessions.agent import load_synthetic_alerts
+from aegis_soc_sessions.model_replay import (
+    MODE_RECORD,
+    MODE_REPLAY,
+    Cassette,
+    CassetteLlm,
+    CassetteMissError,
+    build_model,
+    cassette_models,
+)
+from tests.helpers import StubModel
+
+
+class _OfflineModel(BaseLlm):
+    model: str = "stub-model"
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        raise AssertionError("replay must not call the wrapped model")
+        yield  # pragma: no cover
+
+
+def _agents(model_factory):
+    parser = LlmAgent(name="log_parser_agent", model=model_factory(steps=[]), output_key="parsed_alerts")
+    root = LlmAgent(
+        name="root_triage_agent",
+        model=model_factory(steps=["load_synthetic_alerts", "log_parser_agent"]),
+        tools=[load_synthetic_alerts, AgentTool(agent=parser)],
+        output_key="triage_summary",
+    )
+    return root, parser
+
+
+async def _triage(runner: Runner, alert_id: str) -> str:
+    session = await runner.session_service.create_session(app_name=runner.app_name, user_id="u")
+    message = types.Content(role="user", parts=[types.Part(text=f"Triage {alert_id}.")])
+    async for _ in runner.run_async(user_id="u", session_id=session.id, new_message=message):
+        pass
+    session = await runner.session_service.get_session(
+        app_name=runner.app_name, user_id="u", session_id=session.id
+    )
+    return session.state["triage_summary"]
+
+
+def _runner(root) -> Runner:
+    return Runner(app=App(name="replay_test", root_agent=root), session_service=InMemorySessionService())
+
+
+@pytest.mark.asyncio
+async def test_record_then_replay_in_parallel_without_the_model(tmp_path) -> None:
+    alert_ids = ["ALERT-001", "ALERT-002", "ALERT-021"]
+
+    root, parser = _agents(lambda steps: StubModel(steps=steps))
+    with cassette_models([root, parser], tmp_path, MODE_RECORD) as wrappers:
+        runner = _runner(root)
+        recorded = [await _triage(runner, a) for a in alert_ids]
+    assert sum(w.recorded for w in wrappers) == len(Cassette(tmp_path)) > 0
+    assert isinstance(root.model, StubModel)
+
+    root, parser = _agents(lambda steps: _OfflineModel())
+    with cassette_models([root, parser], tmp_path, MODE_REPLAY) as wrappers:
+        runner = _runner(root)
+        replayed = await asyncio.gather(*(_triage(runner, a) for a in alert_ids))
+    assert list(replayed) == recorded
+    assert "ESCALATE" in replayed[2]
+    assert sum(w.hits for w in wrappers) == len(Cassette(tmp_path))
+
+
+@pytest.mark.asyncio
+async def test_replay_miss_raises(tmp_path) -> None:
+    root, parser = _agents(lambda steps: _OfflineModel())
+    with cassette_models([root, parser], tmp_path, MODE_REPLAY):
+        with pytest.raises(Exception) as excinfo:
+            await _triage(_runner(root), "ALERT-001")
+    chain = [excinfo.value, excinfo.value.__cause__, excinfo.value.__context__]
+    assert any(isinstance(e, CassetteMissError) for e in chain) or "No recorded response" in str(
+        excinfo.value
+    )
+
+
+def test_build_model_is_plain_gemini_when_live(tmp_path) -> None:
+    assert isinstance(build_model("gemini-2.5-flash-lite", mode="live"), Gemini)
+    wrapped = build_model("gemini-2.5-flash-lite", mode="replay", cassette_dir=str(tmp_path))
+    assert isinstance(wrapped, CassetteLlm)
+    assert isinstance(wrapped.inner, Gemini)
+    with pytest.raises(ValueError):
+        build_model("gemini-2.5-flash-lite", mode="bogus")
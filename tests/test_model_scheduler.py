@@ -0,0 +1,210 @@
+import asyncio
+from typing import List
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.apps.app import App
+from google.adk.models.google_llm import Gemini
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import errors as genai_errors
+from google.genai import types
+
+from aegis_soc_sessions.agent import load_synthetic_alerts, retry_config
+from aegis_soc_sessions.alert_columns import get_alert_columns
+from aegis_soc_sessions.batch import ProviderRateLimiter, triage_batch
+from aegis_soc_sessions.instrumentation import registry
+from aegis_soc_sessions.model_replay import build_model
+from aegis_soc_sessions.model_scheduler import (
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    ModelCallScheduler,
+    ScheduledGemini,
+    current_priority,
+    model_priority,
+    priority_for_severity,
+)
+from tests.helpers import StubModel
+
+
+@pytest.mark.asyncio
+async def test_waiting_calls_are_served_by_priority() -> None:
+    scheduler = ModelCallScheduler(rate=50, max_rate=50, burst=1)
+    await scheduler.acquire()  # drain the bucket so everyone below has to wait
+    order: List[str] = []
+
+    async def call(priority: str) -> None:
+        await scheduler.acquire(priority)
+        order.append(priority)
+
+    tasks = []
+    for priority in (PRIORITY_LOW, PRIORITY_LOW, PRIORITY_NORMAL, PRIORITY_HIGH):
+        tasks.append(asyncio.create_task(call(priority)))
+        await asyncio.sleep(0)
+    assert scheduler.queue_depth() == {PRIORITY_HIGH: 1, PRIORITY_NORMAL: 1, PRIORITY_LOW: 2}
+    await asyncio.gather(*tasks)
+
+    assert order == [PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW, PRIORITY_LOW]
+    stats = scheduler.stats()
+    assert stats["queue_depth"] == {PRIORITY_HIGH: 0, PRIORITY_NORMAL: 0, PRIORITY_LOW: 0}
+    assert stats["waits"][PRIORITY_LOW]["count"] == 2
+    assert stats["waits"][PRIORITY_LOW]["max_seconds"] > stats["waits"][PRIORITY_HIGH]["max_seconds"]
+    assert 'aegis_model_queue_depth{priority="low"} 0.0' in registry.render()
+    assert registry.histogram_count("aegis_model_queue_wait_seconds", {"priority": PRIORITY_LOW}) >= 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_gives_up_its_place() -> None:
+    scheduler = ModelCallScheduler(rate=20, max_rate=20, burst=1)
+    await scheduler.acquire()
+    waiter = asyncio.create_task(scheduler.acquire(PRIORITY_HIGH))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+
+    assert scheduler.queue_depth()[PRIORITY_HIGH] == 0
+    await asyncio.wait_for(scheduler.acquire(PRIORITY_LOW), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_queued_waiters_sleep_until_woken() -> None:
+    scheduler = ModelCallScheduler(rate=20, max_rate=20, burst=1)
+    await scheduler.acquire()
+    wakeups = []
+    dispatch = scheduler._dispatch
+
+    def counting_dispatch() -> None:
+        wakeups.append(1)
+        dispatch()
+
+    scheduler._dispatch = counting_dispatch
+    await asyncio.gather(*(scheduler.acquire(PRIORITY_LOW) for _ in range(5)))
+
+    # ~250 ms of waiting: one dispatch per arrival plus one timer per grant,
+    # where 5 ms polling would have woken each waiter dozens of times.
+    assert len(wakeups) <= 12
+    assert scheduler._timer is None and not scheduler._waiters
+
+
+def test_rate_adapts_additively_up_and_multiplicatively_down() -> None:
+    scheduler = ModelCallScheduler(rate=4, min_rate=1, max_rate=5, latency_target=1.0)
+
+    scheduler.record_success(0.1)
+    assert scheduler.rate == pytest.approx(4.25)
+    for _ in range(10):
+        scheduler.record_success(0.1)
+    assert scheduler.rate == 5  # capped
+
+    delay = scheduler.record_rate_limited()
+    assert scheduler.rate == 2.5 and delay == pytest.approx(0.4)
+    for _ in range(5):
+        scheduler.record_rate_limited()
+    assert scheduler.rate == 1  # floored
+    assert registry.gauge_value("aegis_model_rate_per_second", {}) == 1
+
+    for _ in range(20):
+        scheduler.record_success(30.0)  # slow provider: back off instead of growing
+    assert scheduler.rate == 1 and scheduler.latency_backoffs > 0
+    assert scheduler.stats()["rate_limited"] == 6
+
+
+def test_priority_context_and_severity_mapping() -> None:
+    assert priority_for_severity("High") == PRIORITY_HIGH
+    assert priority_for_severity("low") == PRIORITY_LOW
+    assert priority_for_severity(None) == PRIORITY_NORMAL
+    assert current_priority() == PRIORITY_NORMAL
+    with model_priority(PRIORITY_LOW):
+        assert current_priority() == PRIORITY_LOW
+    assert current_priority() == PRIORITY_NORMAL
+    with pytest.raises(ValueError):
+        with model_priority("urgent"):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_scheduled_gemini_retries_429s_through_the_scheduler(monkeypatch) -> None:
+    calls = []
+
+    async def fake_generate(self, llm_request, stream=False):
+        calls.append(current_priority())
+        if len(calls) < 3:
+            raise genai_errors.ClientError(429, {"error": {"message": "quota"}})
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="ok")]))
+
+    monkeypatch.setattr(Gemini, "generate_content_async", fake_generate)
+    scheduler = ModelCallScheduler(rate=100, min_rate=50, max_rate=100)
+    model = ScheduledGemini(model="gemini-2.5-flash-lite", scheduler=scheduler)
+
+    with model_priority(PRIORITY_HIGH):
+        responses = [r async for r in model.generate_content_async(LlmRequest(model=model.model))]
+
+    assert responses[0].content.parts[0].text == "ok"
+    assert calls == [PRIORITY_HIGH] * 3
+    assert scheduler.rate_limited == 2 and scheduler.successes == 1
+
+
+@pytest.mark.asyncio
+async def test_latency_excludes_time_spent_on_tool_calls(monkeypatch) -> None:
+    async def fake_generate(self, llm_request, stream=False):
+        await asyncio.sleep(0.01)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="ok")]))
+
+    monkeypatch.setattr(Gemini, "generate_content_async", fake_generate)
+    scheduler = ModelCallScheduler(rate=100, min_rate=50, max_rate=100, latency_target=0.2)
+    model = ScheduledGemini(model="gemini-2.5-flash-lite", scheduler=scheduler)
+
+    async for _ in model.generate_content_async(LlmRequest(model=model.model)):
+        # The latency is recorded before the response reaches the caller,
+        # whose tool and sub-agent calls run while the generator is suspended.
+        assert scheduler.successes == 1
+        await asyncio.sleep(0.3)
+
+    assert scheduler.successes == 1
+    assert scheduler.latency_ewma < 0.2 and scheduler.latency_backoffs == 0
+
+
+def test_build_model_leaves_429s_to_the_scheduler() -> None:
+    model = build_model("gemini-2.5-flash-lite", retry_options=retry_config, mode="live")
+    assert isinstance(model, ScheduledGemini)
+    assert 429 not in model.retry_options.http_status_codes
+    assert 503 in model.retry_options.http_status_codes
+    assert model.rate_limit_attempts == retry_config.attempts
+    assert 429 in retry_config.http_status_codes  # the shared config is untouched
+    plain = build_model("gemini-2.5-flash-lite", retry_options=retry_config, mode="live", scheduled=False)
+    assert type(plain) is Gemini and plain.retry_options is retry_config
+
+
+@pytest.mark.asyncio
+async def test_batch_triage_runs_each_alert_at_its_severity_priority() -> None:
+    class PriorityModel(StubModel):
+        seen: List[str] = []
+
+        async def generate_content_async(self, llm_request, stream: bool = False):
+            self.seen.append(current_priority())
+            async for response in super().generate_content_async(llm_request, stream):
+                yield response
+
+    columns = get_alert_columns()
+    high = columns.ids(severity="high", limit=1)[0]
+    low = columns.ids(severity="low", limit=1)[0]
+    model = PriorityModel(steps=["load_synthetic_alerts"])
+    agent = LlmAgent(name="root_triage_agent", model=model, tools=[load_synthetic_alerts])
+    runner = Runner(
+        app=App(name="scheduler_test_app", root_agent=agent),
+        session_service=InMemorySessionService(),
+    )
+
+    for alert_id, expected in ((high, PRIORITY_HIGH), (low, PRIORITY_LOW)):
+        model.seen = []
+        async for _ in triage_batch(
+            [alert_id],
+            runner=runner,
+            session_service=runner.session_service,
+            limiter=ProviderRateLimiter(rate_per_second=0),
+        ):
+            pass
+        assert model.seen and set(model.seen) == {expected}
+    assert current_priority() == PRIORITY_NORMAL
@@ -0,0 +1,166 @@
+import json
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.apps.app import App
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+from aegis_soc_sessions import agent as agent_module
+from aegis_soc_sessions import batch as batch_module
+from aegis_soc_sessions.agent import load_synthetic_alerts
+from aegis_soc_sessions.alert_columns import AlertColumns
+from aegis_soc_sessions.alert_store import AlertStore
+from aegis_soc_sessions.alert_stream import DEFAULT_ALERTS_PATH
+from aegis_soc_sessions.batch import ProviderRateLimiter, triage_batch
+from aegis_soc_sessions.near_duplicates import (
+    NearDuplicateIndex,
+    alert_fingerprint,
+    collapse_near_duplicates,
+)
+from tests.helpers import StubModel
+
+
+def _storm() -> List[Dict[str, Any]]:
+    """ALERT-002 repeated with new ids, timestamps, port counts and a reworded clause."""
+    base = AlertStore(DEFAULT_ALERTS_PATH).get("ALERT-002")
+    storm = []
+    for i in range(12):
+        storm.append(
+            dict(
+                base,
+                id=f"STORM-{i:03d}",
+                timestamp=f"2025-01-01T13:{i:02d}:00Z",
+                description=f"Sequential TCP connection attempts to {20 + i}+ ports over {60 + i} seconds.",
+            )
+        )
+    storm.append(dict(storm[0], id="STORM-REWORDED", description=storm[0]["description"] + " Blocked."))
+    return storm
+
+
+def test_storm_collapses_to_one_group_per_incident() -> None:
+    storm = _storm()
+    other_target = dict(storm[0], id="STORM-OTHER-TARGET", dst_ip="10.0.10.99")
+    other_severity = dict(storm[0], id="STORM-HIGH", severity="high")
+    unrelated = AlertStore(DEFAULT_ALERTS_PATH).all()
+
+    groups = collapse_near_duplicates(storm + [other_target, other_severity] + unrelated)
+
+    storm_group = groups[0]
+    assert storm_group.representative == "STORM-000"
+    # The original ALERT-002 is part of the same incident.
+    assert set(storm_group.members) == {a["id"] for a in storm} | {"ALERT-002"}
+    assert storm_group.members["STORM-001"] == 1.0  # only numbers differ
+    assert 0.8 <= storm_group.members["STORM-REWORDED"] < 1.0
+    # Different entities or severity never share a verdict.
+    singletons = {g.representative for g in groups if not g.duplicates}
+    assert {"STORM-OTHER-TARGET", "STORM-HIGH"} <= singletons
+    assert len(groups) == len(unrelated) + 2
+
+
+def test_fingerprint_masks_numbers_and_ignores_identity() -> None:
+    storm = _storm()
+    assert alert_fingerprint(storm[0]) == alert_fingerprint(storm[5])
+    assert alert_fingerprint(storm[0]) != alert_fingerprint(storm[-1])
+
+    index = NearDuplicateIndex()
+    for alert in storm:
+        index.add(alert)
+    assert index.stats() == {"alerts": 13, "groups": 1, "collapsed": 12, "distinct_templates": 2}
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(num_perm=64, bands=10)
+
+
+def test_containment_outcome_and_unprojected_fields_split_groups() -> None:
+    edr = AlertStore(DEFAULT_ALERTS_PATH).get("ALERT-021")
+    quarantined = dict(edr, id="EDR-Q", action_taken="quarantined")
+    allowed = dict(edr, id="EDR-A", action_taken="allowed")
+    signed = dict(quarantined, id="EDR-SIGNED", signer="Microsoft Windows Publisher Verified Code Signing")
+
+    groups = collapse_near_duplicates([quarantined, allowed, dict(quarantined, id="EDR-Q2"), signed])
+
+    assert [sorted(g.members) for g in groups] == [["EDR-Q", "EDR-Q2"], ["EDR-A"], ["EDR-SIGNED"]]
+
+
+def test_numeric_magnitudes_split_groups_but_ports_and_prose_numbers_do_not() -> None:
+    auth = AlertStore(DEFAULT_ALERTS_PATH).get("ALERT-011")
+    few = dict(auth, id="FEW", failed_attempts=3, bytes_out=120, dst_port=22)
+    many = dict(auth, id="MANY", failed_attempts=500, bytes_out=4000000, dst_port=22)
+    similar = dict(few, id="FEW-2", failed_attempts=7, bytes_out=180, dst_port=2222)
+    reworded = dict(few, id="FEW-3", description=auth["description"] + " within 15 minutes")
+    reworded_again = dict(reworded, id="FEW-4", description=auth["description"] + " within 40 minutes")
+
+    groups = collapse_near_duplicates([few, many, similar, reworded, reworded_again])
+
+    members = [sorted(g.members) for g in groups]
+    assert ["MANY"] in members
+    assert ["FEW", "FEW-2"] in members
+    assert ["FEW-3", "FEW-4"] in members
+
+
+@pytest.fixture
+def storm_feed(tmp_path, monkeypatch) -> AlertColumns:
+    alerts = _storm() + AlertStore(DEFAULT_ALERTS_PATH).all()[:5]
+    path = tmp_path / "alerts.json"
+    path.write_text(json.dumps(alerts), encoding="utf-8")
+    columns = AlertColumns(path, cache_dir=tmp_path / "cache")
+    monkeypatch.setattr(agent_module, "get_alert_columns", lambda: columns)
+    monkeypatch.setattr(batch_module, "get_alert_columns", lambda: columns)
+    return columns
+
+
+def test_loader_returns_representatives_with_duplicate_ids(storm_feed) -> None:
+    context = SimpleNamespace(state={})
+
+    returned = load_synthetic_alerts(limit=100, tool_context=context)
+
+    assert len(returned) == 5
+    assert returned[0]["id"] == "STORM-000" and len(returned[0]["duplicate_ids"]) == 13
+    assert "ALERT-002" in returned[0]["duplicate_ids"]
+    assert "duplicate_ids" not in returned[1]
+    assert len(context.state["raw_alerts"]) == 18
+    (group,) = context.state["duplicate_groups"]
+    assert group["representative"] == "STORM-000" and len(group["members"]) == 14
+    details = context.state["events"][-1]["details"]
+    assert details["returned_count"] == 5 and details["collapsed_duplicates"] == 13
+
+
+@pytest.mark.asyncio
+async def test_batch_triages_representatives_and_fans_out_verdicts(storm_feed) -> None:
+    model = StubModel(steps=["load_synthetic_alerts"])
+    runner = Runner(
+        app=App(
+            name="near_dup_test_app",
+            root_agent=LlmAgent(name="root_triage_agent", model=model, tools=[load_synthetic_alerts]),
+        ),
+        session_service=InMemorySessionService(),
+    )
+    ids = [a["id"] for a in _storm()] + ["ALERT-001", "ALERT-404"]
+
+    results = [
+        r
+        async for r in triage_batch(
+            ids,
+            runner=runner,
+            session_service=runner.session_service,
+            limiter=ProviderRateLimiter(rate_per_second=0),
+        )
+    ]
+
+    assert sorted(r.alert_id for r in results) == sorted(ids)
+    by_id = {r.alert_id: r for r in results}
+    representative = by_id["STORM-000"]
+    assert representative.duplicate_of is None and representative.attempts == 1
+    fanned = [r for r in results if r.duplicate_of == "STORM-000"]
+    assert len(fanned) == 12
+    assert all(
+        r.normalized_action == representative.normalized_action
+        and r.session_id == representative.session_id
+        and r.attempts == 0
+        for r in fanned
+    )
+    # Storm representative, ALERT-001 and the unknown id each got one real session.
+    assert len({r.session_id for r in results}) == 3
+    assert by_id["ALERT-404"].duplicate_of is None
@@ -0,0 +1,122 @@
+import json
+import os
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.apps.app import App
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+from aegis_soc_sessions.agent import load_synthetic_alerts
+from aegis_soc_sessions.alert_store import AlertStore
+from aegis_soc_sessions.alert_stream import DEFAULT_ALERTS_PATH
+from aegis_soc_sessions.batch import ProviderRateLimiter, triage_batch
+from aegis_soc_sessions.pretriage import (
+    EXAMPLE_POLICY_PATH,
+    PretriagePolicy,
+    PretriageRule,
+    get_pretriage_policy,
+)
+from tests.helpers import StubModel
+
+
+def _runner(model: StubModel) -> Runner:
+    agent = LlmAgent(
+        name="root_triage_agent",
+        model=model,
+        tools=[load_synthetic_alerts],
+        output_key="triage_summary",
+    )
+    return Runner(
+        app=App(name="pretriage_test_app", root_agent=agent),
+        session_service=InMemorySessionService(),
+    )
+
+
+def test_example_policy_decides_the_expected_alerts() -> None:
+    policy = PretriagePolicy.from_file(EXAMPLE_POLICY_PATH)
+    decided, remaining = policy.partition(AlertStore(DEFAULT_ALERTS_PATH).all())
+
+    by_id = {d.alert_id: d for d in decided}
+    assert by_id["ALERT-031"].normalized_action == "NEEDS_MORE_INFO"
+    assert by_id["ALERT-021"].rule == "edr-contained-high"
+    assert all(d.normalized_action == "CLOSE" for d in decided if d.rule == "low-firewall-port-scan")
+    # A medium port scan is not covered and still goes to the LLM.
+    assert "ALERT-002" in {a["id"] for a in remaining}
+    assert policy.stats()["decided"] == len(decided)
+
+
+def test_rule_conditions_and_validation() -> None:
+    scanner = PretriageRule.from_dict(
+        {
+            "name": "scanner",
+            "category": "port_scan",
+            "entity_allowlist": ["ip:10.0.50.5"],
+            "action": "close",
+        }
+    )
+    assert scanner.action == "CLOSE"
+    assert scanner.matches({"category": "Port_Scan", "src_ip": "10.0.50.5"})
+    assert scanner.matches({"category": "port_scan", "entities": {"src_ip": "10.0.50.5"}})
+    assert not scanner.matches({"category": "port_scan", "src_ip": "10.0.50.7"})
+    # A scan *targeting* the allowlisted scanner is not a scan from it.
+    assert not scanner.matches({"category": "port_scan", "src_ip": "198.51.100.23", "dst_ip": "10.0.50.5"})
+    assert not scanner.matches({"category": "port_scan", "dst_ip": "10.0.50.5"})
+    # Every originating entity must be allowlisted, not just one of them.
+    assert not scanner.matches({"category": "port_scan", "src_ip": "10.0.50.5", "username": "mallory"})
+    example = PretriagePolicy.from_file(EXAMPLE_POLICY_PATH)
+    inbound = {"id": "X", "source": "firewall", "severity": "medium", "category": "port_scan",
+               "src_ip": "198.51.100.23", "dst_ip": "10.0.50.5"}
+    assert example.decide(inbound) is None
+    assert example.decide(dict(inbound, src_ip="10.0.50.5", dst_ip="10.0.10.15")).normalized_action == "CLOSE"
+
+    present = PretriageRule.from_dict({"name": "p", "fields": {"action_taken": "*"}, "action": "MONITOR"})
+    assert present.matches({"action_taken": "quarantined"})
+    assert not present.matches({"action_taken": ""})
+
+    with pytest.raises(ValueError):
+        PretriageRule.from_dict({"name": "bad", "severity": "low", "action": "DELETE"})
+    with pytest.raises(ValueError):
+        PretriageRule.from_dict({"name": "everything", "action": "CLOSE"})
+    with pytest.raises(ValueError):
+        PretriagePolicy([present, present])
+
+
+@pytest.mark.asyncio
+async def test_batch_skips_the_llm_for_rule_decided_alerts() -> None:
+    model = StubModel(steps=["load_synthetic_alerts"])
+    runner = _runner(model)
+    policy = PretriagePolicy.from_file(EXAMPLE_POLICY_PATH)
+    ids = ["ALERT-001", "ALERT-021", "ALERT-031"]
+
+    results = [
+        r
+        async for r in triage_batch(
+            ids,
+            runner=runner,
+            session_service=runner.session_service,
+            limiter=ProviderRateLimiter(rate_per_second=0),
+            policy=policy,
+        )
+    ]
+
+    by_id = {r.alert_id: r for r in results}
+    assert by_id["ALERT-031"].pretriage_rule == "incomplete-telemetry"
+    assert by_id["ALERT-031"].normalized_action == "NEEDS_MORE_INFO"
+    assert by_id["ALERT-021"].session_id == "" and by_id["ALERT-021"].attempts == 0
+    assert by_id["ALERT-001"].pretriage_rule is None
+    assert by_id["ALERT-001"].normalized_action == "ESCALATE"
+    # Two LLM turns (tool call + answer) for the one alert that missed every rule.
+    assert model.calls == 2
+
+
+def test_policy_file_is_reloaded_when_it_changes(tmp_path) -> None:
+    path = tmp_path / "policy.json"
+    path.write_text(json.dumps({"rules": [{"name": "a", "severity": "low", "action": "CLOSE"}]}))
+    assert get_pretriage_policy("").rules == []
+    assert [r.name for r in get_pretriage_policy(str(path)).rules] == ["a"]
+
+    path.write_text(json.dumps({"rules": [{"name": "b", "severity": "low", "action": "MONITOR"}]}))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert [r.name for r in get_pretriage_policy(str(path)).rules] == ["b"]
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.apps.app import App
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.adk.runners import Runner
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.genai import types
+
+from aegis_soc_sessions.agent import load_synthetic_alerts
+from aegis_soc_sessions.app import build_session_service
+from aegis_soc_sessions.sqlite_session_service import SqliteSessionService
+from tests.helpers import StubModel
+
+APP_NAME = "sqlite_session_test_app"
+
+
+def _app() -> App:
+    agent = LlmAgent(
+        name="root_triage_agent",
+        model=StubModel(steps=["load_synthetic_alerts"]),
+        tools=[load_synthetic_alerts],
+        output_key="triage_summary",
+    )
+    return App(name=APP_NAME, root_agent=agent)
+
+
+async def _turn(runner: Runner, session_id: str, text: str) -> None:
+    async for _event in runner.run_async(
+        user_id="analyst",
+        session_id=session_id,
+        new_message=types.Content(role="user", parts=[types.Part(text=text)]),
+    ):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_sessions_survive_service_restart(tmp_path) -> None:
+    db_path = tmp_path / "sessions.db"
+    service = SqliteSessionService(db_path, batch_size=64)
+    runner = Runner(app=_app(), session_service=service)
+    await service.create_session(
+        app_name=APP_NAME, user_id="analyst", session_id="incident-001",
+        state={"user:tier": 2},
+    )
+    await _turn(runner, "incident-001", "Triage ALERT-021")
+    service.close()
+
+    # A fresh service (e.g. after a restart or in another worker) sees it all.
+    reopened = SqliteSessionService(db_path)
+    session = await reopened.get_session(
+        app_name=APP_NAME, user_id="analyst", session_id="incident-001"
+    )
+    assert session is not None
+    assert "ESCALATE" in session.state["triage_summary"]
+    assert session.state["raw_alerts"][0]["id"] == "ALERT-021"
+    assert session.state["user:tier"] == 2
+    assert any(e["event_type"] == "tool_call" for e in session.state["events"])
+    assert len(session.events) >= 3
+
+    recent = await reopened.get_session(
+        app_name=APP_NAME, user_id="analyst", session_id="incident-001",
+        config=GetSessionConfig(num_recent_events=1),
+    )
+    assert [e.id for e in recent.events] == [session.events[-1].id]
+
+    # Follow-up turns append to the same durable session.
+    await _turn(Runner(app=_app(), session_service=reopened), "incident-001", "Summarize")
+    session_2 = await reopened.get_session(
+        app_name=APP_NAME, user_id="analyst", session_id="incident-001"
+    )
+    assert len(session_2.events) > len(session.events)
+    reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_create_list_delete(tmp_path) -> None:
+    service = SqliteSessionService(tmp_path / "sessions.db")
+    await service.create_session(app_name=APP_NAME, user_id="u1", session_id="s1")
+    await service.create_session(app_name=APP_NAME, user_id="u2", session_id="s2")
+    with pytest.raises(AlreadyExistsError):
+        await service.create_session(app_name=APP_NAME, user_id="u1", session_id="s1")
+
+    listed = await service.list_sessions(app_name=APP_NAME)
+    assert [s.id for s in listed.sessions] == ["s1", "s2"]
+    assert [s.id for s in (await service.list_sessions(app_name=APP_NAME, user_id="u2")).sessions] == ["s2"]
+
+    await service.delete_session(app_name=APP_NAME, user_id="u1", session_id="s1")
+    assert await service.get_session(app_name=APP_NAME, user_id="u1", session_id="s1") is None
+    service.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_appends_run_off_the_event_loop(tmp_path) -> None:
+    service = SqliteSessionService(tmp_path / "sessions.db", batch_size=1)
+    loop_thread = threading.get_ident()
+    db_threads = set()
+    original = service._locked
+
+    def record_thread(fn, *args):
+        db_threads.add(threading.get_ident())
+        return original(fn, *args)
+
+    service._locked = record_thread
+
+    async def writer(n: int) -> None:
+        session = await service.create_session(
+            app_name=APP_NAME, user_id="analyst", session_id=f"s{n}"
+        )
+        for i in range(5):
+            await service.append_event(session, Event(
+                author="agent",
+                actions=EventActions(state_delta={"count": i, "user:last": n}),
+            ))
+
+    await asyncio.gather(*(writer(n) for n in range(8)))
+    assert loop_thread not in db_threads
+
+    for n in range(8):
+        session = await service.get_session(
+            app_name=APP_NAME, user_id="analyst", session_id=f"s{n}"
+        )
+        assert len(session.events) == 5
+        assert session.state["count"] == 4
+    service.close()
+
+
+def test_backend_is_selected_by_configuration(tmp_path, monkeypatch) -> None:
+    from aegis_soc_sessions import sqlite_session_service
+
+    monkeypatch.setattr(sqlite_session_service, "DEFAULT_DB_PATH", str(tmp_path / "x.db"))
+    service = build_session_service("sqlite")
+    assert isinstance(service, SqliteSessionService)
+    service.close()
+    assert type(build_session_service("memory")).__name__ == "InMemorySessionService"
+    with pytest.raises(ValueError):
+        build_session_service("redis")
@@ -0,0 +1,58 @@
+import json
+import subprocess
+import sys
+
+from google.adk.agents import LlmAgent
+from google.adk.apps.app import App
+
+from aegis_soc_sessions.startup_profile import main, parse_importtime, profile_target
+
+
+def _heavy_modules_after(statement: str) -> list:
+    code = (
+        f"import json, sys; {statement}; "
+        "print(json.dumps([m for m in ('google.adk', 'google.genai', 'a2a', 'fastapi') if m in sys.modules]))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    # The last line is ours; anything the imports print comes before it.
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_light_modules_do_not_import_the_adk_stack() -> None:
+    assert _heavy_modules_after("import aegis_soc_sessions, guardrail_agent") == []
+    assert _heavy_modules_after("import guardrail_agent.rules, guardrail_agent.cache") == []
+    assert _heavy_modules_after(
+        "import aegis_soc_sessions.alert_columns, aegis_soc_sessions.alert_generator, "
+        "aegis_soc_sessions.correlation, aegis_soc_sessions.compaction"
+    ) == []
+
+
+def test_lazy_exports_resolve_to_the_built_objects() -> None:
+    import aegis_soc_sessions
+    import guardrail_agent
+    from aegis_soc_sessions import agent
+
+    assert isinstance(aegis_soc_sessions.app, App)
+    assert aegis_soc_sessions.root_agent is agent.root_agent
+    assert agent.root_agent.name == "root_triage_agent"
+    assert isinstance(guardrail_agent.guardrail_agent, LlmAgent)
+    # Factories build fresh, independent graphs.
+    assert agent.build_agents()["root_agent"] is not agent.root_agent
+
+
+def test_parse_importtime_and_profile_target() -> None:
+    rows = parse_importtime(
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        450 |   json.decoder\n"
+        "import time:       330 |        780 | json\n"
+    )
+    assert rows == [
+        {"module": "json.decoder", "self_us": 120, "cumulative_us": 450, "depth": 1},
+        {"module": "json", "self_us": 330, "cumulative_us": 780, "depth": 0},
+    ]
+
+    result = profile_target("guardrail_agent.rules:scan_text", top=5)
+    assert result["ready_seconds"] > 0
+    assert len(result["slowest_cumulative_ms"]) == 5
+    assert "google.adk" not in result["packages_ms"]
+    assert main(["no_such_module_xyz"]) == 1
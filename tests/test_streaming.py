@@ -0,0 +1,74 @@
+import json
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.apps.app import App
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.adk.tools.agent_tool import AgentTool
+
+from aegis_soc_sessions.agent import load_synthetic_alerts
+from aegis_soc_sessions.streaming import (
+    UPDATE_ALERTS_LOADED,
+    UPDATE_CORRELATION_DONE,
+    UPDATE_FINAL_SUMMARY,
+    UPDATE_GUARDRAIL_VERDICT,
+    UPDATE_PARSER_DONE,
+    parse_guardrail_verdict,
+    stream_triage,
+)
+from tests.helpers import StubModel, _guardrail_function_tool
+
+STEPS = ["load_synthetic_alerts", "log_parser_agent", "correlation_agent", "guardrail_agent"]
+
+
+def _runner() -> Runner:
+    parser = LlmAgent(name="log_parser_agent", model=StubModel(text="parsed"), output_key="parsed_alerts")
+    correlator = LlmAgent(name="correlation_agent", model=StubModel(text="correlated"))
+    root = LlmAgent(
+        name="root_triage_agent",
+        model=StubModel(steps=STEPS),
+        tools=[load_synthetic_alerts, AgentTool(agent=parser), AgentTool(agent=correlator), _guardrail_function_tool],
+        output_key="triage_summary",
+    )
+    return Runner(app=App(name="streaming_test_app", root_agent=root), session_service=InMemorySessionService())
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_each_step_in_order_with_timestamps() -> None:
+    runner = _runner()
+    session = await runner.session_service.create_session(app_name="streaming_test_app", user_id="u")
+
+    updates = [
+        u
+        async for u in stream_triage(
+            runner, user_id="u", session_id=session.id, new_message="Triage ALERT-001"
+        )
+    ]
+
+    assert [u.kind for u in updates] == [
+        UPDATE_ALERTS_LOADED,
+        UPDATE_PARSER_DONE,
+        UPDATE_CORRELATION_DONE,
+        UPDATE_GUARDRAIL_VERDICT,
+        UPDATE_FINAL_SUMMARY,
+    ]
+    loaded, parsed, _, verdict, final = updates
+    assert loaded.data == {"count": 1, "alert_ids": ["ALERT-001"]}
+    assert parsed.data["text"] == "parsed"
+    # The verdict is delivered before the narrative, and agrees with it.
+    assert verdict.data["normalized_action"] == "ESCALATE"
+    assert final.data["normalized_action"] == "ESCALATE"
+    assert final.data["triage_summary"].startswith("Recommended action: ESCALATE")
+    elapsed = [u.elapsed_seconds for u in updates]
+    assert elapsed == sorted(elapsed)
+    assert all(u.to_dict()["timestamp"].endswith("+00:00") for u in updates)
+
+
+def test_parse_guardrail_verdict_accepts_wrapped_and_bare_responses() -> None:
+    verdict = {"allow": False, "normalized_action": "MONITOR", "rationale": "r"}
+    assert parse_guardrail_verdict({"result": json.dumps(verdict)}) == verdict
+    assert parse_guardrail_verdict({"result": f"```json\n{json.dumps(verdict)}\n```"}) == verdict
+    assert parse_guardrail_verdict(verdict) == verdict
+    assert parse_guardrail_verdict({"result": "no verdict here"}) is None
+    assert parse_guardrail_verdict({"normalized_action": "DELETE"}) is None
@@ -0,0 +1,146 @@
+import asyncio
+import os
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import pytest
+
+from aegis_soc_sessions.alert_store import AlertStore
+from aegis_soc_sessions.alert_stream import DEFAULT_ALERTS_PATH
+from aegis_soc_sessions.work_queue import DEAD, DONE, WorkQueue, shard_for, shard_key
+from aegis_soc_sessions.worker_pool import ShardWorker, dispatch, run_pool
+
+
+@dataclass
+class _Result:
+    alert_id: str
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"alert_id": self.alert_id, "normalized_action": "MONITOR", "pid": os.getpid()}
+
+
+def fake_triage_factory():
+    """Module-level so spawned worker processes can unpickle it."""
+
+    async def triage(alert_ids: List[str]) -> AsyncIterator[_Result]:
+        for alert_id in alert_ids:
+            yield _Result(alert_id)
+
+    return triage
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_alerts_about_the_same_entity_share_a_shard() -> None:
+    assert shard_key({"id": "A", "username": "Alice@Example.com", "src_ip": "1.2.3.4"}) == "user:alice@example.com"
+    assert shard_key({"id": "B", "entities": {"hostname": "WS-1"}}) == "host:ws-1"
+    assert shard_key({"id": "C"}) == "alert:C"
+
+    alerts = AlertStore(DEFAULT_ALERTS_PATH).all()
+    by_key: Dict[str, set] = {}
+    for alert in alerts:
+        by_key.setdefault(shard_key(alert), set()).add(shard_for(shard_key(alert), 4))
+    assert all(len(shards) == 1 for shards in by_key.values())
+    assert len({s for shards in by_key.values() for s in shards}) > 1
+
+
+def test_expired_leases_are_redelivered_and_stale_tokens_rejected(tmp_path) -> None:
+    clock = _Clock()
+    queue = WorkQueue(tmp_path / "q.db", visibility_timeout=30, max_attempts=2, clock=clock)
+    queue.enqueue([(0, "ALERT-001", "user:a"), (1, "ALERT-002", "user:b")])
+
+    (first,) = queue.lease(0, "w1", limit=5)
+    assert queue.lease(0, "w2") == []  # hidden while leased
+    clock.now += 31
+    (second,) = queue.lease(0, "w2")
+    assert second.job_id == first.job_id and second.attempts == 2
+    # The first worker lost its lease: its ack must not complete the job.
+    assert not queue.ack(first, {"late": True})
+    assert queue.ack(second, {"ok": True})
+    assert queue.pending(0) == 0
+
+    (job,) = queue.lease(1, "w1")
+    assert queue.nack(job, "boom")
+    (job,) = queue.lease(1, "w1")
+    assert queue.nack(job, "boom again")  # final attempt -> dead
+    stats = queue.stats()
+    assert stats["jobs"][DONE] == 1 and stats["jobs"][DEAD] == 1
+    assert [r["result"] for r in queue.results()] == [{"ok": True}, None]
+    queue.close()
+
+
+@pytest.mark.asyncio
+async def test_shard_worker_drains_its_shard_and_heartbeats(tmp_path) -> None:
+    queue = WorkQueue(tmp_path / "q.db")
+    enqueued = dispatch(queue, 1, ["ALERT-001", "ALERT-002", "ALERT-001", "ALERT-404"])
+    attempts = {}
+
+    async def flaky(alert_ids):
+        for alert_id in alert_ids:
+            attempts[alert_id] = attempts.get(alert_id, 0) + 1
+            if alert_id == "ALERT-404":
+                yield _Result(alert_id, error="not found") if attempts[alert_id] == 1 else _Result(alert_id)
+            else:
+                yield _Result(alert_id)
+
+    worker = ShardWorker(queue, 0, flaky, concurrency=8, heartbeat_seconds=0.01, poll_seconds=0.01, retry_delay=0)
+    await worker.run()
+
+    assert enqueued == 4
+    assert queue.pending() == 0
+    # Duplicate jobs for one alert are triaged once per lease batch.
+    assert attempts["ALERT-001"] == 1
+    assert (worker.processed, worker.failed) == (4, 1)
+    (beat,) = queue.stats()["workers"]
+    assert beat["status"] == "stopped" and beat["processed"] == 4
+    queue.close()
+
+
+@pytest.mark.asyncio
+async def test_settled_leases_are_no_longer_extended(tmp_path) -> None:
+    queue = WorkQueue(tmp_path / "q.db")
+    dispatch(queue, 1, ["ALERT-001", "ALERT-002"])
+    seen_in_flight = []
+
+    async def slow(alert_ids):
+        for alert_id in alert_ids:
+            await asyncio.sleep(0.06)  # several heartbeats per alert
+            yield _Result(alert_id)
+            # The first job is acked: only the second is still in flight.
+            await asyncio.sleep(0.03)
+            seen_in_flight.append(queue.stats()["workers"][0]["in_flight"])
+
+    worker = ShardWorker(queue, 0, slow, concurrency=8, heartbeat_seconds=0.01, poll_seconds=0.01)
+    await worker.run()
+
+    assert worker.processed == 2
+    assert worker.lost_leases == 0
+    assert seen_in_flight == [1, 0]
+    queue.close()
+
+
+def test_pool_runs_one_process_per_shard(tmp_path) -> None:
+    db = str(tmp_path / "q.db")
+    queue = WorkQueue(db)
+    ids = [a["id"] for a in AlertStore(DEFAULT_ALERTS_PATH).all()]
+    dispatch(queue, 3, ids)
+
+    stats = run_pool(db, workers=3, heartbeat_seconds=0.05, triage_factory=fake_triage_factory)
+
+    assert stats["jobs"][DONE] == len(ids) and stats["jobs"][DEAD] == 0
+    assert len(stats["workers"]) == 3
+    results = queue.results()
+    # Each shard was handled by exactly one process, and every entity by one shard.
+    pids_by_shard: Dict[int, set] = {}
+    for row in results:
+        pids_by_shard.setdefault(row["shard"], set()).add(row["result"]["pid"])
+    assert all(len(pids) == 1 for pids in pids_by_shard.values())
+    assert len({pid for pids in pids_by_shard.values() for pid in pids}) == len(pids_by_shard)
+    queue.close()